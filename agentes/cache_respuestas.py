@@ -0,0 +1,170 @@
+"""
+Caché persistente de respuestas del LLM
+Direccionada por contenido: la clave es un hash del modelo, la temperatura,
+el mensaje de sistema y el prompt completo ya formateado
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# ============================================================================
+# CONFIGURACIÓN DE LA CACHÉ
+# ============================================================================
+
+CACHE_ACTIVA = os.environ.get('INFORMES_CACHE_LLM_ACTIVA', '1') != '0'
+CACHE_RUTA = os.environ.get(
+    'INFORMES_CACHE_LLM',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'respuestas_llm.sqlite3')
+)
+CACHE_TTL_SEGUNDOS = 7 * 24 * 3600  # Una semana
+CACHE_MAX_ENTRADAS = 5000
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50 MB de respuestas almacenadas
+
+
+def calcular_clave(modelo: str, temperatura: Any, mensaje_sistema: str, prompt: str,
+                   formato: Optional[Dict[str, Any]] = None) -> str:
+    """Calcula la clave de caché (SHA-256) a partir de todo lo que determina la respuesta"""
+    partes = [modelo, temperatura, mensaje_sistema, prompt]
+    if formato is not None:
+        partes.append(formato)  # Sin esquema la clave no cambia respecto a versiones anteriores
+    material = json.dumps(
+        partes,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+# ============================================================================
+# CACHÉ SOBRE SQLITE
+# ============================================================================
+class CacheRespuestasLLM:
+    """Caché de respuestas en SQLite con expulsión por TTL, número de entradas y tamaño"""
+
+    def __init__(self, ruta: str = CACHE_RUTA, ttl: float = CACHE_TTL_SEGUNDOS,
+                 max_entradas: int = CACHE_MAX_ENTRADAS, max_bytes: int = CACHE_MAX_BYTES):
+        self.ruta = ruta
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._lock = threading.Lock()
+
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                respuesta TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                accedido REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_accedido ON respuestas (accedido)")
+        self._conn.commit()
+
+    def obtener(self, clave: str) -> Optional[str]:
+        """Devuelve la respuesta almacenada o None si no existe o ha caducado"""
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT respuesta, creado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+
+            if fila is None or ahora - fila[1] > self.ttl:
+                if fila is not None:
+                    self._conn.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                    self._conn.commit()
+                self.fallos += 1
+                return None
+
+            self._conn.execute("UPDATE respuestas SET accedido = ? WHERE clave = ?", (ahora, clave))
+            self._conn.commit()
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, clave: str, respuesta: str) -> None:
+        """Almacena una respuesta y aplica la política de expulsión"""
+        ahora = time.time()
+        tamano = len(respuesta.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, respuesta, bytes, creado, accedido) VALUES (?, ?, ?, ?, ?)",
+                (clave, respuesta, tamano, ahora, ahora)
+            )
+            self._expulsar(ahora)
+            self._conn.commit()
+
+    def _expulsar(self, ahora: float) -> None:
+        """Elimina entradas caducadas y, si se superan los límites, las menos usadas recientemente"""
+        cursor = self._conn.execute("DELETE FROM respuestas WHERE creado < ?", (ahora - self.ttl,))
+        self.expulsiones += max(cursor.rowcount, 0)
+
+        entradas, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM respuestas"
+        ).fetchone()
+
+        while entradas > self.max_entradas or total_bytes > self.max_bytes:
+            fila = self._conn.execute(
+                "SELECT clave, bytes FROM respuestas ORDER BY accedido ASC LIMIT 1"
+            ).fetchone()
+            if fila is None:
+                break
+            self._conn.execute("DELETE FROM respuestas WHERE clave = ?", (fila[0],))
+            entradas -= 1
+            total_bytes -= fila[1]
+            self.expulsiones += 1
+
+    def limpiar(self) -> None:
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._conn.execute("DELETE FROM respuestas")
+            self._conn.commit()
+            self.aciertos = 0
+            self.fallos = 0
+            self.expulsiones = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos y ocupación actual"""
+        with self._lock:
+            entradas, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM respuestas"
+            ).fetchone()
+        consultas = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'ratio_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'expulsiones': self.expulsiones,
+            'entradas': entradas,
+            'bytes': total_bytes
+        }
+
+
+# ============================================================================
+# INSTANCIA GLOBAL
+# ============================================================================
+_cache_global: Optional[CacheRespuestasLLM] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache() -> Optional[CacheRespuestasLLM]:
+    """Devuelve la caché compartida del proceso (None si está desactivada)"""
+    global _cache_global
+    if not CACHE_ACTIVA:
+        return None
+    if _cache_global is None:
+        with _cache_lock:
+            if _cache_global is None:
+                _cache_global = CacheRespuestasLLM()
+    return _cache_global
@@ -0,0 +1,272 @@
+"""
+Checkpoints del grafo del agente en SQLite
+Implementa el BaseCheckpointSaver de LangGraph con sqlite3 (solo biblioteca
+estándar): tras cada nodo del grafo se guarda el estado del análisis, con el
+informe como thread_id. Si el proceso se interrumpe o Ollama deja de
+responder a mitad de un análisis, volver a ejecutarlo con el mismo informe
+continúa desde la última etapa completada en lugar de repetirlo todo.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+CHECKPOINTS_ACTIVOS = os.environ.get('INFORMES_CHECKPOINTS_ACTIVOS', '1') != '0'
+CHECKPOINTS_RUTA = os.environ.get(
+    'INFORMES_CHECKPOINTS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datos', 'checkpoints.sqlite3')
+)
+
+
+# ============================================================================
+# CHECKPOINTER
+# ============================================================================
+class CheckpointerSQLite(BaseCheckpointSaver):
+    """
+    Checkpoints y escrituras pendientes de LangGraph en una base SQLite
+
+    Cada checkpoint se guarda completo (con los valores de los canales) en una
+    fila; las escrituras de los nodos que terminaron dentro de un paso que no
+    llegó a completarse (p. ej. una rama del grafo paralelo) se guardan aparte
+    para no repetirlos al reanudar.
+    """
+
+    def __init__(self, ruta: str = CHECKPOINTS_RUTA):
+        super().__init__()
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                padre_id TEXT,
+                tipo TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                tipo_metadatos TEXT NOT NULL,
+                metadatos BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS escrituras (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                indice INTEGER NOT NULL,
+                canal TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                valor BLOB NOT NULL,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, indice)
+            );
+        """)
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def _tupla(self, fila: Tuple[Any, ...]) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, padre_id, tipo, checkpoint, tipo_metadatos, metadatos = fila
+        with self._lock:
+            escrituras = self._conn.execute(
+                """SELECT task_id, canal, tipo, valor FROM escrituras
+                   WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+                   ORDER BY task_path, task_id, indice""",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+        configuracion = lambda id_: {
+            'configurable': {'thread_id': thread_id, 'checkpoint_ns': checkpoint_ns, 'checkpoint_id': id_}
+        }
+        return CheckpointTuple(
+            config=configuracion(checkpoint_id),
+            checkpoint=self.serde.loads_typed((tipo, checkpoint)),
+            metadata=self.serde.loads_typed((tipo_metadatos, metadatos)),
+            parent_config=configuracion(padre_id) if padre_id else None,
+            pending_writes=[
+                (task_id, canal, self.serde.loads_typed((tipo_valor, valor)))
+                for task_id, canal, tipo_valor, valor in escrituras
+            ]
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Checkpoint indicado en config o, si no indica ninguno, el último del thread"""
+        configurable = config['configurable']
+        consulta = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        parametros: List[Any] = [configurable['thread_id'], configurable.get('checkpoint_ns', '')]
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            consulta += " AND checkpoint_id = ?"
+            parametros.append(checkpoint_id)
+        else:
+            consulta += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            fila = self._conn.execute(consulta, parametros).fetchone()
+        return self._tupla(fila) if fila else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """Checkpoints del thread (o de todos), del más reciente al más antiguo"""
+        condiciones, parametros = [], []
+        if config is not None:
+            configurable = config['configurable']
+            condiciones.append("thread_id = ?")
+            parametros.append(configurable['thread_id'])
+            if configurable.get('checkpoint_ns') is not None:
+                condiciones.append("checkpoint_ns = ?")
+                parametros.append(configurable['checkpoint_ns'])
+            if get_checkpoint_id(config):
+                condiciones.append("checkpoint_id = ?")
+                parametros.append(get_checkpoint_id(config))
+        if before is not None and get_checkpoint_id(before):
+            condiciones.append("checkpoint_id < ?")
+            parametros.append(get_checkpoint_id(before))
+        consulta = "SELECT * FROM checkpoints"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            filas = self._conn.execute(consulta, parametros).fetchall()
+
+        for fila in filas:
+            if limit is not None and limit <= 0:
+                break
+            tupla = self._tupla(fila)
+            if filter and not all(tupla.metadata.get(clave) == valor for clave, valor in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield tupla
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        configurable = config['configurable']
+        thread_id = configurable['thread_id']
+        checkpoint_ns = configurable.get('checkpoint_ns', '')
+        tipo, datos = self.serde.dumps_typed(checkpoint)
+        tipo_metadatos, metadatos = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint['id'], configurable.get('checkpoint_id'),
+                 tipo, datos, tipo_metadatos, metadatos)
+            )
+        return {'configurable': {'thread_id': thread_id, 'checkpoint_ns': checkpoint_ns,
+                                 'checkpoint_id': checkpoint['id']}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = '') -> None:
+        configurable = config['configurable']
+        # Las escrituras especiales (error, interrupción) sustituyen a las anteriores; el resto no se duplica
+        orden = "INSERT OR REPLACE" if all(canal in WRITES_IDX_MAP for canal, _ in writes) else "INSERT OR IGNORE"
+        filas = []
+        for indice, (canal, valor) in enumerate(writes):
+            tipo, datos = self.serde.dumps_typed(valor)
+            filas.append((configurable['thread_id'], configurable.get('checkpoint_ns', ''),
+                          configurable['checkpoint_id'], task_id, WRITES_IDX_MAP.get(canal, indice),
+                          canal, tipo, datos, task_path))
+        with self._lock, self._conn:
+            self._conn.executemany(f"{orden} INTO escrituras VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM escrituras WHERE thread_id = ?", (thread_id,))
+
+    # ------------------------------------------------------------------
+    # Camino asíncrono (SQLite local: las operaciones son breves)
+    # ------------------------------------------------------------------
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for tupla in self.list(config, filter=filter, before=before, limit=limit):
+            yield tupla
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = '') -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+    def podar(self, thread_id: str) -> int:
+        """Conserva solo el último checkpoint del thread (p. ej. al terminar el análisis) y devuelve los borrados"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id <
+                   (SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?)""",
+                (thread_id, thread_id)
+            )
+            self._conn.execute(
+                """DELETE FROM escrituras WHERE thread_id = ? AND checkpoint_id <
+                   (SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?)""",
+                (thread_id, thread_id)
+            )
+        return cursor.rowcount
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+        return {'informes': threads, 'checkpoints': checkpoints}
+
+
+# ============================================================================
+# INSTANCIA GLOBAL
+# ============================================================================
+_checkpointer_global: Optional[CheckpointerSQLite] = None
+_checkpointer_lock = threading.Lock()
+
+
+def obtener_checkpointer() -> Optional[CheckpointerSQLite]:
+    """Devuelve el checkpointer compartido del proceso (None si está desactivado)"""
+    global _checkpointer_global
+    if not CHECKPOINTS_ACTIVOS:
+        return None
+    if _checkpointer_global is None:
+        with _checkpointer_lock:
+            if _checkpointer_global is None:
+                _checkpointer_global = CheckpointerSQLite(CHECKPOINTS_RUTA)
+    return _checkpointer_global
+
+
+def config_informe(informe_id: str, modo: str = 'secuencial') -> Dict[str, Any]:
+    """Configuración de LangGraph del thread de un informe (un thread por modo de grafo)"""
+    thread_id = informe_id if modo == 'secuencial' else f'{informe_id}:{modo}'
+    return {'configurable': {'thread_id': thread_id}}
@@ -0,0 +1,214 @@
+"""
+Registro de clientes LLM compartidos por todo el proceso
+Mantiene una instancia de ChatOllama por configuración (modelo, URL, temperatura)
+con pool de conexiones HTTP keep-alive, y permite sustituirla por un cliente
+falso local para pruebas
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_ollama import ChatOllama
+
+from agentes.politica_llm import plazo_restante
+
+
+# ============================================================================
+# CONFIGURACIÓN DEL POOL DE CONEXIONES
+# ============================================================================
+
+OLLAMA_MAX_CONEXIONES = 10           # Conexiones simultáneas por cliente
+OLLAMA_MAX_CONEXIONES_KEEPALIVE = 5  # Conexiones ociosas que se mantienen abiertas
+OLLAMA_KEEPALIVE_EXPIRACION = 120.0  # Segundos antes de cerrar una conexión ociosa
+OLLAMA_TIMEOUT_CONEXION = 5.0        # Segundos para establecer la conexión
+
+# Segundos máximos de espera de una respuesta de Ollama (sin streaming llega entera al final)
+OLLAMA_TIMEOUT_SEGUNDOS = float(os.environ.get('INFORMES_OLLAMA_TIMEOUT', '120'))
+
+# Peticiones simultáneas a Ollama desde el camino asíncrono (por bucle de eventos)
+OLLAMA_MAX_CONCURRENCIA_ASYNC = int(os.environ.get('INFORMES_OLLAMA_CONCURRENCIA', '4'))
+
+
+def ajustar_timeout_al_plazo(request: httpx.Request) -> None:
+    """
+    Acorta el timeout de la petición a lo que le queda a la llamada (ver plazo_restante)
+
+    Se engancha a las peticiones del cliente síncrono: cuando PoliticaLLM
+    abandona un intento por plazo agotado, httpx corta también la petición en
+    ese momento y el hilo que la ejecutaba queda libre.
+    """
+    restante = plazo_restante()
+    if restante is not None:
+        restante = max(restante, 0.001)
+        request.extensions['timeout'] = httpx.Timeout(
+            min(OLLAMA_TIMEOUT_SEGUNDOS, restante), connect=min(OLLAMA_TIMEOUT_CONEXION, restante)
+        ).as_dict()
+
+
+# ============================================================================
+# CLIENTE FALSO PARA PRUEBAS
+# ============================================================================
+class LLMFalso:
+    """
+    Cliente local que imita la interfaz de ChatOllama usada por el agente.
+
+    Args:
+        respuesta: Texto fijo, lista de textos (se devuelven en ciclo) o función
+                   que recibe los mensajes y devuelve el texto de respuesta
+        latencia: Segundos de espera simulada por llamada
+    """
+
+    def __init__(self, respuesta: Union[str, List[str], Callable[[List[BaseMessage]], str]] = '{}',
+                 latencia: float = 0.0, model: str = 'falso', temperature: float = 0.0):
+        self.respuesta = respuesta
+        self.latencia = latencia
+        self.model = model
+        self.temperature = temperature
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def _texto(self, messages: List[BaseMessage]) -> str:
+        with self._lock:
+            indice = self.llamadas
+            self.llamadas += 1
+        if callable(self.respuesta):
+            return self.respuesta(messages)
+        if isinstance(self.respuesta, list):
+            return self.respuesta[indice % len(self.respuesta)]
+        return self.respuesta
+
+    def invoke(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        if self.latencia:
+            time.sleep(self.latencia)
+        return AIMessage(content=self._texto(messages))
+
+    async def ainvoke(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return AIMessage(content=self._texto(messages))
+
+    def stream(self, messages: List[BaseMessage], **kwargs: Any) -> Iterator[AIMessageChunk]:
+        """Entrega la respuesta en fragmentos de 8 caracteres repartiendo la latencia"""
+        texto = self._texto(messages)
+        fragmentos = [texto[i:i + 8] for i in range(0, len(texto), 8)] or ['']
+        for fragmento in fragmentos:
+            if self.latencia:
+                time.sleep(self.latencia / len(fragmentos))
+            yield AIMessageChunk(content=fragmento)
+
+
+# ============================================================================
+# REGISTRO DE CLIENTES
+# ============================================================================
+class RegistroClientesLLM:
+    """Registro thread-safe de clientes LLM reutilizables, uno por configuración"""
+
+    def __init__(self, max_conexiones: int = OLLAMA_MAX_CONEXIONES,
+                 max_conexiones_keepalive: int = OLLAMA_MAX_CONEXIONES_KEEPALIVE,
+                 keepalive_expiracion: float = OLLAMA_KEEPALIVE_EXPIRACION,
+                 max_concurrencia_async: int = OLLAMA_MAX_CONCURRENCIA_ASYNC):
+        self.max_conexiones = max_conexiones
+        self.max_conexiones_keepalive = max_conexiones_keepalive
+        self.keepalive_expiracion = keepalive_expiracion
+        self.max_concurrencia_async = max_concurrencia_async
+        self._clientes: Dict[Tuple, Any] = {}
+        self._semaforos: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = \
+            weakref.WeakKeyDictionary()
+        self._cliente_falso: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def _crear_cliente(self, modelo: str, base_url: str, temperatura: float, **opciones: Any) -> ChatOllama:
+        limites = httpx.Limits(
+            max_connections=self.max_conexiones,
+            max_keepalive_connections=self.max_conexiones_keepalive,
+            keepalive_expiry=self.keepalive_expiracion
+        )
+        return ChatOllama(
+            model=modelo,
+            base_url=base_url,
+            temperature=temperatura,
+            client_kwargs={
+                'limits': limites,
+                'timeout': httpx.Timeout(OLLAMA_TIMEOUT_SEGUNDOS, connect=OLLAMA_TIMEOUT_CONEXION)
+            },
+            sync_client_kwargs={'event_hooks': {'request': [ajustar_timeout_al_plazo]}},
+            **opciones
+        )
+
+    def obtener(self, modelo: str, base_url: str, temperatura: float, **opciones: Any) -> Any:
+        """
+        Devuelve el cliente compartido para la configuración, creándolo si hace falta
+
+        Las opciones adicionales (p. ej. keep_alive, num_ctx) se pasan a
+        ChatOllama y forman parte de la configuración; las que valen None se ignoran.
+        """
+        if self._cliente_falso is not None:
+            return self._cliente_falso
+
+        opciones = {nombre: valor for nombre, valor in opciones.items() if valor is not None}
+        clave = (modelo, base_url, temperatura, tuple(sorted(opciones.items())))
+        cliente = self._clientes.get(clave)
+        if cliente is None:
+            with self._lock:
+                cliente = self._clientes.get(clave)
+                if cliente is None:
+                    cliente = self._crear_cliente(modelo, base_url, temperatura, **opciones)
+                    self._clientes[clave] = cliente
+        return cliente
+
+    def semaforo_async(self) -> asyncio.Semaphore:
+        """
+        Semáforo global que limita las llamadas asíncronas simultáneas a Ollama
+
+        Hay uno por bucle de eventos (un asyncio.Semaphore no puede compartirse
+        entre bucles); debe pedirse desde una corrutina en ejecución.
+        """
+        bucle = asyncio.get_running_loop()
+        semaforo = self._semaforos.get(bucle)
+        if semaforo is None:
+            with self._lock:
+                semaforo = self._semaforos.get(bucle)
+                if semaforo is None:
+                    semaforo = asyncio.Semaphore(self.max_concurrencia_async)
+                    self._semaforos[bucle] = semaforo
+        return semaforo
+
+    def configurar(self, max_conexiones: Optional[int] = None,
+                   max_conexiones_keepalive: Optional[int] = None,
+                   max_concurrencia_async: Optional[int] = None) -> None:
+        """Cambia los límites del pool; los clientes y semáforos existentes se recrean al pedirlos"""
+        with self._lock:
+            if max_conexiones is not None:
+                self.max_conexiones = max_conexiones
+            if max_conexiones_keepalive is not None:
+                self.max_conexiones_keepalive = max_conexiones_keepalive
+            if max_concurrencia_async is not None:
+                self.max_concurrencia_async = max_concurrencia_async
+                self._semaforos.clear()
+            self._clientes.clear()
+
+    def limpiar(self) -> None:
+        """Descarta todos los clientes registrados"""
+        with self._lock:
+            self._clientes.clear()
+
+    @contextmanager
+    def usar_cliente_falso(self, cliente: Any) -> Iterator[Any]:
+        """Sustituye temporalmente todos los clientes por uno falso (p. ej. LLMFalso)"""
+        anterior = self._cliente_falso
+        self._cliente_falso = cliente
+        try:
+            yield cliente
+        finally:
+            self._cliente_falso = anterior
+
+
+# Registro compartido por el proceso (app Flask y nodos del grafo)
+registro_clientes = RegistroClientesLLM()
@@ -0,0 +1,105 @@
+"""
+Coalescencia de peticiones duplicadas en curso (single-flight)
+Si varias peticiones piden a la vez el mismo trabajo (misma clave), solo la
+primera lo ejecuta; las demás esperan y reciben su mismo resultado o excepción
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Comparte también las llamadas al LLM con idéntico prompt, aunque sean de informes distintos
+COALESCER_PROMPTS = os.environ.get('INFORMES_COALESCER_PROMPTS', '1') != '0'
+
+
+class _Vuelo:
+    """Ejecución en curso de una clave"""
+
+    def __init__(self):
+        self.terminado = threading.Event()
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+        self.esperando = 0
+
+
+class VueloUnico:
+    """Agrupa las ejecuciones concurrentes de una misma clave en una sola"""
+
+    def __init__(self):
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self._lock = threading.Lock()
+        self.ejecuciones = 0
+        self.compartidas = 0
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta `funcion` salvo que ya haya una ejecución en curso con la misma
+        clave, en cuyo caso espera a que termine
+
+        Returns:
+            (resultado, compartido): compartido es True si el resultado se
+            obtuvo de la ejecución de otra petición
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.ejecuciones += 1
+            else:
+                vuelo.esperando += 1
+                self.compartidas += 1
+
+        if not lider:
+            vuelo.terminado.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado, True
+
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado, False
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.terminado.set()
+
+    def esperar(self, clave: Hashable) -> bool:
+        """
+        Espera a que termine la ejecución en curso de la clave, si la hay, sin
+        lanzar ninguna (su resultado o error se ignoran)
+
+        Returns:
+            True si había una ejecución en curso
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+        if vuelo is None:
+            return False
+        vuelo.terminado.wait()
+        return True
+
+    def en_curso(self) -> int:
+        """Número de claves ejecutándose ahora mismo"""
+        with self._lock:
+            return len(self._vuelos)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Ejecuciones reales, peticiones que reutilizaron otra ejecución y claves en curso"""
+        return {
+            'ejecuciones': self.ejecuciones,
+            'compartidas': self.compartidas,
+            'en_curso': self.en_curso()
+        }
+
+
+# Llamadas al LLM en curso, por clave de caché (hash de modelo, temperatura y prompt)
+vuelos_llm = VueloUnico()
@@ -0,0 +1,167 @@
+"""
+Construcción del contexto de los prompts
+Cada paquete previo se serializa una sola vez y la forma serializada se guarda
+en una caché del proceso indexada por paquete, modo y huella del contenido, de
+modo que las etapas siguientes la reutilizan en lugar de volver a ejecutar
+json.dumps. La caché vive fuera del estado del análisis: no llega al informe
+guardado, a los checkpoints del grafo ni al tamaño que mide el almacén.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from agentes.registros import obtener_logger
+
+log = obtener_logger('contexto')
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# 'completo': JSON indentado (formato original, el de los prompts y la caché de respuestas existentes)
+# 'compacto': JSON sin indentación ni espacios (prompts más cortos, opcional)
+# 'titulos':  solo los títulos de cada elemento
+CONTEXTO_MODO = os.environ.get('INFORMES_CONTEXTO_MODO', 'completo')
+MODOS_CONTEXTO = ('completo', 'compacto', 'titulos')
+
+CARACTERES_POR_TOKEN = 4  # Aproximación para texto en español con el tokenizador de Llama
+CONTEXTO_CACHE_MAX_ENTRADAS = 1024  # Paquetes serializados que se conservan (los más recientes)
+
+
+# ============================================================================
+# SERIALIZACIÓN
+# ============================================================================
+def serializar_paquete(valor: Any, modo: str) -> str:
+    """Serializa un paquete para incluirlo en un prompt"""
+    if modo == 'completo':
+        return json.dumps(valor, indent=2, ensure_ascii=False)
+    if modo == 'compacto':
+        return json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+    if modo == 'titulos':
+        if isinstance(valor, list):
+            titulos = []
+            for elemento in valor:
+                if not isinstance(elemento, dict):
+                    continue
+                titulo = elemento.get('titulo', '')
+                titulos.append(f"{titulo} ({elemento['tipo']})" if elemento.get('tipo') else titulo)
+            return json.dumps(titulos, ensure_ascii=False, separators=(',', ':'))
+        return json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+    raise ValueError(f"Modo de contexto no reconocido: {modo}")
+
+
+def _huella(valor: Any) -> Optional[int]:
+    """
+    Huella barata del contenido (sin serializar): cambia si se edita cualquier
+    elemento. None si el contenido no es hasheable.
+    """
+    try:
+        if isinstance(valor, list):
+            return hash(tuple(tuple(e.items()) if isinstance(e, dict) else e for e in valor))
+        if isinstance(valor, dict):
+            return hash(tuple(valor.items()))
+        return hash(valor)
+    except TypeError:
+        return None
+
+
+# (paquete, modo, huella) -> texto serializado
+_serializados: 'OrderedDict[Tuple[str, str, int], str]' = OrderedDict()
+_serializados_lock = threading.Lock()
+
+
+def contexto_paquete(paquete: str, valor: Any, modo: Optional[str] = None) -> str:
+    """
+    Devuelve la forma serializada de un paquete, reutilizando la de la caché
+    si ya se serializó ese mismo contenido
+    """
+    modo = modo or CONTEXTO_MODO
+    huella = _huella(valor)
+    if huella is None:
+        return serializar_paquete(valor, modo)
+
+    clave = (paquete, modo, huella)
+    with _serializados_lock:
+        texto = _serializados.get(clave)
+        if texto is not None:
+            _serializados.move_to_end(clave)
+            return texto
+
+    texto = serializar_paquete(valor, modo)
+    with _serializados_lock:
+        _serializados[clave] = texto
+        while len(_serializados) > CONTEXTO_CACHE_MAX_ENTRADAS:
+            _serializados.popitem(last=False)
+    return texto
+
+
+# ============================================================================
+# RECUENTO DE TOKENS DEL PROMPT
+# ============================================================================
+# Agregados por etapa (no una lista por llamada: el proceso puede atender miles de análisis)
+_tokens_por_etapa: Dict[str, Dict[str, int]] = {}
+_prefill_por_etapa: Dict[str, Dict[str, float]] = {}
+_tokens_lock = threading.Lock()
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación del número de tokens de un texto"""
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+
+def registrar_prompt(etapa: str, prompt: str) -> int:
+    """Registra el tamaño estimado del prompt de una etapa (visible en el log con nivel DEBUG)"""
+    tokens = estimar_tokens(prompt)
+    with _tokens_lock:
+        agregado = _tokens_por_etapa.setdefault(etapa, {'llamadas': 0, 'suma': 0, 'ultimo': 0, 'maximo': 0})
+        agregado['llamadas'] += 1
+        agregado['suma'] += tokens
+        agregado['ultimo'] = tokens
+        agregado['maximo'] = max(agregado['maximo'], tokens)
+    log.debug("📏 Prompt '%s': ~%d tokens (%d caracteres, contexto %s)", etapa, tokens, len(prompt), CONTEXTO_MODO,
+              extra={'etapa': etapa, 'tokens_estimados': tokens})
+    return tokens
+
+
+def registrar_prefill(etapa: str, metadatos: Dict[str, Any]) -> None:
+    """
+    Registra el prefill real informado por Ollama (prompt_eval_count y
+    prompt_eval_duration). Cuando Ollama reutiliza su caché de prompt solo
+    cuenta los tokens que no estaban ya evaluados, por lo que este valor
+    refleja el ahorro de un prefijo compartido entre etapas.
+    """
+    tokens = metadatos.get('prompt_eval_count')
+    duracion = metadatos.get('prompt_eval_duration')
+    if tokens is None:
+        return
+    ms = duracion / 1e6 if duracion else 0.0
+    with _tokens_lock:
+        agregado = _prefill_por_etapa.setdefault(etapa, {'llamadas': 0, 'tokens': 0, 'ms': 0.0})
+        agregado['llamadas'] += 1
+        agregado['tokens'] += tokens
+        agregado['ms'] += ms
+    log.debug("⏱️ Prefill '%s': %d tokens evaluados en %.0f ms", etapa, tokens, ms,
+              extra={'etapa': etapa, 'tokens_prefill': tokens})
+
+
+def estadisticas_prompts() -> Dict[str, Dict[str, float]]:
+    """Tokens de prompt por etapa (llamadas, media, último, máximo) y prefill medio si Ollama lo informa"""
+    with _tokens_lock:
+        estadisticas: Dict[str, Dict[str, float]] = {
+            etapa: {
+                'llamadas': agregado['llamadas'],
+                'media': agregado['suma'] / agregado['llamadas'],
+                'ultimo': agregado['ultimo'],
+                'maximo': agregado['maximo']
+            }
+            for etapa, agregado in _tokens_por_etapa.items()
+        }
+        for etapa, agregado in _prefill_por_etapa.items():
+            entrada = estadisticas.setdefault(etapa, {})
+            entrada['prefill_tokens_medio'] = agregado['tokens'] / agregado['llamadas']
+            entrada['prefill_ms_medio'] = agregado['ms'] / agregado['llamadas']
+        return estadisticas
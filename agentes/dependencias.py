@@ -0,0 +1,44 @@
+"""
+Dependencias entre etapas del análisis y detección de etapas obsoletas
+Cada etapa se genera a partir de la conjetura y de las etapas previas que usa
+como contexto (CONTEXTO_ETAPA). Al generarla se guarda un hash de esas
+entradas; si después el usuario edita una etapa previa, el hash actual deja
+de coincidir y la etapa queda obsoleta. Regenerar solo las obsoletas, en el
+orden del grafo, actualiza el análisis sin repetir las que no han cambiado.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from agentes.formal_causal_agent import CONTEXTO_ETAPA, PAQUETES, obtener_resultado_paquete
+
+
+def hash_contenido(valor: Any) -> str:
+    """Hash estable del contenido de una etapa (independiente del orden de las claves)"""
+    texto = json.dumps(valor, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def hash_entrada(conjetura: str, analisis: Dict[str, Any], etapa: str) -> str:
+    """Hash de lo que determina el prompt de una etapa: la conjetura y el contenido de sus etapas previas"""
+    partes = [hash_contenido(conjetura)]
+    partes += [f"{previa}={hash_contenido(obtener_resultado_paquete(analisis, previa))}"
+               for previa in CONTEXTO_ETAPA[etapa]]
+    return hash_contenido(partes)
+
+
+def etapas_obsoletas(conjetura: str, analisis: Dict[str, Any], hashes: Dict[str, str]) -> List[str]:
+    """
+    Etapas generadas cuyas entradas han cambiado desde que se generaron, en el orden del grafo
+
+    Una etapa sin hash registrado (generada antes de registrar hashes) no se
+    considera obsoleta: no hay con qué comparar.
+    """
+    return [
+        etapa for etapa in PAQUETES
+        if etapa in hashes
+        and obtener_resultado_paquete(analisis, etapa)
+        and hashes[etapa] != hash_entrada(conjetura, analisis, etapa)
+    ]
+
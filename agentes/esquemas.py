@@ -0,0 +1,140 @@
+"""
+Esquemas JSON de la respuesta de cada etapa
+Se envían a Ollama como formato de salida estructurada (parámetro `format`),
+de modo que el modelo solo puede generar JSON con la forma esperada, y se usan
+para validar cada respuesta antes de aceptarla y guardarla en la caché
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+SALIDA_ESTRUCTURADA = os.environ.get('INFORMES_SALIDA_ESTRUCTURADA', '1') != '0'
+
+TIPOS = ('preceptivas', 'tecnicas', 'facultativas', 'progresistas')
+
+
+class RespuestaInvalida(ValueError):
+    """La respuesta es JSON pero no cumple el esquema de su etapa"""
+
+
+# ============================================================================
+# ESQUEMAS
+# ============================================================================
+def _esquema_elemento(tipos: Optional[List[str]] = None) -> Dict[str, Any]:
+    propiedades: Dict[str, Any] = {'titulo': {'type': 'string'}}
+    requeridos = ['titulo']
+    if tipos:
+        propiedades['tipo'] = {'type': 'string', 'enum': list(tipos)}
+        requeridos.append('tipo')
+    propiedades['contenido'] = {'type': 'string'}
+    requeridos.append('contenido')
+    return {'type': 'object', 'properties': propiedades, 'required': requeridos}
+
+
+def _esquema_lista(tipos: Optional[List[str]] = None) -> Dict[str, Any]:
+    return {'type': 'array', 'items': _esquema_elemento(tipos), 'minItems': 1}
+
+
+def _esquema_raiz(clave: str, valor: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': 'object', 'properties': {clave: valor}, 'required': [clave]}
+
+
+ESQUEMA_QUE_ES = {
+    'type': 'object',
+    'properties': {'contenido': {'type': 'string'}, 'contexto': {'type': 'string'}},
+    'required': ['contenido', 'contexto']
+}
+
+ESQUEMAS_ETAPA: Dict[str, Dict[str, Any]] = {
+    **{tipo: _esquema_raiz(tipo, _esquema_lista()) for tipo in TIPOS},
+    'tecnicas_inicial': _esquema_raiz('tecnicas', _esquema_lista()),
+    'objetivos': _esquema_raiz('para_que', _esquema_lista(list(TIPOS))),
+    **{f'objetivos_{tipo}': _esquema_raiz('para_que', _esquema_lista([tipo])) for tipo in TIPOS},
+    'que_es': _esquema_raiz('que_es', ESQUEMA_QUE_ES),
+    'completo': {
+        'type': 'object',
+        'properties': {
+            'por_que': {
+                'type': 'object',
+                'properties': {tipo: _esquema_lista() for tipo in TIPOS},
+                'required': list(TIPOS)
+            },
+            'para_que': _esquema_lista(list(TIPOS)),
+            'que_es': ESQUEMA_QUE_ES
+        },
+        'required': ['por_que', 'para_que', 'que_es']
+    }
+}
+
+
+def esquema_etapa(etapa: str) -> Optional[Dict[str, Any]]:
+    """Esquema de la etapa, o None si no tiene o la salida estructurada está desactivada"""
+    return ESQUEMAS_ETAPA.get(etapa) if SALIDA_ESTRUCTURADA else None
+
+
+# ============================================================================
+# VALIDACIÓN
+# ============================================================================
+_TIPOS_JSON = {'object': dict, 'array': list, 'string': str}
+
+
+def validar(esquema: Dict[str, Any], valor: Any, ruta: str = '$') -> List[str]:
+    """
+    Valida un valor contra el subconjunto de JSON Schema usado en este módulo
+    (type, properties, required, items, minItems, enum)
+
+    Returns:
+        Lista de errores; vacía si el valor es válido
+    """
+    tipo = esquema.get('type')
+    if tipo and not isinstance(valor, _TIPOS_JSON[tipo]):
+        return [f"{ruta}: se esperaba {tipo}"]
+    if 'enum' in esquema and valor not in esquema['enum']:
+        return [f"{ruta}: valor {valor!r} no permitido"]
+
+    errores = []
+    if tipo == 'object':
+        for clave in esquema.get('required', []):
+            if clave not in valor:
+                errores.append(f"{ruta}.{clave}: falta")
+        for clave, subesquema in esquema.get('properties', {}).items():
+            if clave in valor:
+                errores.extend(validar(subesquema, valor[clave], f"{ruta}.{clave}"))
+    elif tipo == 'array':
+        if len(valor) < esquema.get('minItems', 0):
+            errores.append(f"{ruta}: se esperaban al menos {esquema['minItems']} elementos")
+        if 'items' in esquema:
+            for indice, elemento in enumerate(valor):
+                errores.extend(validar(esquema['items'], elemento, f"{ruta}[{indice}]"))
+    return errores
+
+
+# ============================================================================
+# CONTADORES
+# ============================================================================
+_contadores: Dict[str, Dict[str, int]] = {}
+_contadores_lock = threading.Lock()
+
+
+def registrar_validacion(etapa: str, resultado: str) -> None:
+    """
+    Cuenta el resultado de una respuesta: 'valida', 'invalida' (no cumple el
+    esquema) o 'error_parseo' (no contiene JSON). Los contadores se separan por
+    si la salida estructurada estaba activa, para comparar ambos modos.
+    """
+    modo = 'con_esquema' if SALIDA_ESTRUCTURADA else 'sin_esquema'
+    with _contadores_lock:
+        contador = _contadores.setdefault(f"{modo}:{etapa}", {'valida': 0, 'invalida': 0, 'error_parseo': 0})
+        contador[resultado] += 1
+
+
+def estadisticas_validacion() -> Dict[str, Dict[str, int]]:
+    """Contadores de respuestas válidas, inválidas y sin JSON por modo y etapa"""
+    with _contadores_lock:
+        return {clave: dict(contador) for clave, contador in _contadores.items()}
@@ -3,12 +3,32 @@ Agente LangGraph para el Método Formal Causal
 Procesa conjeturas y genera análisis estructurado basado en el método
 """
 
-from typing import TypedDict, List, Dict, Any
-from langchain_ollama import ChatOllama
-from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, SystemMessage
+from typing import TypedDict, List, Dict, Any, Optional, Annotated, Callable, Iterable, Iterator, Tuple
+from langgraph.graph import StateGraph, START, END
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+import copy
 import json
-import re
+import operator
+import os
+import threading
+from functools import partial
+
+from agentes.cache_respuestas import calcular_clave, obtener_cache
+from agentes.checkpoints import config_informe, obtener_checkpointer
+from agentes.clientes_llm import registro_clientes
+from agentes.coalescencia import COALESCER_PROMPTS, vuelos_llm
+from agentes.contexto import contexto_paquete, registrar_prefill, registrar_prompt
+from agentes.esquemas import RespuestaInvalida, esquema_etapa, registrar_validacion, validar
+from agentes.grafos import registro_grafos
+from agentes.json_incremental import ExtractorElementosIncremental, extraer_json
+from agentes.metricas import metricas
+from agentes.politica_llm import (
+    RESPALDO_ACTIVO, CircuitoAbierto, debe_propagar, es_transitorio, politica_llm, propagar_caidas,
+    registrar_respaldo
+)
+from agentes.registros import obtener_logger
+
+log = obtener_logger('agente')
 
 
 # ============================================================================
@@ -19,6 +39,21 @@ OLLAMA_MODEL = "llama3.1"
 OLLAMA_BASE_URL = "http://127.0.0.1:11434"
 OLLAMA_TEMPERATURE = 0.3  # Balance entre creatividad y coherencia (0.1-1.0)
 
+# Tiempo que Ollama mantiene el modelo (y su caché KV) cargado entre llamadas
+OLLAMA_KEEP_ALIVE = os.environ.get('INFORMES_OLLAMA_KEEP_ALIVE', '30m')
+# Tamaño de contexto; debe bastar para el prompt de 'que_es' o Ollama lo
+# truncará por el principio y se perderá el prefijo compartido
+OLLAMA_NUM_CTX = int(os.environ['INFORMES_OLLAMA_NUM_CTX']) if os.environ.get('INFORMES_OLLAMA_NUM_CTX') else None
+
+MENSAJE_SISTEMA = "Eres un experto en análisis pericial. Responde siempre en el formato JSON solicitado."
+
+# 'clasica': cada etapa tiene su propio prompt (formato original)
+# 'prefijo': todas las etapas comparten mensaje de sistema, conjetura y
+#            paquetes previos en el mismo orden, y la instrucción va al final,
+#            de modo que Ollama reutiliza la caché KV del prefijo entre etapas
+PROMPT_DISPOSICION = os.environ.get('INFORMES_PROMPT_DISPOSICION', 'clasica')
+DISPOSICIONES_PROMPT = ('clasica', 'prefijo')
+
 
 # ============================================================================
 # PROMPTS ESPECIALIZADOS
@@ -186,6 +221,188 @@ Responde ÚNICAMENTE en formato JSON con esta estructura:
 }}
 """
 
+# Re-pregunta cuando la respuesta no es JSON válido o no cumple el esquema de la etapa
+PROMPT_REPARACION = """Tu respuesta anterior no se puede usar: {error}
+
+Repite la respuesta completa corrigiendo el problema. Responde ÚNICAMENTE con un objeto JSON válido con exactamente la estructura pedida, sin texto adicional ni bloques de código.
+"""
+
+# Variantes con contexto reducido para el modo paralelo del grafo
+PROMPT_TECNICAS_INICIAL = """Eres un experto en análisis pericial y normativa técnica. Tu tarea es identificar las MOTIVACIONES TÉCNICAS.
+
+Las motivaciones técnicas son las implícitas en el problema: leyes, normas, regulaciones, estándares técnicos, reglamentos y normativas profesionales que son relevantes para el caso.
+
+CONJETURA INICIAL:
+{conjetura}
+
+Analiza la conjetura y extrae entre 2-4 motivaciones técnicas. Para cada una, proporciona:
+1. Un título descriptivo (máximo 10 palabras)
+2. El contenido detallado explicando qué normativa o estándar técnico aplica (2-4 frases)
+
+Responde ÚNICAMENTE en formato JSON con esta estructura:
+{{
+  "tecnicas": [
+    {{
+      "titulo": "Título de la motivación técnica",
+      "contenido": "Explicación detallada de la normativa aplicable..."
+    }}
+  ]
+}}
+"""
+
+PROMPT_OBJETIVOS_TIPO = """Eres un experto en análisis pericial. Tu tarea es identificar los OBJETIVOS vinculados a las motivaciones {tipo_nombre}.
+
+Los objetivos responden a "¿Para qué?" y deben estar relacionados con las motivaciones identificadas.
+
+CONJETURA INICIAL:
+{conjetura}
+
+MOTIVACIONES {tipo_nombre_mayusculas}:
+{motivaciones}
+
+Genera entre 1-2 objetivos vinculados a estas motivaciones. Para cada objetivo:
+1. Un título claro (máximo 12 palabras)
+2. El tipo de motivación al que pertenece: "{tipo}"
+3. Contenido explicando para qué sirve este objetivo (2-3 frases)
+
+Responde ÚNICAMENTE en formato JSON con esta estructura:
+{{
+  "para_que": [
+    {{
+      "titulo": "Título del objetivo",
+      "tipo": "{tipo}",
+      "contenido": "Explicación del objetivo..."
+    }}
+  ]
+}}
+"""
+
+TIPOS_MOTIVACION = {
+    'preceptivas': 'preceptivas',
+    'tecnicas': 'técnicas',
+    'facultativas': 'facultativas',
+    'progresistas': 'progresistas'
+}
+
+# Análisis completo en una sola llamada (modo 'unico')
+PROMPT_ANALISIS_COMPLETO = """Eres un experto en análisis pericial. Tu tarea es realizar el análisis completo de la conjetura según el Método Formal Causal.
+
+CONJETURA INICIAL:
+{conjetura}
+
+Realiza, en este orden, cada parte del análisis usando las anteriores como contexto:
+1. Motivaciones PRECEPTIVAS (2-4): surgen directamente del enunciado del problema; son los aspectos explícitos y evidentes del caso.
+2. Motivaciones TÉCNICAS (2-4): leyes, normas, regulaciones, estándares técnicos y normativas profesionales relevantes para el caso.
+3. Motivaciones FACULTATIVAS (2-3): la motivación profesional del autor/perito para resolver el problema con sus conocimientos especializados.
+4. Motivaciones PROGRESISTAS (2-3): la aportación al conocimiento actual; aspectos novedosos que pueden generar nuevos precedentes técnicos.
+5. OBJETIVOS (6-8 en total, responden a "¿Para qué?"), repartidos entre los 4 tipos de motivaciones; el tipo debe ser "preceptivas", "tecnicas", "facultativas" o "progresistas".
+6. DEFINICIÓN del problema (responde a "¿Qué es?"): definición precisa (3-5 frases) y contextualización (3-5 frases).
+
+Cada motivación tiene un título descriptivo (máximo 10 palabras) y un contenido de 2-4 frases. Cada objetivo tiene un título (máximo 12 palabras), su tipo y un contenido de 2-3 frases.
+
+Responde ÚNICAMENTE en formato JSON con esta estructura:
+{{
+  "por_que": {{
+    "preceptivas": [{{"titulo": "...", "contenido": "..."}}],
+    "tecnicas": [{{"titulo": "...", "contenido": "..."}}],
+    "facultativas": [{{"titulo": "...", "contenido": "..."}}],
+    "progresistas": [{{"titulo": "...", "contenido": "..."}}]
+  }},
+  "para_que": [
+    {{"titulo": "...", "tipo": "preceptivas", "contenido": "..."}}
+  ],
+  "que_es": {{
+    "contenido": "Definición precisa del problema...",
+    "contexto": "Contextualización del problema..."
+  }}
+}}
+"""
+
+
+# ============================================================================
+# DISPOSICIÓN CON PREFIJO COMPARTIDO
+# ============================================================================
+
+SISTEMA_PREFIJO = """Eres un experto en análisis pericial que aplica el Método Formal Causal. Responde siempre en el formato JSON solicitado.
+
+El análisis de una conjetura se construye en etapas sucesivas:
+- Motivaciones PRECEPTIVAS: surgen directamente del enunciado del problema; son los aspectos explícitos y evidentes de la descripción del caso.
+- Motivaciones TÉCNICAS: implícitas en el problema; leyes, normas, regulaciones, estándares técnicos, reglamentos y normativas profesionales relevantes para el caso.
+- Motivaciones FACULTATIVAS: provienen de la motivación profesional del autor/perito; su interés en resolver el problema con sus conocimientos especializados.
+- Motivaciones PROGRESISTAS: la aportación al conocimiento actual; aspectos novedosos que pueden contribuir a las mejores prácticas o generar nuevos precedentes técnicos.
+- OBJETIVOS (¿Para qué?): relacionados con las motivaciones, cada uno vinculado a su tipo de motivación.
+- DEFINICIÓN (¿Qué es?): definición precisa con las características fundamentales, naturaleza técnica y alcance del problema.
+
+Recibirás la conjetura inicial, los resultados de las etapas ya realizadas y, al final, la tarea de la etapa actual."""
+
+# Paquetes previos, en el orden fijo en que aparecen en el prompt
+TITULOS_CONTEXTO = {
+    'preceptivas': 'MOTIVACIONES PRECEPTIVAS',
+    'tecnicas': 'MOTIVACIONES TÉCNICAS',
+    'facultativas': 'MOTIVACIONES FACULTATIVAS',
+    'progresistas': 'MOTIVACIONES PROGRESISTAS',
+    'objetivos': 'OBJETIVOS'
+}
+
+
+def _cola_instrucciones(plantilla: str, inicio: str) -> str:
+    """Parte final de un prompt clásico (instrucciones y formato JSON), sin placeholders"""
+    return plantilla[plantilla.index(inicio):].format()
+
+
+TAREAS_PREFIJO = {
+    'preceptivas': "Identifica las MOTIVACIONES PRECEPTIVAS.\n\n"
+                   + _cola_instrucciones(PROMPT_PRECEPTIVAS, 'Analiza la conjetura'),
+    'tecnicas': "Identifica las MOTIVACIONES TÉCNICAS.\n\n"
+                + _cola_instrucciones(PROMPT_TECNICAS, 'Analiza la conjetura'),
+    'facultativas': "Identifica las MOTIVACIONES FACULTATIVAS.\n\n"
+                    + _cola_instrucciones(PROMPT_FACULTATIVAS, 'Analiza la conjetura'),
+    'progresistas': "Identifica las MOTIVACIONES PROGRESISTAS.\n\n"
+                    + _cola_instrucciones(PROMPT_PROGRESISTAS, 'Analiza la conjetura'),
+    'objetivos': "Identifica los OBJETIVOS relacionados con cada tipo de motivación.\n\n"
+                 + _cola_instrucciones(PROMPT_OBJETIVOS, 'Genera entre'),
+    'que_es': "Crea la DEFINICIÓN del problema.\n\n"
+              + _cola_instrucciones(PROMPT_QUE_ES, 'Basándote en')
+}
+
+PROMPTS_CLASICOS = {
+    'preceptivas': PROMPT_PRECEPTIVAS,
+    'tecnicas': PROMPT_TECNICAS,
+    'facultativas': PROMPT_FACULTATIVAS,
+    'progresistas': PROMPT_PROGRESISTAS,
+    'objetivos': PROMPT_OBJETIVOS,
+    'que_es': PROMPT_QUE_ES
+}
+
+
+def construir_prompt(etapa: str, conjetura: str, contextos: Dict[str, str],
+                     disposicion: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Ensambla el mensaje de sistema y el prompt de una etapa
+
+    Args:
+        etapa: Paquete a generar (preceptivas ... que_es)
+        conjetura: Conjetura inicial
+        contextos: Paquetes previos ya serializados (ver contexto_paquete)
+        disposicion: 'clasica' o 'prefijo' (por defecto PROMPT_DISPOSICION)
+
+    Returns:
+        (mensaje_sistema, prompt)
+    """
+    disposicion = disposicion or PROMPT_DISPOSICION
+    if disposicion == 'clasica':
+        return MENSAJE_SISTEMA, PROMPTS_CLASICOS[etapa].format(conjetura=conjetura, **contextos)
+    if disposicion != 'prefijo':
+        raise ValueError(f"Disposición de prompt no reconocida: {disposicion}")
+
+    # Todo lo que no depende de la etapa va primero y siempre en el mismo orden
+    partes = [f"CONJETURA INICIAL:\n{conjetura}"]
+    for paquete, titulo in TITULOS_CONTEXTO.items():
+        if paquete in contextos:
+            partes.append(f"{titulo}:\n{contextos[paquete]}")
+    partes.append(f"TAREA:\n{TAREAS_PREFIJO[etapa]}")
+    return SISTEMA_PREFIJO, "\n\n".join(partes)
+
 
 # ============================================================================
 # DEFINICIÓN DEL ESTADO
@@ -202,200 +419,656 @@ class FormalCausalState(TypedDict):
     error: str
 
 
+class FormalCausalStateParalelo(TypedDict):
+    """Estado del grafo en modo paralelo: los objetivos por tipo se acumulan con un reductor"""
+    conjetura: str
+    preceptivas: List[Dict[str, str]]
+    tecnicas: List[Dict[str, str]]
+    facultativas: List[Dict[str, str]]
+    progresistas: List[Dict[str, str]]
+    objetivos: Annotated[List[Dict[str, str]], operator.add]
+    que_es: Dict[str, str]
+    error: str
+
+
 # ============================================================================
 # INICIALIZACIÓN DEL LLM
 # ============================================================================
-def get_llm():
-    """Crea instancia del LLM con configuración de Ollama"""
-    return ChatOllama(
-        model=OLLAMA_MODEL,
-        base_url=OLLAMA_BASE_URL,
-        temperature=OLLAMA_TEMPERATURE
+def get_llm(model: Optional[str] = None, base_url: Optional[str] = None,
+            temperature: Optional[float] = None):
+    """
+    Devuelve el cliente LLM compartido para la configuración indicada
+
+    Los clientes se reutilizan entre peticiones y nodos del grafo (ver
+    agentes.clientes_llm), manteniendo abiertas las conexiones con Ollama.
+    """
+    return registro_clientes.obtener(
+        model or OLLAMA_MODEL,
+        base_url or OLLAMA_BASE_URL,
+        OLLAMA_TEMPERATURE if temperature is None else temperature,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        num_ctx=OLLAMA_NUM_CTX
     )
 
 
+# ============================================================================
+# CONTENIDO DE RESPALDO
+# ============================================================================
+# Análisis genérico que se usa cuando la IA no está disponible (ver
+# generar_informe_demo en app.py y respaldo_etapa)
+ANALISIS_RESPALDO = {
+    'por_que': {
+        'preceptivas': [
+            {
+                'titulo': 'Análisis del enunciado del problema',
+                'contenido': 'Estudio detallado de los elementos esenciales del problema tal como ha sido formulado.'
+            }
+        ],
+        'tecnicas': [
+            {
+                'titulo': 'Marco normativo aplicable',
+                'contenido': 'Identificación de leyes, normas técnicas y estándares profesionales aplicables.'
+            }
+        ],
+        'facultativas': [
+            {
+                'titulo': 'Interés profesional en el caso',
+                'contenido': 'Motivación del perito para aplicar conocimientos especializados.'
+            }
+        ],
+        'progresistas': [
+            {
+                'titulo': 'Aportación al conocimiento técnico',
+                'contenido': 'Identificación de aspectos novedosos del caso.'
+            }
+        ]
+    },
+    'para_que': [
+        {
+            'titulo': 'Establecer la verdad técnica de los hechos',
+            'tipo': 'preceptivas',
+            'contenido': 'Determinar con precisión la naturaleza de los hechos.'
+        }
+    ],
+    'que_es': {
+        'contenido': 'Definición precisa del problema objeto de análisis.',
+        'contexto': 'Contextualización del problema dentro del marco técnico aplicable.'
+    }
+}
+
+
+def respaldo_etapa(etapa: str) -> Optional[Dict[str, Any]]:
+    """
+    Respuesta de la etapa construida con ANALISIS_RESPALDO, con la misma forma
+    que la del LLM, o None si la etapa no tiene respaldo ('completo' no lo
+    tiene: analizar_completo recurre a las etapas individuales)
+    """
+    por_que = ANALISIS_RESPALDO['por_que']
+    if etapa in por_que:
+        return {etapa: copy.deepcopy(por_que[etapa])}
+    if etapa == 'tecnicas_inicial':
+        return {'tecnicas': copy.deepcopy(por_que['tecnicas'])}
+    if etapa == 'objetivos':
+        return {'para_que': copy.deepcopy(ANALISIS_RESPALDO['para_que'])}
+    if etapa.startswith('objetivos_'):
+        tipo = etapa[len('objetivos_'):]
+        return {'para_que': [copy.deepcopy(o) for o in ANALISIS_RESPALDO['para_que'] if o['tipo'] == tipo]}
+    if etapa == 'que_es':
+        return {'que_es': copy.deepcopy(ANALISIS_RESPALDO['que_es'])}
+    return None
+
+
+def contenido_respaldo(etapa: str, default_value: Any) -> Any:
+    """Contenido de respaldo de la etapa si está activo, o el valor por defecto del llamante"""
+    respaldo = respaldo_etapa(etapa) if RESPALDO_ACTIVO else None
+    if respaldo is None:
+        return default_value
+    politica_llm.contar('respaldos')
+    registrar_respaldo(etapa)
+    log.warning("🛟 Usando contenido de respaldo para '%s'", etapa, extra={'etapa': etapa})
+    return respaldo
+
+
 # ============================================================================
 # UTILIDADES
 # ============================================================================
 def extract_json_from_response(response_text: str) -> dict:
-    """Extrae JSON de la respuesta del LLM, manejando markdown y texto adicional"""
+    """
+    Extrae JSON de la respuesta del LLM, manejando markdown, texto adicional
+    y defectos habituales (comas finales, comillas tipográficas, truncado)
+    """
     try:
         # Intentar parsear directamente
         return json.loads(response_text)
     except json.JSONDecodeError:
-        # Buscar JSON entre ```json y ```
-        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(1))
-        
-        # Buscar JSON entre { y }
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
-        
-        raise ValueError("No se pudo extraer JSON de la respuesta")
+        # Primer objeto JSON válido del texto (ver AnalizadorJSON)
+        return extraer_json(response_text)
 
 
-def safe_llm_call(llm, prompt: str, default_value: Any = None) -> Any:
-    """Llama al LLM con manejo de errores"""
+def safe_llm_call(llm, prompt: str, default_value: Any = None, usar_cache: bool = True,
+                  mensaje_sistema: Optional[str] = None, etapa: str = 'llm') -> Any:
+    """
+    Llama al LLM con manejo de errores
+
+    Las respuestas válidas se guardan en la caché persistente, indexadas por
+    modelo, temperatura, mensaje de sistema, prompt y esquema de salida. Con
+    usar_cache=False se fuerza una generación nueva (que sí actualiza la caché).
+    Si la etapa tiene esquema (agentes.esquemas), se pide a Ollama salida
+    estructurada con él y la respuesta que no lo cumpla se descarta.
+
+    La llamada sigue la política de agentes.politica_llm (plazo, reintentos
+    de errores transitorios, re-pregunta con prompt de reparación y
+    cortocircuito); si aun así falla se usa el contenido de respaldo de la
+    etapa (respaldo_etapa) o, si no lo tiene, default_value. Dentro de
+    propagar_caidas una caída de Ollama se relanza para poder reanudar.
+    """
     try:
-        messages = [
-            SystemMessage(content="Eres un experto en análisis pericial. Responde siempre en el formato JSON solicitado."),
-            HumanMessage(content=prompt)
-        ]
-        response = llm.invoke(messages)
-        return extract_json_from_response(response.content)
+        cache, clave, messages, opciones = preparar_llamada(llm, prompt, mensaje_sistema, etapa)
+        if usar_cache:
+            resultado = respuesta_cacheada(cache, clave)
+            if resultado is not None:
+                return resultado
+
+        return politica_llm.ejecutar(
+            lambda: _invocar_compartido(llm, messages, clave, opciones, etapa),
+            lambda response: procesar_respuesta(response, cache, clave, etapa),
+            lambda response, error: _invocar_reparacion(llm, messages, response, error, opciones, etapa)
+        )
     except Exception as e:
-        print(f"Error en llamada al LLM: {e}")
-        return default_value
+        log.error("Error en llamada al LLM: %s", e, extra={'etapa': etapa})
+        if debe_propagar(e):
+            raise
+        return contenido_respaldo(etapa, default_value)
+
+
+def mensajes_reparacion(messages: List[Any], response, error: Exception) -> List[Any]:
+    """Conversación para re-preguntar: la petición, la respuesta inválida y el motivo"""
+    return messages + [
+        AIMessage(content=response.content),
+        HumanMessage(content=PROMPT_REPARACION.format(error=error))
+    ]
+
+
+def _invocar_compartido(llm, messages: List[Any], clave: str, opciones: Dict[str, Any], etapa: str) -> Any:
+    """
+    Invoca al LLM compartiendo la llamada con las peticiones idénticas que ya
+    estén en curso (misma clave de caché), p. ej. dos informes con la misma
+    conjetura. Se comparte la respuesta cruda; cada llamante la parsea por su
+    cuenta para no compartir objetos mutables.
+    """
+    with metricas.medir(etapa, 'llm'):
+        if not COALESCER_PROMPTS:
+            return llm.invoke(messages, **opciones)
+        response, _ = vuelos_llm.ejecutar(clave, lambda: llm.invoke(messages, **opciones))
+        return response
+
+
+def _invocar_reparacion(llm, messages: List[Any], response, error: Exception,
+                        opciones: Dict[str, Any], etapa: str) -> Any:
+    """Re-pregunta al LLM tras una respuesta inválida (ver mensajes_reparacion)"""
+    with metricas.medir(etapa, 'llm'):
+        return llm.invoke(mensajes_reparacion(messages, response, error), **opciones)
+
+
+def preparar_llamada(llm, prompt: str, mensaje_sistema: Optional[str],
+                      etapa: Optional[str] = None) -> Tuple[Any, str, List[Any], Dict[str, Any]]:
+    """
+    Caché, clave de caché, mensajes y opciones de invocación de una llamada
+    (compartido por las variantes síncrona, asíncrona y en streaming)
+    """
+    mensaje_sistema = mensaje_sistema or MENSAJE_SISTEMA
+    esquema = esquema_etapa(etapa) if etapa else None
+    clave = calcular_clave(
+        getattr(llm, 'model', OLLAMA_MODEL),
+        getattr(llm, 'temperature', None),
+        mensaje_sistema,
+        prompt,
+        esquema
+    )
+    messages = [
+        SystemMessage(content=mensaje_sistema),
+        HumanMessage(content=prompt)
+    ]
+    opciones = {'format': esquema} if esquema is not None else {}
+    return obtener_cache(), clave, messages, opciones
+
+
+def respuesta_cacheada(cache, clave: str) -> Optional[Any]:
+    """JSON de la respuesta en caché, o None si no existe o está corrupta"""
+    if cache is None:
+        return None
+    respuesta_cache = cache.obtener(clave)
+    if respuesta_cache is None:
+        return None
+    try:
+        return extract_json_from_response(respuesta_cache)
+    except (ValueError, json.JSONDecodeError):
+        return None  # Entrada corrupta: se regenera y se sobrescribe
+
+
+# Etapas cuya respuesta se acepta aunque no cumpla el esquema completo:
+# analizar_completo valida cada sección y regenera solo las que fallan
+ETAPAS_VALIDACION_POR_SECCION = ('completo',)
+
+
+def validar_respuesta(etapa: str, texto: str) -> Any:
+    """
+    Extrae el JSON de una respuesta y lo valida contra el esquema de su etapa,
+    contando el resultado (ver estadisticas_validacion)
+
+    Raises:
+        ValueError: si la respuesta no contiene JSON
+        RespuestaInvalida: si el JSON no cumple el esquema de la etapa
+    """
+    try:
+        resultado = extract_json_from_response(texto)
+    except (ValueError, json.JSONDecodeError):
+        registrar_validacion(etapa, 'error_parseo')
+        raise
+
+    esquema = esquema_etapa(etapa)
+    errores = validar(esquema, resultado) if esquema is not None else []
+    if errores:
+        registrar_validacion(etapa, 'invalida')
+        if etapa in ETAPAS_VALIDACION_POR_SECCION:
+            return resultado
+        raise RespuestaInvalida(f"Respuesta de '{etapa}' fuera de esquema: {'; '.join(errores[:3])}")
+
+    registrar_validacion(etapa, 'valida')
+    return resultado
+
+
+def procesar_respuesta(response, cache, clave: str, etapa: str) -> Any:
+    """Registra prefill y tokens, extrae y valida el JSON y guarda la respuesta válida en la caché"""
+    metadatos = getattr(response, 'response_metadata', None) or {}
+    registrar_prefill(etapa, metadatos)
+    metricas.registrar_respuesta_llm(etapa, metadatos)
+    with metricas.medir(etapa, 'parseo'):
+        resultado = validar_respuesta(etapa, response.content)
+
+    if cache is not None:
+        cache.guardar(clave, response.content)
+    return resultado
+
+
+def safe_llm_call_stream(llm, prompt: str, clave: str, usar_cache: bool = True,
+                         mensaje_sistema: Optional[str] = None, etapa: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Variante en streaming de safe_llm_call para respuestas con un array de objetos
+
+    Produce cada elemento del array `clave` en cuanto el modelo cierra su
+    objeto. Al terminar se parsea la respuesta completa: si el extractor
+    incremental no detectó algún elemento se entrega al final, y la respuesta
+    válida se guarda en la caché igual que en safe_llm_call.
+    """
+    etapa = etapa or clave
+    cache, clave_cache, messages, opciones = preparar_llamada(llm, prompt, mensaje_sistema, etapa)
+
+    if usar_cache:
+        resultado = respuesta_cacheada(cache, clave_cache)
+        if isinstance(resultado, dict):
+            yield from resultado.get(clave, [])
+            return
+
+    extractor = ExtractorElementosIncremental(clave)
+    entregados = 0
+
+    # Sin reintentos (los elementos ya entregados no se pueden retirar), pero
+    # respetando el cortocircuito y con respaldo si no se llegó a entregar nada.
+    # Solo cuenta como espera al LLM la de cada fragmento, no lo que tarde el consumidor
+    try:
+        politica_llm.contar('llamadas')
+        politica_llm.circuito.permitir()
+        for chunk in metricas.medir_stream(etapa, llm.stream(messages, **opciones)):
+            if getattr(chunk, 'response_metadata', None):
+                # Llega en el último fragmento
+                registrar_prefill(etapa, chunk.response_metadata)
+                metricas.registrar_respuesta_llm(etapa, chunk.response_metadata)
+            for elemento in extractor.feed(chunk.content):
+                entregados += 1
+                yield elemento
+        politica_llm.circuito.exito()
+    except Exception as e:
+        log.error("Error en llamada al LLM (streaming): %s", e, extra={'etapa': etapa})
+        if isinstance(e, CircuitoAbierto):
+            politica_llm.contar('rechazos_circuito')
+        elif es_transitorio(e):
+            politica_llm.circuito.fallo()
+            politica_llm.contar('errores_transitorios')
+        else:
+            politica_llm.circuito.descartar_prueba()
+            politica_llm.contar('errores_permanentes')
+        if not entregados:
+            yield from contenido_respaldo(etapa, {}).get(clave, [])
+        return
+
+    try:
+        with metricas.medir(etapa, 'parseo'):
+            resultado = validar_respuesta(etapa, extractor.texto)
+    except (ValueError, json.JSONDecodeError) as e:
+        log.error("Error en llamada al LLM (streaming): %s", e, extra={'etapa': etapa})
+        if not entregados:
+            yield from contenido_respaldo(etapa, {}).get(clave, [])
+        return
+
+    politica_llm.contar('exitos')
+
+    elementos = resultado.get(clave, []) if isinstance(resultado, dict) else []
+    yield from elementos[entregados:]
+
+    if cache is not None:
+        cache.guardar(clave_cache, extractor.texto)
 
 
 # ============================================================================
 # NODOS DEL GRAFO
 # ============================================================================
+# Paquetes previos que cada etapa recibe como contexto
+CONTEXTO_ETAPA = {
+    'preceptivas': (),
+    'tecnicas': ('preceptivas',),
+    'facultativas': ('preceptivas', 'tecnicas'),
+    'progresistas': ('preceptivas', 'tecnicas', 'facultativas'),
+    'objetivos': ('preceptivas', 'tecnicas', 'facultativas', 'progresistas'),
+    'que_es': ('preceptivas', 'tecnicas', 'facultativas', 'progresistas', 'objetivos')
+}
+
+
+def _contextos_estado(state: FormalCausalState, paquetes: Tuple[str, ...]) -> Dict[str, str]:
+    """Paquetes previos del estado ya serializados para el prompt"""
+    return {paquete: contexto_paquete(paquete, state[paquete]) for paquete in paquetes}
+
+
+def prompt_etapa(state: FormalCausalState, etapa: str) -> Tuple[str, str]:
+    """Construye (mensaje_sistema, prompt) de una etapa con su contexto previo y registra su tamaño"""
+    with metricas.medir(etapa, 'prompt'):
+        mensaje_sistema, prompt = construir_prompt(
+            etapa, state['conjetura'], _contextos_estado(state, CONTEXTO_ETAPA[etapa])
+        )
+    registrar_prompt(etapa, prompt)
+    return mensaje_sistema, prompt
+
+
+def _llamar_etapa(state: FormalCausalState, etapa: str, default_value: Any) -> Any:
+    """Construye el prompt de una etapa y llama al LLM"""
+    llm = get_llm()
+    mensaje_sistema, prompt = prompt_etapa(state, etapa)
+    return safe_llm_call(llm, prompt, default_value, mensaje_sistema=mensaje_sistema, etapa=etapa)
+
+
 def analizar_preceptivas(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Analiza motivaciones preceptivas"""
-    print("🔍 Analizando motivaciones PRECEPTIVAS...")
+    log.debug("🔍 Analizando motivaciones PRECEPTIVAS...", extra={'etapa': 'preceptivas'})
     
-    llm = get_llm()
-    prompt = PROMPT_PRECEPTIVAS.format(conjetura=state['conjetura'])
-    
-    result = safe_llm_call(llm, prompt, {"preceptivas": []})
+    result = _llamar_etapa(state, 'preceptivas', {"preceptivas": []})
     state['preceptivas'] = result.get('preceptivas', [])
     
-    print(f"✅ Encontradas {len(state['preceptivas'])} motivaciones preceptivas")
+    log.info("✅ Encontradas %d motivaciones preceptivas", len(state['preceptivas']), extra={'etapa': 'preceptivas'})
     return state
 
 
 def analizar_tecnicas(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Analiza motivaciones técnicas"""
-    print("🔍 Analizando motivaciones TÉCNICAS...")
-    
-    llm = get_llm()
-    preceptivas_str = json.dumps(state['preceptivas'], indent=2, ensure_ascii=False)
-    prompt = PROMPT_TECNICAS.format(
-        conjetura=state['conjetura'],
-        preceptivas=preceptivas_str
-    )
+    log.debug("🔍 Analizando motivaciones TÉCNICAS...", extra={'etapa': 'tecnicas'})
     
-    result = safe_llm_call(llm, prompt, {"tecnicas": []})
+    result = _llamar_etapa(state, 'tecnicas', {"tecnicas": []})
     state['tecnicas'] = result.get('tecnicas', [])
     
-    print(f"✅ Encontradas {len(state['tecnicas'])} motivaciones técnicas")
+    log.info("✅ Encontradas %d motivaciones técnicas", len(state['tecnicas']), extra={'etapa': 'tecnicas'})
     return state
 
 
 def analizar_facultativas(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Analiza motivaciones facultativas"""
-    print("🔍 Analizando motivaciones FACULTATIVAS...")
+    log.debug("🔍 Analizando motivaciones FACULTATIVAS...", extra={'etapa': 'facultativas'})
     
-    llm = get_llm()
-    preceptivas_str = json.dumps(state['preceptivas'], indent=2, ensure_ascii=False)
-    tecnicas_str = json.dumps(state['tecnicas'], indent=2, ensure_ascii=False)
-    
-    prompt = PROMPT_FACULTATIVAS.format(
-        conjetura=state['conjetura'],
-        preceptivas=preceptivas_str,
-        tecnicas=tecnicas_str
-    )
-    
-    result = safe_llm_call(llm, prompt, {"facultativas": []})
+    result = _llamar_etapa(state, 'facultativas', {"facultativas": []})
     state['facultativas'] = result.get('facultativas', [])
     
-    print(f"✅ Encontradas {len(state['facultativas'])} motivaciones facultativas")
+    log.info("✅ Encontradas %d motivaciones facultativas", len(state['facultativas']), extra={'etapa': 'facultativas'})
     return state
 
 
 def analizar_progresistas(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Analiza motivaciones progresistas"""
-    print("🔍 Analizando motivaciones PROGRESISTAS...")
-    
-    llm = get_llm()
-    preceptivas_str = json.dumps(state['preceptivas'], indent=2, ensure_ascii=False)
-    tecnicas_str = json.dumps(state['tecnicas'], indent=2, ensure_ascii=False)
-    facultativas_str = json.dumps(state['facultativas'], indent=2, ensure_ascii=False)
-    
-    prompt = PROMPT_PROGRESISTAS.format(
-        conjetura=state['conjetura'],
-        preceptivas=preceptivas_str,
-        tecnicas=tecnicas_str,
-        facultativas=facultativas_str
-    )
+    log.debug("🔍 Analizando motivaciones PROGRESISTAS...", extra={'etapa': 'progresistas'})
     
-    result = safe_llm_call(llm, prompt, {"progresistas": []})
+    result = _llamar_etapa(state, 'progresistas', {"progresistas": []})
     state['progresistas'] = result.get('progresistas', [])
     
-    print(f"✅ Encontradas {len(state['progresistas'])} motivaciones progresistas")
+    log.info("✅ Encontradas %d motivaciones progresistas", len(state['progresistas']), extra={'etapa': 'progresistas'})
     return state
 
 
 def analizar_objetivos(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Analiza objetivos (¿Para qué?)"""
-    print("🔍 Analizando OBJETIVOS (¿Para qué?)...")
-    
-    llm = get_llm()
-    preceptivas_str = json.dumps(state['preceptivas'], indent=2, ensure_ascii=False)
-    tecnicas_str = json.dumps(state['tecnicas'], indent=2, ensure_ascii=False)
-    facultativas_str = json.dumps(state['facultativas'], indent=2, ensure_ascii=False)
-    progresistas_str = json.dumps(state['progresistas'], indent=2, ensure_ascii=False)
+    log.debug("🔍 Analizando OBJETIVOS (¿Para qué?)...", extra={'etapa': 'objetivos'})
     
-    prompt = PROMPT_OBJETIVOS.format(
-        conjetura=state['conjetura'],
-        preceptivas=preceptivas_str,
-        tecnicas=tecnicas_str,
-        facultativas=facultativas_str,
-        progresistas=progresistas_str
-    )
-    
-    result = safe_llm_call(llm, prompt, {"para_que": []})
+    result = _llamar_etapa(state, 'objetivos', {"para_que": []})
     state['objetivos'] = result.get('para_que', [])
     
-    print(f"✅ Encontrados {len(state['objetivos'])} objetivos")
+    log.info("✅ Encontrados %d objetivos", len(state['objetivos']), extra={'etapa': 'objetivos'})
     return state
 
 
 def analizar_que_es(state: FormalCausalState) -> FormalCausalState:
     """Nodo: Define qué es el problema"""
-    print("🔍 Definiendo QUÉ ES el problema...")
-    
-    llm = get_llm()
-    preceptivas_str = json.dumps(state['preceptivas'], indent=2, ensure_ascii=False)
-    tecnicas_str = json.dumps(state['tecnicas'], indent=2, ensure_ascii=False)
-    facultativas_str = json.dumps(state['facultativas'], indent=2, ensure_ascii=False)
-    progresistas_str = json.dumps(state['progresistas'], indent=2, ensure_ascii=False)
-    objetivos_str = json.dumps(state['objetivos'], indent=2, ensure_ascii=False)
-    
-    prompt = PROMPT_QUE_ES.format(
-        conjetura=state['conjetura'],
-        preceptivas=preceptivas_str,
-        tecnicas=tecnicas_str,
-        facultativas=facultativas_str,
-        progresistas=progresistas_str,
-        objetivos=objetivos_str
-    )
+    log.debug("🔍 Definiendo QUÉ ES el problema...", extra={'etapa': 'que_es'})
     
-    result = safe_llm_call(llm, prompt, {"que_es": {"contenido": "", "contexto": ""}})
+    result = _llamar_etapa(state, 'que_es', {"que_es": {"contenido": "", "contexto": ""}})
     state['que_es'] = result.get('que_es', {"contenido": "", "contexto": ""})
     
-    print("✅ Definición completada")
+    log.info("✅ Definición completada", extra={'etapa': 'que_es'})
+    return state
+
+
+# ============================================================================
+# NODOS DEL MODO PARALELO
+# ============================================================================
+def prompt_tecnicas_inicial(state: FormalCausalState) -> Tuple[str, str]:
+    with metricas.medir('tecnicas_inicial', 'prompt'):
+        if PROMPT_DISPOSICION == 'prefijo':
+            # Sin paquetes previos el prompt comparte prefijo con el de preceptivas
+            mensaje_sistema, prompt = construir_prompt('tecnicas', state['conjetura'], {})
+        else:
+            mensaje_sistema, prompt = MENSAJE_SISTEMA, PROMPT_TECNICAS_INICIAL.format(conjetura=state['conjetura'])
+    registrar_prompt('tecnicas_inicial', prompt)
+    return mensaje_sistema, prompt
+
+
+def prompt_objetivos_tipo(state: FormalCausalState, tipo: str) -> str:
+    with metricas.medir(f'objetivos_{tipo}', 'prompt'):
+        prompt = PROMPT_OBJETIVOS_TIPO.format(
+            conjetura=state['conjetura'],
+            tipo=tipo,
+            tipo_nombre=TIPOS_MOTIVACION[tipo],
+            tipo_nombre_mayusculas=TIPOS_MOTIVACION[tipo].upper(),
+            motivaciones=contexto_paquete(tipo, state[tipo])
+        )
+    registrar_prompt(f'objetivos_{tipo}', prompt)
+    return prompt
+
+
+def objetivos_de_tipo(result: Dict[str, Any], tipo: str) -> List[Dict[str, str]]:
+    """Objetivos de la respuesta, forzando el tipo de la rama que los generó"""
+    return [{**objetivo, 'tipo': tipo} for objetivo in result.get('para_que', [])
+            if isinstance(objetivo, dict)]
+
+
+def analizar_tecnicas_inicial(state: FormalCausalState) -> Dict[str, Any]:
+    """Nodo paralelo: primera pasada de motivaciones técnicas sin depender de las preceptivas"""
+    log.debug("🔍 Analizando motivaciones TÉCNICAS (sin contexto previo)...", extra={'etapa': 'tecnicas_inicial'})
+
+    llm = get_llm()
+    mensaje_sistema, prompt = prompt_tecnicas_inicial(state)
+    result = safe_llm_call(llm, prompt, {"tecnicas": []}, mensaje_sistema=mensaje_sistema, etapa='tecnicas_inicial')
+    tecnicas = result.get('tecnicas', [])
+
+    log.info("✅ Encontradas %d motivaciones técnicas", len(tecnicas), extra={'etapa': 'tecnicas_inicial'})
+    return {'tecnicas': tecnicas}
+
+
+def analizar_progresistas_paralelo(state: FormalCausalState) -> Dict[str, Any]:
+    """Nodo paralelo: progresistas concurrentes con facultativas (sin conocer estas últimas)"""
+    return {'progresistas': analizar_progresistas({**state, 'facultativas': []})['progresistas']}
+
+
+def crear_nodo_objetivos_tipo(tipo: str) -> Callable[[FormalCausalState], Dict[str, Any]]:
+    """Crea el nodo que genera los objetivos de un único tipo de motivación"""
+
+    def analizar_objetivos_tipo(state: FormalCausalState) -> Dict[str, Any]:
+        log.debug("🔍 Analizando OBJETIVOS de motivaciones %s...", tipo.upper(), extra={'etapa': f'objetivos_{tipo}'})
+
+        llm = get_llm()
+        prompt = prompt_objetivos_tipo(state, tipo)
+        result = safe_llm_call(llm, prompt, {"para_que": []}, etapa=f'objetivos_{tipo}')
+        objetivos = objetivos_de_tipo(result, tipo)
+
+        log.info("✅ Encontrados %d objetivos %s", len(objetivos), tipo, extra={'etapa': f'objetivos_{tipo}'})
+        return {'objetivos': objetivos}
+
+    return analizar_objetivos_tipo
+
+
+def _actualizacion_parcial(nodo: Callable, clave: str) -> Callable[[FormalCausalState], Dict[str, Any]]:
+    """Adapta un nodo secuencial para que solo escriba su clave (necesario en ramas concurrentes)"""
+
+    def ejecutar(state: FormalCausalState) -> Dict[str, Any]:
+        return {clave: nodo(dict(state))[clave]}
+
+    return ejecutar
+
+
+# ============================================================================
+# ANÁLISIS EN UNA SOLA LLAMADA
+# ============================================================================
+def _elemento_valido(elemento: Any, con_tipo: bool = False) -> bool:
+    if not isinstance(elemento, dict):
+        return False
+    if not all(isinstance(elemento.get(campo), str) and elemento[campo].strip()
+               for campo in ('titulo', 'contenido')):
+        return False
+    return not con_tipo or elemento.get('tipo') in TIPOS_MOTIVACION
+
+
+def validar_seccion(paquete: str, valor: Any) -> bool:
+    """
+    Comprueba que una sección tiene la misma forma que produce su etapa:
+    lista no vacía de {titulo, contenido} (objetivos también con 'tipo'
+    válido) o, para 'que_es', {contenido, contexto} con definición no vacía
+    """
+    if paquete == 'que_es':
+        return (isinstance(valor, dict) and isinstance(valor.get('contexto'), str)
+                and isinstance(valor.get('contenido'), str) and bool(valor['contenido'].strip()))
+    return (isinstance(valor, list) and bool(valor)
+            and all(_elemento_valido(elemento, con_tipo=paquete == 'objetivos') for elemento in valor))
+
+
+def _secciones_respuesta_completa(result: Any) -> Dict[str, Any]:
+    """Extrae de la respuesta combinada las secciones con las claves del estado"""
+    if not isinstance(result, dict):
+        return {}
+    por_que = result.get('por_que') if isinstance(result.get('por_que'), dict) else {}
+    secciones = {tipo: por_que.get(tipo) for tipo in TIPOS_MOTIVACION}
+    secciones['objetivos'] = result.get('para_que')
+    secciones['que_es'] = result.get('que_es')
+    return secciones
+
+
+def prompt_analisis_completo(state: FormalCausalState) -> str:
+    with metricas.medir('completo', 'prompt'):
+        prompt = PROMPT_ANALISIS_COMPLETO.format(conjetura=state['conjetura'])
+    registrar_prompt('completo', prompt)
+    return prompt
+
+
+def aplicar_secciones(state: FormalCausalState, result: Any) -> List[str]:
+    """Copia al estado las secciones válidas de la respuesta combinada y devuelve las pendientes"""
+    secciones = _secciones_respuesta_completa(result)
+    pendientes = []
+    for paquete in CONTEXTO_ETAPA:
+        if validar_seccion(paquete, secciones.get(paquete)):
+            state[paquete] = secciones[paquete]
+        else:
+            pendientes.append(paquete)
+
+    if pendientes:
+        log.warning("⚠️ Secciones ausentes o mal formadas, se generan por etapa: %s", ', '.join(pendientes),
+                    extra={'etapa': 'completo'})
+    return pendientes
+
+
+def analizar_completo(state: FormalCausalState) -> FormalCausalState:
+    """
+    Genera todo el análisis con una única llamada al LLM
+
+    Cada sección se valida con validar_seccion; solo las que faltan o no
+    tienen la forma esperada se regeneran con su nodo secuencial, que recibe
+    como contexto las secciones ya disponibles.
+    """
+    log.debug("🔍 Generando el análisis COMPLETO en una sola llamada...", extra={'etapa': 'completo'})
+
+    llm = get_llm()
+    prompt = prompt_analisis_completo(state)
+    pendientes = aplicar_secciones(state, safe_llm_call(llm, prompt, None, etapa='completo'))
+
+    for paquete in pendientes:
+        state = NODOS_SECUENCIALES[paquete](state)
+
+    log.info("✅ Análisis completo (%d/%d secciones en una llamada)",
+             len(NODOS_SECUENCIALES) - len(pendientes), len(NODOS_SECUENCIALES), extra={'etapa': 'completo'})
     return state
 
 
 # ============================================================================
 # CONSTRUCCIÓN DEL GRAFO
 # ============================================================================
-def crear_grafo_formal_causal() -> StateGraph:
-    """Crea y configura el grafo de análisis del Método Formal Causal"""
-    
+MODOS_GRAFO = ('secuencial', 'paralelo')
+MODOS_ANALISIS = MODOS_GRAFO + ('unico',)
+
+# Nodos del flujo secuencial, en orden; el modo 'unico' los usa como respaldo
+NODOS_SECUENCIALES = {
+    'preceptivas': analizar_preceptivas,
+    'tecnicas': analizar_tecnicas,
+    'facultativas': analizar_facultativas,
+    'progresistas': analizar_progresistas,
+    'objetivos': analizar_objetivos,
+    'que_es': analizar_que_es
+}
+
+
+def crear_grafo_formal_causal(modo: str = 'secuencial', checkpointer: Optional[Any] = None) -> StateGraph:
+    """
+    Crea y compila el grafo de análisis del Método Formal Causal
+
+    Cada llamada compila un grafo nuevo; para analizar conjeturas se usa el
+    compilado compartido de registro_grafos (ver obtener_grafo).
+
+    Args:
+        modo: 'secuencial' (seis nodos encadenados, cada uno con todo el
+              contexto previo) o 'paralelo' (ramas concurrentes con
+              contexto reducido, ver crear_grafo_paralelo)
+        checkpointer: Guardado de estado entre nodos de LangGraph (opcional)
+    """
+    if modo == 'paralelo':
+        return crear_grafo_paralelo(checkpointer)
+    if modo != 'secuencial':
+        raise ValueError(f"Modo de grafo no reconocido: {modo}")
+    return compilar_grafo_secuencial(NODOS_SECUENCIALES, checkpointer)
+
+
+def obtener_grafo(modo: str = 'secuencial', checkpointer: Optional[Any] = None) -> StateGraph:
+    """Grafo compilado compartido para el modo y checkpointer (se compila una vez por proceso)"""
+    return registro_grafos.obtener(modo, checkpointer)
+
+
+def compilar_grafo_secuencial(nodos: Dict[str, Callable], checkpointer: Optional[Any] = None) -> StateGraph:
+    """Compila el flujo secuencial con los nodos indicados (síncronos o asíncronos)"""
     workflow = StateGraph(FormalCausalState)
     
     # Agregar nodos
-    workflow.add_node("preceptivas", analizar_preceptivas)
-    workflow.add_node("tecnicas", analizar_tecnicas)
-    workflow.add_node("facultativas", analizar_facultativas)
-    workflow.add_node("progresistas", analizar_progresistas)
-    workflow.add_node("objetivos", analizar_objetivos)
-    workflow.add_node("que_es", analizar_que_es)
+    for nombre, nodo in nodos.items():
+        workflow.add_node(nombre, nodo)
     
     # Definir flujo secuencial
     workflow.set_entry_point("preceptivas")
@@ -406,28 +1079,330 @@ def crear_grafo_formal_causal() -> StateGraph:
     workflow.add_edge("objetivos", "que_es")
     workflow.add_edge("que_es", END)
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def crear_grafo_paralelo(checkpointer: Optional[Any] = None) -> StateGraph:
+    """
+    Crea el grafo en modo paralelo
+
+    Flujo (4 rondas de LLM en lugar de 6):
+        1. preceptivas  ||  tecnicas (primera pasada sin contexto)
+        2. facultativas ||  progresistas (sin facultativas)
+        3. objetivos por tipo (4 ramas, unidas con el reductor de 'objetivos')
+        4. que_es
+    """
+    nodos = {
+        'preceptivas': _actualizacion_parcial(analizar_preceptivas, 'preceptivas'),
+        'tecnicas': analizar_tecnicas_inicial,
+        'facultativas': _actualizacion_parcial(analizar_facultativas, 'facultativas'),
+        'progresistas': analizar_progresistas_paralelo,
+        **{f'objetivos_{tipo}': crear_nodo_objetivos_tipo(tipo) for tipo in TIPOS_MOTIVACION},
+        'que_es': _actualizacion_parcial(analizar_que_es, 'que_es')
+    }
+    return compilar_grafo_paralelo(nodos, checkpointer)
+
+
+def compilar_grafo_paralelo(nodos: Dict[str, Callable], checkpointer: Optional[Any] = None) -> StateGraph:
+    """Compila el flujo paralelo con los nodos indicados (síncronos o asíncronos)"""
+    workflow = StateGraph(FormalCausalStateParalelo)
+
+    for nombre, nodo in nodos.items():
+        workflow.add_node(nombre, nodo)
+
+    nodos_objetivos = [f"objetivos_{tipo}" for tipo in TIPOS_MOTIVACION]
+
+    workflow.add_edge(START, "preceptivas")
+    workflow.add_edge(START, "tecnicas")
+    workflow.add_edge(["preceptivas", "tecnicas"], "facultativas")
+    workflow.add_edge(["preceptivas", "tecnicas"], "progresistas")
+    for nodo in nodos_objetivos:
+        workflow.add_edge(["facultativas", "progresistas"], nodo)
+    workflow.add_edge(nodos_objetivos, "que_es")
+    workflow.add_edge("que_es", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+registro_grafos.registrar('secuencial', partial(crear_grafo_formal_causal, 'secuencial'))
+registro_grafos.registrar('paralelo', partial(crear_grafo_formal_causal, 'paralelo'))
+
+
+# ============================================================================
+# GENERACIÓN POR PAQUETES (FLUJO WEB)
+# ============================================================================
+PAQUETES = ('preceptivas', 'tecnicas', 'facultativas', 'progresistas', 'objetivos', 'que_es')
+
+
+def analisis_vacio() -> Dict[str, Any]:
+    """Estructura de análisis sin ningún paquete generado"""
+    return {
+        'por_que': {
+            'preceptivas': [],
+            'tecnicas': [],
+            'facultativas': [],
+            'progresistas': []
+        },
+        'para_que': [],
+        'que_es': {}
+    }
+
+
+def obtener_resultado_paquete(analisis: Dict[str, Any], paquete: str) -> Any:
+    """Devuelve el contenido ya generado de un paquete (vacío si aún no existe)"""
+    if paquete == 'objetivos':
+        return analisis['para_que']
+    if paquete == 'que_es':
+        return analisis['que_es']
+    return analisis['por_que'][paquete]
+
+
+# Clave del JSON de respuesta del LLM para cada paquete
+CLAVES_RESPUESTA = {
+    'preceptivas': 'preceptivas',
+    'tecnicas': 'tecnicas',
+    'facultativas': 'facultativas',
+    'progresistas': 'progresistas',
+    'objetivos': 'para_que',
+    'que_es': 'que_es'
+}
+
+
+def construir_prompt_paquete(paquete: str, conjetura: str, analisis: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Ensambla el prompt de un paquete con los paquetes previos como contexto
+
+    Returns:
+        (mensaje_sistema, prompt), ver construir_prompt
+    """
+    if paquete not in PAQUETES:
+        raise ValueError(f"Paquete no reconocido: {paquete}")
+
+    with metricas.medir(paquete, 'prompt'):
+        contextos = {
+            previo: contexto_paquete(previo, obtener_resultado_paquete(analisis, previo))
+            for previo in PAQUETES[:PAQUETES.index(paquete)]
+        }
+        return construir_prompt(paquete, conjetura, contextos)
+
+
+def guardar_resultado_paquete(analisis: Dict[str, Any], paquete: str, valor: Any) -> None:
+    """Guarda el contenido de un paquete en la estructura de análisis"""
+    if paquete == 'objetivos':
+        analisis['para_que'] = valor
+    elif paquete == 'que_es':
+        analisis['que_es'] = valor
+    else:
+        analisis['por_que'][paquete] = valor
+
+
+def generar_paquete(paquete: str, conjetura: str, analisis: Dict[str, Any]) -> Any:
+    """
+    Genera un paquete del análisis usando como contexto los paquetes previos
+    y lo guarda en la estructura de análisis (por_que / para_que / que_es)
+
+    Returns:
+        Lista de motivaciones u objetivos, o diccionario de definición para 'que_es'
+    """
+    mensaje_sistema, prompt = construir_prompt_paquete(paquete, conjetura, analisis)
+    registrar_prompt(paquete, prompt)
+    llm = get_llm()
+
+    if paquete == 'objetivos':
+        result = safe_llm_call(llm, prompt, {"para_que": []}, mensaje_sistema=mensaje_sistema, etapa=paquete)
+        valor = result.get('para_que', [])
+    elif paquete == 'que_es':
+        result = safe_llm_call(llm, prompt, {"que_es": {}}, mensaje_sistema=mensaje_sistema, etapa=paquete)
+        valor = result.get('que_es', {})
+    else:
+        result = safe_llm_call(llm, prompt, None, mensaje_sistema=mensaje_sistema, etapa=paquete)
+
+        # Si el resultado es None o no es dict, usar array vacío
+        if result is None or not isinstance(result, dict):
+            log.warning("⚠️ LLM no devolvió resultado válido para %s", paquete, extra={'etapa': paquete})
+            valor = []
+        elif paquete in result:
+            valor = result[paquete]
+        else:
+            log.warning("⚠️ La clave '%s' no está en el resultado del LLM", paquete,
+                        extra={'etapa': paquete, 'claves': list(result)})
+            valor = []
+
+    guardar_resultado_paquete(analisis, paquete, valor)
+    return valor
+
+
+def generar_paquete_stream(paquete: str, conjetura: str, analisis: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Genera un paquete de motivaciones u objetivos en streaming
+
+    Produce cada elemento en cuanto el modelo lo completa y, al terminar,
+    guarda la lista completa en la estructura de análisis.
+    """
+    if paquete == 'que_es':
+        raise ValueError("El paquete 'que_es' no es una lista y no admite streaming")
+
+    mensaje_sistema, prompt = construir_prompt_paquete(paquete, conjetura, analisis)
+    registrar_prompt(paquete, prompt)
+    elementos = []
+    llm = get_llm()
+    for elemento in safe_llm_call_stream(llm, prompt, CLAVES_RESPUESTA[paquete],
+                                         mensaje_sistema=mensaje_sistema, etapa=paquete):
+        elementos.append(elemento)
+        yield elemento
+
+    guardar_resultado_paquete(analisis, paquete, elementos)
+
+
+# ============================================================================
+# CHECKPOINTS COMPARTIDOS CON EL FLUJO WEB
+# ============================================================================
+_sincronizacion_lock = threading.Lock()
+
+
+def paquete_en_checkpoint(informe_id: str, paquete: str) -> Any:
+    """
+    Resultado de un paquete guardado en los checkpoints del informe (p. ej. por
+    un análisis que se interrumpió antes de terminar), o None si no está
+    """
+    checkpointer = obtener_checkpointer()
+    if checkpointer is None:
+        return None
+    valores = obtener_grafo('secuencial', checkpointer).get_state(config_informe(informe_id)).values
+    return valores.get(paquete) or None
+
+
+def sincronizar_checkpoint(informe_id: str, conjetura: str, analisis: Dict[str, Any],
+                           pendientes: Iterable[str] = ()) -> None:
+    """
+    Registra en los checkpoints del informe los paquetes ya generados por el
+    flujo web, como si los hubiera ejecutado el grafo secuencial, para que
+    procesar_conjetura(informe_id=...) continúe desde ellos
+
+    Los paquetes se registran en el orden del grafo: uno generado antes que
+    sus previos se registra cuando estos lleguen. Los `pendientes` de volver a
+    generar (contenido de respaldo, etapas obsoletas) no se registran, ni
+    tampoco los que les siguen.
+    """
+    checkpointer = obtener_checkpointer()
+    if checkpointer is None:
+        return
+    grafo = obtener_grafo('secuencial', checkpointer)
+    config = config_informe(informe_id)
+    try:
+        with _sincronizacion_lock:
+            estado = grafo.get_state(config)
+            if not estado.values:
+                grafo.update_state(config, estado_inicial_analisis(conjetura), as_node=START)
+                estado = grafo.get_state(config)
+            while estado.next:
+                paquete = estado.next[0]
+                valor = obtener_resultado_paquete(analisis, paquete)
+                if not valor or paquete in pendientes:
+                    break
+                grafo.update_state(config, {paquete: valor}, as_node=paquete)
+                estado = grafo.get_state(config)
+    except Exception as e:
+        # Los checkpoints son auxiliares: el paquete ya está guardado en el almacén
+        log.warning("⚠️ No se pudo actualizar el checkpoint: %s", e, extra={'informe_id': informe_id})
+
+
+def reiniciar_checkpoint(informe_id: str, conjetura: str, analisis: Dict[str, Any],
+                         pendientes: Iterable[str] = ()) -> None:
+    """Rehace los checkpoints del informe a partir del análisis (tras editarlo o regenerar etapas)"""
+    checkpointer = obtener_checkpointer()
+    if checkpointer is None:
+        return
+    with _sincronizacion_lock:
+        checkpointer.delete_thread(config_informe(informe_id)['configurable']['thread_id'])
+    sincronizar_checkpoint(informe_id, conjetura, analisis, pendientes)
+
+
+def preparar_reanudacion(estado: Any, estado_inicial: Dict[str, Any], thread_id: str,
+                         checkpointer: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Decide cómo ejecutar un grafo con checkpoints a partir de su último estado
+
+    Returns:
+        (entrada, resultado): entrada para invoke (None para reanudar desde el
+        checkpoint) o, si el análisis ya terminó, su estado final como resultado
+    """
+    if estado.values and estado.values.get('conjetura') != estado_inicial['conjetura']:
+        # El informe cambió de conjetura: sus checkpoints ya no sirven
+        checkpointer.delete_thread(thread_id)
+        return estado_inicial, None
+    if not estado.values:
+        return estado_inicial, None
+    if not estado.next:
+        log.info("♻️ Análisis ya completado según los checkpoints")
+        return None, estado.values
+    log.info("⏯️ Reanudando análisis desde el checkpoint", extra={'pendientes': list(estado.next)})
+    return None, None
+
+
+def _ejecutar_con_checkpoints(modo: str, estado_inicial: Dict[str, Any], informe_id: str,
+                              checkpointer: Any) -> Dict[str, Any]:
+    grafo = obtener_grafo(modo, checkpointer)
+    config = config_informe(informe_id, modo)
+    thread_id = config['configurable']['thread_id']
+    entrada, resultado = preparar_reanudacion(grafo.get_state(config), estado_inicial, thread_id, checkpointer)
+    if resultado is None:
+        with propagar_caidas():
+            resultado = grafo.invoke(entrada, config)
+        checkpointer.podar(thread_id)
+    return resultado
 
 
 # ============================================================================
 # FUNCIÓN PRINCIPAL
 # ============================================================================
-def procesar_conjetura(conjetura: str) -> Dict[str, Any]:
+def procesar_conjetura(conjetura: str, modo: str = 'secuencial',
+                       informe_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Procesa una conjetura usando el Método Formal Causal con LangGraph
     
     Args:
         conjetura: Texto de la conjetura inicial del usuario
+        modo: 'secuencial' o 'paralelo' (ver crear_grafo_formal_causal), o
+              'unico' para generar todo con una sola llamada (ver analizar_completo)
+        informe_id: Si se indica, el grafo guarda un checkpoint tras cada etapa
+                    (agentes.checkpoints). Si Ollama deja de responder, el
+                    análisis falla en lugar de usar el respaldo, y volver a
+                    llamar con el mismo informe lo reanuda desde la última
+                    etapa completada.
         
     Returns:
         Diccionario con todo el análisis estructurado
     """
-    print(f"\n{'='*60}")
-    print("🚀 INICIANDO ANÁLISIS DEL MÉTODO FORMAL CAUSAL")
-    print(f"{'='*60}\n")
+    log.info("🚀 Iniciando análisis del Método Formal Causal", extra={'modo': modo})
     
-    # Crear estado inicial
-    estado_inicial = {
+    estado_inicial = estado_inicial_analisis(conjetura)
+    checkpointer = obtener_checkpointer() if informe_id and modo != 'unico' else None
+    
+    try:
+        if modo == 'unico':
+            resultado = analizar_completo(estado_inicial)
+        elif checkpointer is not None:
+            resultado = _ejecutar_con_checkpoints(modo, estado_inicial, informe_id, checkpointer)
+        else:
+            # Ejecutar el grafo
+            grafo = obtener_grafo(modo)
+            resultado = grafo.invoke(estado_inicial)
+        return resultado_analisis(resultado, modo)
+        
+    except Exception as e:
+        log.exception("❌ Error en el análisis: %s", e)
+        return {
+            'success': False,
+            'error': str(e),
+            'analisis': None,
+            'reanudable': checkpointer is not None
+        }
+
+
+def estado_inicial_analisis(conjetura: str) -> Dict[str, Any]:
+    """Estado inicial del grafo para una conjetura"""
+    return {
         'conjetura': conjetura,
         'preceptivas': [],
         'tecnicas': [],
@@ -437,37 +1412,33 @@ def procesar_conjetura(conjetura: str) -> Dict[str, Any]:
         'que_es': {},
         'error': ''
     }
+
+
+def resultado_analisis(resultado: Dict[str, Any], modo: str) -> Dict[str, Any]:
+    """Convierte el estado final del grafo en la respuesta de procesar_conjetura"""
+    if modo == 'paralelo':
+        # Las ramas de objetivos terminan en cualquier orden: se agrupan por tipo
+        orden_tipos = list(TIPOS_MOTIVACION)
+        resultado['objetivos'] = sorted(
+            resultado['objetivos'],
+            key=lambda objetivo: orden_tipos.index(objetivo['tipo'])
+        )
     
-    try:
-        # Ejecutar el grafo
-        grafo = crear_grafo_formal_causal()
-        resultado = grafo.invoke(estado_inicial)
-        
-        print(f"\n{'='*60}")
-        print("✅ ANÁLISIS COMPLETADO CON ÉXITO")
-        print(f"{'='*60}\n")
-        
-        return {
-            'success': True,
-            'analisis': {
-                'por_que': {
-                    'preceptivas': resultado['preceptivas'],
-                    'tecnicas': resultado['tecnicas'],
-                    'facultativas': resultado['facultativas'],
-                    'progresistas': resultado['progresistas']
-                },
-                'para_que': resultado['objetivos'],
-                'que_es': resultado['que_es']
-            }
-        }
-        
-    except Exception as e:
-        print(f"\n❌ ERROR EN EL ANÁLISIS: {e}\n")
-        return {
-            'success': False,
-            'error': str(e),
-            'analisis': None
+    log.info("✅ Análisis completado con éxito", extra={'modo': modo})
+    
+    return {
+        'success': True,
+        'analisis': {
+            'por_que': {
+                'preceptivas': resultado['preceptivas'],
+                'tecnicas': resultado['tecnicas'],
+                'facultativas': resultado['facultativas'],
+                'progresistas': resultado['progresistas']
+            },
+            'para_que': resultado['objetivos'],
+            'que_es': resultado['que_es']
         }
+    }
 
 
 # ============================================================================
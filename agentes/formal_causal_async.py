@@ -0,0 +1,243 @@
+"""
+Camino asíncrono del agente del Método Formal Causal
+Usa los mismos prompts, caché y topología de grafo que
+agentes.formal_causal_agent, pero las llamadas al LLM se hacen con ainvoke y
+un semáforo global limita las peticiones simultáneas a Ollama. Así un único
+proceso puede llevar muchos informes a la vez sin ocupar un hilo por petición.
+
+Los clientes de ChatOllama abren conexiones ligadas al bucle de eventos: este
+camino está pensado para un bucle de larga duración (p. ej. un único
+asyncio.run que procese todo un lote), no para un asyncio.run por petición.
+"""
+
+import asyncio
+from functools import partial
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from agentes.checkpoints import config_informe, obtener_checkpointer
+from agentes.clientes_llm import registro_clientes
+from agentes.formal_causal_agent import (
+    CLAVES_RESPUESTA,
+    CONTEXTO_ETAPA,
+    TIPOS_MOTIVACION,
+    FormalCausalState,
+    aplicar_secciones,
+    compilar_grafo_paralelo,
+    compilar_grafo_secuencial,
+    contenido_respaldo,
+    estado_inicial_analisis,
+    get_llm,
+    mensajes_reparacion,
+    objetivos_de_tipo,
+    preparar_llamada,
+    preparar_reanudacion,
+    procesar_respuesta,
+    prompt_analisis_completo,
+    prompt_etapa,
+    prompt_objetivos_tipo,
+    prompt_tecnicas_inicial,
+    respuesta_cacheada,
+    resultado_analisis,
+)
+from agentes.grafos import registro_grafos
+from agentes.metricas import metricas
+from agentes.politica_llm import debe_propagar, politica_llm, propagar_caidas
+from agentes.registros import obtener_logger
+
+log = obtener_logger('agente')
+
+NodoAsync = Callable[[FormalCausalState], Coroutine[Any, Any, Any]]
+
+
+# ============================================================================
+# LLAMADA ASÍNCRONA AL LLM
+# ============================================================================
+async def safe_llm_call_async(llm, prompt: str, default_value: Any = None, usar_cache: bool = True,
+                              mensaje_sistema: Optional[str] = None, etapa: str = 'llm') -> Any:
+    """
+    Variante asíncrona de safe_llm_call
+
+    Comparte la caché de respuestas con el camino síncrono. Solo la llamada a
+    Ollama, con sus reintentos y reparaciones (politica_llm.aejecutar), ocurre
+    dentro del semáforo global (registro_clientes.semaforo_async); el plazo de
+    la política se impone con asyncio.wait_for.
+    """
+    try:
+        cache, clave, messages, opciones = preparar_llamada(llm, prompt, mensaje_sistema, etapa)
+        if usar_cache:
+            resultado = respuesta_cacheada(cache, clave)
+            if resultado is not None:
+                return resultado
+
+        async with registro_clientes.semaforo_async():
+            return await politica_llm.aejecutar(
+                lambda: _ainvocar(llm, messages, opciones, etapa),
+                lambda response: procesar_respuesta(response, cache, clave, etapa),
+                lambda response, error: _ainvocar(llm, mensajes_reparacion(messages, response, error), opciones, etapa)
+            )
+    except Exception as e:
+        log.error("Error en llamada al LLM (async): %s", e, extra={'etapa': etapa})
+        if debe_propagar(e):
+            raise
+        return contenido_respaldo(etapa, default_value)
+
+
+async def _ainvocar(llm, messages: List[Any], opciones: Dict[str, Any], etapa: str) -> Any:
+    with metricas.medir(etapa, 'llm'):
+        return await llm.ainvoke(messages, **opciones)
+
+
+# ============================================================================
+# NODOS ASÍNCRONOS
+# ============================================================================
+def _valor_vacio(etapa: str) -> Any:
+    return {"contenido": "", "contexto": ""} if etapa == 'que_es' else []
+
+
+def crear_nodo_async(etapa: str) -> NodoAsync:
+    """Crea el nodo asíncrono equivalente a analizar_<etapa> del flujo secuencial"""
+
+    async def analizar_etapa(state: FormalCausalState) -> FormalCausalState:
+        log.debug("🔍 Analizando %s (async)...", etapa.upper(), extra={'etapa': etapa})
+
+        llm = get_llm()
+        mensaje_sistema, prompt = prompt_etapa(state, etapa)
+        clave, vacio = CLAVES_RESPUESTA[etapa], _valor_vacio(etapa)
+        result = await safe_llm_call_async(llm, prompt, {clave: vacio}, mensaje_sistema=mensaje_sistema, etapa=etapa)
+        state[etapa] = result.get(clave, vacio)
+
+        log.info("✅ Etapa %s completada", etapa, extra={'etapa': etapa})
+        return state
+
+    return analizar_etapa
+
+
+NODOS_SECUENCIALES_ASYNC = {etapa: crear_nodo_async(etapa) for etapa in CONTEXTO_ETAPA}
+
+
+async def analizar_tecnicas_inicial_async(state: FormalCausalState) -> Dict[str, Any]:
+    """Nodo paralelo: primera pasada de motivaciones técnicas sin depender de las preceptivas"""
+    llm = get_llm()
+    mensaje_sistema, prompt = prompt_tecnicas_inicial(state)
+    result = await safe_llm_call_async(llm, prompt, {"tecnicas": []},
+                                       mensaje_sistema=mensaje_sistema, etapa='tecnicas_inicial')
+    return {'tecnicas': result.get('tecnicas', [])}
+
+
+async def analizar_progresistas_paralelo_async(state: FormalCausalState) -> Dict[str, Any]:
+    """Nodo paralelo: progresistas concurrentes con facultativas (sin conocer estas últimas)"""
+    estado = await NODOS_SECUENCIALES_ASYNC['progresistas']({**state, 'facultativas': []})
+    return {'progresistas': estado['progresistas']}
+
+
+def crear_nodo_objetivos_tipo_async(tipo: str) -> NodoAsync:
+    """Crea el nodo asíncrono que genera los objetivos de un único tipo de motivación"""
+
+    async def analizar_objetivos_tipo(state: FormalCausalState) -> Dict[str, Any]:
+        llm = get_llm()
+        prompt = prompt_objetivos_tipo(state, tipo)
+        result = await safe_llm_call_async(llm, prompt, {"para_que": []}, etapa=f'objetivos_{tipo}')
+        return {'objetivos': objetivos_de_tipo(result, tipo)}
+
+    return analizar_objetivos_tipo
+
+
+def _actualizacion_parcial_async(nodo: NodoAsync, clave: str) -> NodoAsync:
+    """Adapta un nodo secuencial asíncrono para que solo escriba su clave"""
+
+    async def ejecutar(state: FormalCausalState) -> Dict[str, Any]:
+        return {clave: (await nodo(dict(state)))[clave]}
+
+    return ejecutar
+
+
+async def analizar_completo_async(state: FormalCausalState) -> FormalCausalState:
+    """Variante asíncrona de analizar_completo (una llamada y respaldo por etapa)"""
+    llm = get_llm()
+    prompt = prompt_analisis_completo(state)
+    pendientes = aplicar_secciones(state, await safe_llm_call_async(llm, prompt, None, etapa='completo'))
+
+    for paquete in pendientes:
+        state = await NODOS_SECUENCIALES_ASYNC[paquete](state)
+    return state
+
+
+# ============================================================================
+# GRAFO Y FUNCIÓN PRINCIPAL
+# ============================================================================
+def crear_grafo_async(modo: str = 'secuencial', checkpointer: Optional[Any] = None):
+    """Compila el grafo ('secuencial' o 'paralelo') con nodos asíncronos; se ejecuta con ainvoke"""
+    if modo == 'secuencial':
+        return compilar_grafo_secuencial(NODOS_SECUENCIALES_ASYNC, checkpointer)
+    if modo == 'paralelo':
+        return compilar_grafo_paralelo({
+            'preceptivas': _actualizacion_parcial_async(NODOS_SECUENCIALES_ASYNC['preceptivas'], 'preceptivas'),
+            'tecnicas': analizar_tecnicas_inicial_async,
+            'facultativas': _actualizacion_parcial_async(NODOS_SECUENCIALES_ASYNC['facultativas'], 'facultativas'),
+            'progresistas': analizar_progresistas_paralelo_async,
+            **{f'objetivos_{tipo}': crear_nodo_objetivos_tipo_async(tipo) for tipo in TIPOS_MOTIVACION},
+            'que_es': _actualizacion_parcial_async(NODOS_SECUENCIALES_ASYNC['que_es'], 'que_es')
+        }, checkpointer)
+    raise ValueError(f"Modo de grafo no reconocido: {modo}")
+
+
+registro_grafos.registrar('secuencial_async', partial(crear_grafo_async, 'secuencial'))
+registro_grafos.registrar('paralelo_async', partial(crear_grafo_async, 'paralelo'))
+
+
+def obtener_grafo_async(modo: str = 'secuencial', checkpointer: Optional[Any] = None):
+    """Grafo asíncrono compilado compartido para el modo y checkpointer"""
+    return registro_grafos.obtener(f'{modo}_async', checkpointer)
+
+
+async def _aejecutar_con_checkpoints(modo: str, estado_inicial: Dict[str, Any], informe_id: str,
+                                     checkpointer: Any) -> Dict[str, Any]:
+    grafo = obtener_grafo_async(modo, checkpointer)
+    config = config_informe(informe_id, modo)
+    thread_id = config['configurable']['thread_id']
+    entrada, resultado = preparar_reanudacion(await grafo.aget_state(config), estado_inicial, thread_id, checkpointer)
+    if resultado is None:
+        with propagar_caidas():
+            resultado = await grafo.ainvoke(entrada, config)
+        checkpointer.podar(thread_id)
+    return resultado
+
+
+async def procesar_conjetura_async(conjetura: str, modo: str = 'secuencial',
+                                   informe_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Variante asíncrona de procesar_conjetura
+
+    Args:
+        conjetura: Texto de la conjetura inicial del usuario
+        modo: 'secuencial', 'paralelo' o 'unico'
+        informe_id: Ejecutar con checkpoints de ese informe (ver procesar_conjetura)
+
+    Returns:
+        Diccionario con todo el análisis estructurado (mismo formato que procesar_conjetura)
+    """
+    estado_inicial = estado_inicial_analisis(conjetura)
+    checkpointer = obtener_checkpointer() if informe_id and modo != 'unico' else None
+
+    try:
+        if modo == 'unico':
+            resultado = await analizar_completo_async(estado_inicial)
+        elif checkpointer is not None:
+            resultado = await _aejecutar_con_checkpoints(modo, estado_inicial, informe_id, checkpointer)
+        else:
+            resultado = await obtener_grafo_async(modo).ainvoke(estado_inicial)
+        return resultado_analisis(resultado, modo)
+
+    except Exception as e:
+        log.exception("❌ Error en el análisis (async): %s", e)
+        return {
+            'success': False,
+            'error': str(e),
+            'analisis': None,
+            'reanudable': checkpointer is not None
+        }
+
+
+async def procesar_conjeturas_async(conjeturas: List[str], modo: str = 'secuencial') -> List[Dict[str, Any]]:
+    """Procesa varias conjeturas concurrentemente; el semáforo global acota las llamadas a Ollama"""
+    return await asyncio.gather(*(procesar_conjetura_async(conjetura, modo) for conjetura in conjeturas))
@@ -0,0 +1,108 @@
+"""
+Registro de grafos compilados compartidos por todo el proceso
+Construir el StateGraph y compilarlo cuesta lo mismo en cada informe y el
+resultado no depende de la conjetura: se compila una vez por configuración
+(secuencial, paralelo, sus variantes asíncronas y cada checkpointer) y el grafo
+compilado se reutiliza entre llamadas e hilos. Los módulos del agente registran
+sus constructores al importarse.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Compilar los grafos al arrancar la aplicación en lugar de en el primer informe
+GRAFOS_PRECALENTAR = os.environ.get('INFORMES_PRECALENTAR_GRAFOS', '1') != '0'
+
+# Constructor: recibe el checkpointer (o None) y devuelve el grafo compilado
+Constructor = Callable[[Optional[Any]], Any]
+
+
+# ============================================================================
+# REGISTRO
+# ============================================================================
+class RegistroGrafos:
+    """Grafos compilados por (nombre, checkpointer), compilados bajo demanda una sola vez"""
+
+    def __init__(self):
+        self._constructores: Dict[str, Constructor] = {}
+        # El checkpointer se guarda junto al grafo para que su id() no pueda reutilizarse
+        self._grafos: Dict[Tuple[str, Optional[int]], Tuple[Optional[Any], Any]] = {}
+        self._lock = threading.Lock()
+        self.compilaciones = 0
+        self.segundos_compilacion = 0.0
+        self.reutilizaciones = 0
+
+    def registrar(self, nombre: str, constructor: Constructor) -> None:
+        """Registra cómo compilar el grafo `nombre` (p. ej. 'secuencial' o 'paralelo_async')"""
+        with self._lock:
+            self._constructores[nombre] = constructor
+            for clave in [clave for clave in self._grafos if clave[0] == nombre]:
+                del self._grafos[clave]
+
+    def nombres(self) -> Tuple[str, ...]:
+        with self._lock:
+            return tuple(self._constructores)
+
+    def obtener(self, nombre: str, checkpointer: Optional[Any] = None) -> Any:
+        """
+        Devuelve el grafo compilado para la configuración, compilándolo la primera vez
+
+        Raises:
+            ValueError: Si no hay ningún grafo registrado con ese nombre
+        """
+        clave = (nombre, None if checkpointer is None else id(checkpointer))
+        with self._lock:
+            entrada = self._grafos.get(clave)
+            if entrada is not None:
+                self.reutilizaciones += 1
+                return entrada[1]
+
+            constructor = self._constructores.get(nombre)
+            if constructor is None:
+                raise ValueError(f"Modo de grafo no reconocido: {nombre}")
+            # Se compila con el lock tomado: dos hilos que piden el mismo grafo no lo compilan dos veces
+            inicio = time.perf_counter()
+            grafo = constructor(checkpointer)
+            self.segundos_compilacion += time.perf_counter() - inicio
+            self.compilaciones += 1
+            self._grafos[clave] = (checkpointer, grafo)
+            return grafo
+
+    def precalentar(self, nombres: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Compila por adelantado los grafos indicados (todos los registrados por defecto)
+
+        Returns:
+            Milisegundos que tardó cada grafo (casi 0 si ya estaba compilado)
+        """
+        tiempos = {}
+        for nombre in (self.nombres() if nombres is None else nombres):
+            inicio = time.perf_counter()
+            self.obtener(nombre)
+            tiempos[nombre] = round((time.perf_counter() - inicio) * 1000, 2)
+        return tiempos
+
+    def limpiar(self) -> None:
+        """Descarta los grafos compilados (se recompilan al pedirlos)"""
+        with self._lock:
+            self._grafos.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'grafos': len(self._grafos),
+                'compilaciones': self.compilaciones,
+                'reutilizaciones': self.reutilizaciones,
+                'ms_compilacion': round(self.segundos_compilacion * 1000, 2)
+            }
+
+
+# Registro compartido por el proceso (camino síncrono, asíncrono y lote)
+registro_grafos = RegistroGrafos()
@@ -0,0 +1,284 @@
+"""
+Extracción incremental de JSON a partir de la salida del LLM en streaming
+Permite entregar cada motivación en cuanto el modelo cierra su objeto, sin
+esperar a que termine la respuesta completa, y localizar el objeto JSON de una
+respuesta aunque venga rodeada de texto o con defectos habituales del modelo
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+class ExtractorElementosIncremental:
+    """
+    Detecta los objetos completos del array asociado a una clave
+
+    Se alimenta con fragmentos de texto (feed) y devuelve los elementos que se
+    han cerrado en ese fragmento. Por ejemplo, con clave='preceptivas' y la
+    salida '{"preceptivas": [{"titulo": ...}, {...'  devuelve el primer
+    objeto en cuanto aparece su '}' de cierre.
+    """
+
+    def __init__(self, clave: str):
+        self.clave = clave
+        self.texto = ''
+        self._pos = 0
+        self._en_cadena = False
+        self._escape = False
+        self._inicio_cadena = 0
+        self._ultima_cadena: Optional[str] = None
+        self._pila: List[str] = []          # '{' o '[' de cada contenedor abierto
+        self._nivel_array: Optional[int] = None  # Profundidad del array objetivo
+        self._inicio_elemento: Optional[int] = None
+        self.elementos: List[Dict[str, Any]] = []
+
+    def feed(self, fragmento: str) -> List[Dict[str, Any]]:
+        """Procesa un fragmento y devuelve los elementos completados en él"""
+        self.texto += fragmento
+        nuevos = []
+        texto = self.texto
+
+        for i in range(self._pos, len(texto)):
+            c = texto[i]
+
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._en_cadena = False
+                    self._ultima_cadena = texto[self._inicio_cadena + 1:i]
+                continue
+
+            if c == '"':
+                self._en_cadena = True
+                self._inicio_cadena = i
+            elif c in '{[':
+                if (c == '[' and self._nivel_array is None and self._pila
+                        and self._pila[-1] == '{' and self._ultima_cadena == self.clave):
+                    self._nivel_array = len(self._pila) + 1
+                elif c == '{' and self._nivel_array is not None and len(self._pila) == self._nivel_array:
+                    self._inicio_elemento = i
+                self._pila.append(c)
+            elif c in '}]':
+                if not self._pila:
+                    continue
+                self._pila.pop()
+                if c == '}' and self._inicio_elemento is not None and len(self._pila) == self._nivel_array:
+                    elemento = self._decodificar(texto[self._inicio_elemento:i + 1])
+                    if elemento is not None:
+                        self.elementos.append(elemento)
+                        nuevos.append(elemento)
+                    self._inicio_elemento = None
+                elif c == ']' and self._nivel_array is not None and len(self._pila) < self._nivel_array:
+                    self._nivel_array = None
+
+        self._pos = len(texto)
+        return nuevos
+
+    @staticmethod
+    def _decodificar(fragmento: str) -> Optional[Dict[str, Any]]:
+        try:
+            elemento = json.loads(fragmento)
+        except json.JSONDecodeError:
+            return None
+        return elemento if isinstance(elemento, dict) else None
+
+
+# ============================================================================
+# EXTRACCIÓN TOLERANTE DEL PRIMER OBJETO JSON
+# ============================================================================
+COMILLAS_TIPOGRAFICAS = '\u201c\u201d\u201e\u201f'  # “ ” „ ‟
+_ESPECIALES = re.compile('[{}\\[\\],"\u201c-\u201f]')
+_ESPECIALES_CADENA = re.compile('[\\\\"\u201c-\u201f]')
+
+
+class _Contenedor:
+    """Objeto o array abierto durante el escaneo"""
+    __slots__ = ('tipo', 'seguro')
+
+    def __init__(self, tipo: str, seguro: int):
+        self.tipo = tipo      # '{' o '['
+        self.seguro = seguro  # Longitud de la salida tras el último valor completo
+
+
+class AnalizadorJSON:
+    """
+    Localiza el primer objeto JSON válido de primer nivel en un texto
+
+    Escanea el texto una sola vez contando llaves y corchetes fuera de las
+    cadenas, de modo que el texto antes y después del objeto (incluidas otras
+    llaves en la prosa o bloques ```json) no le afecta. Mientras escanea
+    normaliza los defectos habituales del LLM:
+
+    - comas finales antes de '}' o ']'
+    - comillas tipográficas (“ ”) usadas como delimitadores de cadena
+    - saltos de línea literales dentro de las cadenas
+    - respuestas truncadas: finalizar() descarta el elemento incompleto y
+      cierra los arrays y objetos abiertos
+
+    Se puede alimentar por fragmentos (feed), igual que ExtractorElementosIncremental.
+    """
+
+    def __init__(self):
+        self.texto = ''
+        self.resultado: Any = None
+        self.completo = False
+        self._pos = 0
+        self._reiniciar(None)
+
+    def _reiniciar(self, inicio: Optional[int]) -> None:
+        self._inicio = inicio          # Posición en self.texto del '{' del candidato actual
+        self._salida: List[str] = []   # Candidato normalizado, en trozos
+        self._largo = 0                # Caracteres acumulados en self._salida
+        self._pila: List[_Contenedor] = []
+        self._cadena: Optional[str] = None  # Delimitador de cierre si estamos dentro de una cadena
+        self._escape = False
+
+    def feed(self, fragmento: str) -> Optional[Any]:
+        """Procesa un fragmento; devuelve el objeto en cuanto se completa uno válido"""
+        self.texto += fragmento
+        texto = self.texto
+        fin = len(texto)
+        i = self._pos
+
+        while i < fin and not self.completo:
+            if self._inicio is None:
+                i = texto.find('{', i)
+                if i < 0:
+                    i = fin
+                    break
+                self._reiniciar(i)
+                self._anadir('{')
+                self._pila.append(_Contenedor('{', 1))
+                i += 1
+                continue
+
+            # Los tramos sin caracteres especiales se copian de una vez
+            patron = _ESPECIALES_CADENA if self._cadena is not None else _ESPECIALES
+            m = patron.search(texto, i)
+            j = m.start() if m else fin
+            if j > i:
+                self._anadir(texto[i:j])
+            if m is None:
+                i = fin
+                break
+            i = self._procesar(texto[j], j)
+
+        self._pos = i
+        return self.resultado if self.completo else None
+
+    def _procesar(self, c: str, posicion: int) -> int:
+        """Procesa un carácter especial y devuelve la posición desde la que seguir"""
+        if self._cadena is not None:
+            if self._escape:
+                self._escape = False
+                self._anadir(c)
+            elif c == '\\':
+                self._escape = True
+                self._anadir(c)
+            elif c == self._cadena or (self._cadena != '"' and c in COMILLAS_TIPOGRAFICAS):
+                self._cadena = None
+                self._anadir('"')
+                if self._pila[-1].tipo == '[':
+                    self._pila[-1].seguro = self._largo
+            elif c == '"':
+                self._anadir('\\"')  # Comilla recta dentro de una cadena con comillas tipográficas
+            else:
+                self._anadir(c)
+            return posicion + 1
+
+        if c == '"' or c in COMILLAS_TIPOGRAFICAS:
+            self._cadena = '"' if c == '"' else '\u201d'
+            self._anadir('"')
+        elif c in '{[':
+            self._anadir(c)
+            self._pila.append(_Contenedor(c, self._largo))
+        elif c in '}]':
+            self._quitar_coma_final()
+            self._anadir(c)
+            self._pila.pop()
+            if self._pila:
+                self._pila[-1].seguro = self._largo
+            else:
+                try:
+                    self.resultado = json.loads(''.join(self._salida), strict=False)
+                    self.completo = True
+                except json.JSONDecodeError:
+                    # Llaves de la prosa: se prueba desde el siguiente '{'
+                    siguiente = self._inicio + 1
+                    self._reiniciar(None)
+                    return siguiente
+        elif c == ',':
+            self._pila[-1].seguro = self._largo
+            self._anadir(c)
+        return posicion + 1
+
+    def _anadir(self, trozo: str) -> None:
+        self._salida.append(trozo)
+        self._largo += len(trozo)
+
+    def _quitar_coma_final(self) -> None:
+        salida = self._salida
+        k = len(salida) - 1
+        while k >= 0 and (not salida[k] or salida[k].isspace()):
+            k -= 1
+        if k < 0:
+            return
+        ultimo = salida[k].rstrip()
+        if ultimo.endswith(','):
+            # Se elimina la coma y el espacio que la sigue
+            del salida[k + 1:]
+            salida[k] = ultimo[:-1]
+            self._largo = sum(len(trozo) for trozo in salida)
+
+    def finalizar(self) -> Any:
+        """
+        Devuelve el objeto extraído; si el texto terminó con el objeto a medias
+        lo repara descartando el último elemento incompleto
+
+        Raises:
+            ValueError: si no hay ningún objeto JSON recuperable
+        """
+        if self.completo:
+            return self.resultado
+        if self._inicio is None or not self._pila:
+            raise ValueError("No se pudo extraer JSON de la respuesta")
+
+        try:
+            return self._reparar()
+        except ValueError:
+            # Un '{' de la prosa que nunca se cierra (p. ej. 'Nota: {ver abajo') se
+            # traga el objeto real: se vuelve a escanear desde el siguiente '{'
+            siguiente = self.texto.find('{', self._inicio + 1)
+            if siguiente < 0:
+                raise
+            return extraer_json(self.texto[siguiente:])
+
+    def _reparar(self) -> Any:
+        """Cierra el candidato truncado descartando el último elemento incompleto"""
+        # Se corta por el array más interno (se pierde solo el elemento a medias)
+        # o, si no hay arrays abiertos, por el último miembro completo del objeto
+        pila = self._pila
+        corte = len(pila) - 1
+        for k in range(len(pila) - 1, -1, -1):
+            if pila[k].tipo == '[':
+                corte = k
+                break
+
+        reparado = ''.join(self._salida)[:pila[corte].seguro].rstrip().rstrip(',')
+        reparado += ''.join('}' if contenedor.tipo == '{' else ']' for contenedor in reversed(pila[:corte + 1]))
+
+        try:
+            return json.loads(reparado, strict=False)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"No se pudo reparar el JSON truncado: {e}") from e
+
+
+def extraer_json(texto: str) -> Any:
+    """Extrae (y repara si hace falta) el primer objeto JSON válido de un texto"""
+    analizador = AnalizadorJSON()
+    analizador.feed(texto)
+    return analizador.finalizar()
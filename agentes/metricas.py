@@ -0,0 +1,281 @@
+"""
+Métricas de latencia y tokens por etapa
+Cada etapa del análisis mide por separado la construcción del prompt, la
+espera al LLM y el parseo de la respuesta, y registra los tokens que informa
+Ollama. Se acumulan en histogramas y contadores globales (exportables en
+formato de texto de Prometheus) y, si la medición ocurre dentro de
+medir_informe, también en el desglose de ese informe.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+CUBETAS_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CUBETAS_TOKENS_SEGUNDO = (1.0, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+METRICAS_MAX_INFORMES = 1000  # Desgloses por informe que se conservan (los más recientes)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+# Muestra de un recolector: (nombre, tipo, ayuda, etiquetas, valor)
+Muestra = Tuple[str, str, str, Dict[str, Any], float]
+T = TypeVar('T')
+
+_informe_actual: ContextVar[Optional[str]] = ContextVar('informe_actual', default=None)
+
+
+# ============================================================================
+# REGISTRO
+# ============================================================================
+class _Histograma:
+    def __init__(self, cubetas: Tuple[float, ...]):
+        self.cubetas = cubetas
+        self.conteos = [0] * len(cubetas)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.cubetas):
+            if valor <= limite:
+                self.conteos[i] += 1
+
+
+class RegistroMetricas:
+    """Contadores, histogramas y desglose por informe, con exportación a Prometheus"""
+
+    def __init__(self, max_informes: int = METRICAS_MAX_INFORMES):
+        self.max_informes = max_informes
+        self._contadores: Dict[str, Dict[Etiquetas, float]] = {}
+        self._histogramas: Dict[str, Dict[Etiquetas, _Histograma]] = {}
+        self._ayudas: Dict[str, str] = {}
+        self._en_curso: Dict[str, int] = {}
+        self._informes: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._recolectores: List[Callable[[], Iterable[Muestra]]] = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Registro de valores
+    # ------------------------------------------------------------------
+    def incrementar(self, nombre: str, ayuda: str, valor: float = 1.0, **etiquetas: Any) -> None:
+        clave = tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+        with self._lock:
+            self._ayudas.setdefault(nombre, ayuda)
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0.0) + valor
+
+    def observar(self, nombre: str, ayuda: str, valor: float,
+                 cubetas: Tuple[float, ...] = CUBETAS_SEGUNDOS, **etiquetas: Any) -> None:
+        clave = tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+        with self._lock:
+            self._ayudas.setdefault(nombre, ayuda)
+            serie = self._histogramas.setdefault(nombre, {})
+            histograma = serie.get(clave)
+            if histograma is None:
+                histograma = serie[clave] = _Histograma(cubetas)
+            histograma.observar(valor)
+
+    def _etapa_informe(self, informe_id: str, etapa: str) -> Dict[str, float]:
+        """Entrada del desglose de un informe (llamar con el lock tomado)"""
+        informe = self._informes.get(informe_id)
+        if informe is None:
+            informe = self._informes[informe_id] = {'inicio': time.time(), 'etapas': {}}
+            while len(self._informes) > self.max_informes:
+                self._informes.popitem(last=False)
+        else:
+            self._informes.move_to_end(informe_id)
+        return informe['etapas'].setdefault(etapa, {})
+
+    def _sumar_informe(self, etapa: str, valores: Dict[str, float]) -> None:
+        informe_id = _informe_actual.get()
+        if informe_id is None:
+            return
+        with self._lock:
+            entrada = self._etapa_informe(informe_id, etapa)
+            for clave, valor in valores.items():
+                entrada[clave] = entrada.get(clave, 0) + valor
+
+    def _sumar_en_curso(self, tipo: str, delta: int) -> None:
+        with self._lock:
+            self._en_curso[tipo] = self._en_curso.get(tipo, 0) + delta
+
+    def registrar_duracion(self, etapa: str, fase: str, segundos: float) -> None:
+        """Registra la duración de una fase de una etapa medida por el llamante"""
+        self.observar('informes_etapa_duracion_segundos', 'Duración de cada fase de una etapa del análisis',
+                      segundos, etapa=etapa, fase=fase)
+        self._sumar_informe(etapa, {f'{fase}_ms': segundos * 1000})
+
+    @contextmanager
+    def medir(self, etapa: str, fase: str) -> Iterator[None]:
+        """Mide la duración de una fase ('prompt', 'llm' o 'parseo') de una etapa"""
+        if fase == 'llm':
+            self._sumar_en_curso('llm', 1)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            if fase == 'llm':
+                self._sumar_en_curso('llm', -1)
+            self.registrar_duracion(etapa, fase, segundos)
+
+    def medir_stream(self, etapa: str, fragmentos: Iterable[T]) -> Iterator[T]:
+        """
+        Itera sobre una respuesta en streaming del LLM midiendo solo la espera
+        de cada fragmento
+
+        El tiempo que el consumidor tarda en procesar cada fragmento no cuenta
+        como espera al LLM, y la llamada solo figura en curso mientras se espera
+        al modelo: un consumidor que deja de iterar (cliente desconectado) no la
+        deja contada. La duración total se registra al agotar o cerrar el iterador.
+        """
+        fragmentos = iter(fragmentos)
+        segundos = 0.0
+        try:
+            while True:
+                self._sumar_en_curso('llm', 1)
+                inicio = time.perf_counter()
+                try:
+                    fragmento = next(fragmentos)
+                except StopIteration:
+                    return
+                finally:
+                    segundos += time.perf_counter() - inicio
+                    self._sumar_en_curso('llm', -1)
+                yield fragmento
+        finally:
+            self.registrar_duracion(etapa, 'llm', segundos)
+
+    def registrar_respuesta_llm(self, etapa: str, metadatos: Dict[str, Any]) -> None:
+        """
+        Registra los tokens de una respuesta de Ollama (prompt_eval_count,
+        eval_count y eval_duration de response_metadata)
+        """
+        tokens_prompt = metadatos.get('prompt_eval_count')
+        tokens_respuesta = metadatos.get('eval_count')
+        duracion = metadatos.get('eval_duration')
+
+        valores: Dict[str, float] = {'llamadas': 1}
+        if tokens_prompt is not None:
+            self.incrementar('informes_tokens_prompt_total', 'Tokens de prompt evaluados por Ollama',
+                             tokens_prompt, etapa=etapa)
+            valores['tokens_prompt'] = tokens_prompt
+        if tokens_respuesta is not None:
+            self.incrementar('informes_tokens_respuesta_total', 'Tokens generados por Ollama',
+                             tokens_respuesta, etapa=etapa)
+            valores['tokens_respuesta'] = tokens_respuesta
+            if duracion:
+                valores['generacion_ms'] = duracion / 1e6
+                self.observar('informes_tokens_por_segundo', 'Velocidad de generación de Ollama',
+                              tokens_respuesta / (duracion / 1e9), CUBETAS_TOKENS_SEGUNDO, etapa=etapa)
+        self._sumar_informe(etapa, valores)
+
+    def registrar_recolector(self, recolector: Callable[[], Iterable[Muestra]]) -> None:
+        """Añade una función que aporta muestras calculadas en el momento de exportar"""
+        self._recolectores.append(recolector)
+
+    # ------------------------------------------------------------------
+    # Consulta y exportación
+    # ------------------------------------------------------------------
+    def en_curso(self, tipo: str = 'llm') -> int:
+        with self._lock:
+            return self._en_curso.get(tipo, 0)
+
+    def desglose_informe(self, informe_id: str) -> Optional[Dict[str, Any]]:
+        """Tiempos y tokens de cada etapa de un informe, con totales y tokens/segundo"""
+        with self._lock:
+            informe = self._informes.get(informe_id)
+            if informe is None:
+                return None
+            etapas = {etapa: dict(valores) for etapa, valores in informe['etapas'].items()}
+
+        totales: Dict[str, float] = {}
+        for valores in etapas.values():
+            if valores.get('generacion_ms') and valores.get('tokens_respuesta'):
+                valores['tokens_por_segundo'] = round(valores['tokens_respuesta'] / (valores['generacion_ms'] / 1000), 1)
+            for clave, valor in valores.items():
+                if clave != 'tokens_por_segundo':
+                    totales[clave] = totales.get(clave, 0) + valor
+        redondear = lambda valores: {k: round(v, 1) if isinstance(v, float) else v for k, v in valores.items()}
+        return {
+            'informe_id': informe_id,
+            'etapas': {etapa: redondear(valores) for etapa, valores in etapas.items()},
+            'totales': redondear(totales)
+        }
+
+    def exportar_prometheus(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)"""
+        lineas: List[str] = []
+        with self._lock:
+            for nombre, serie in sorted(self._contadores.items()):
+                lineas += [f"# HELP {nombre} {self._ayudas[nombre]}", f"# TYPE {nombre} counter"]
+                lineas += [f"{nombre}{_formatear(etiquetas)} {_numero(valor)}" for etiquetas, valor in serie.items()]
+            for nombre, serie in sorted(self._histogramas.items()):
+                lineas += [f"# HELP {nombre} {self._ayudas[nombre]}", f"# TYPE {nombre} histogram"]
+                for etiquetas, histograma in serie.items():
+                    for limite, conteo in zip(histograma.cubetas, histograma.conteos):
+                        lineas.append(f"{nombre}_bucket{_formatear(etiquetas + (('le', _numero(limite)),))} {conteo}")
+                    lineas.append(f"{nombre}_bucket{_formatear(etiquetas + (('le', '+Inf'),))} {histograma.total}")
+                    lineas.append(f"{nombre}_sum{_formatear(etiquetas)} {_numero(histograma.suma)}")
+                    lineas.append(f"{nombre}_count{_formatear(etiquetas)} {histograma.total}")
+            en_curso = dict(self._en_curso)
+
+        lineas += ["# HELP informes_llm_en_curso Llamadas al LLM esperando respuesta",
+                   "# TYPE informes_llm_en_curso gauge",
+                   f"informes_llm_en_curso {en_curso.get('llm', 0)}"]
+
+        # Prometheus exige las muestras de cada familia juntas, aunque un recolector las intercale
+        familias: Dict[str, Tuple[str, str, List[str]]] = {}
+        for recolector in self._recolectores:
+            for nombre, tipo, ayuda, etiquetas, valor in recolector():
+                clave = tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+                muestras = familias.setdefault(nombre, (tipo, ayuda, []))[2]
+                muestras.append(f"{nombre}{_formatear(clave)} {_numero(valor)}")
+        for nombre, (tipo, ayuda, muestras) in familias.items():
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"] + muestras
+        return '\n'.join(lineas) + '\n'
+
+
+def _formatear(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ''
+    escapar = lambda valor: valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{clave}="{escapar(valor)}"' for clave, valor in etiquetas) + '}'
+
+
+def _numero(valor: float) -> str:
+    if isinstance(valor, float) and math.isinf(valor):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+# ============================================================================
+# INSTANCIA GLOBAL
+# ============================================================================
+metricas = RegistroMetricas()
+
+
+def informe_actual() -> Optional[str]:
+    """Informe al que se atribuye el trabajo en curso (None fuera de medir_informe)"""
+    return _informe_actual.get()
+
+
+@contextmanager
+def medir_informe(informe_id: Optional[str]) -> Iterator[None]:
+    """Atribuye a `informe_id` las mediciones y los mensajes de registro del bloque (también en nodos del grafo)"""
+    token = _informe_actual.set(informe_id)
+    try:
+        yield
+    finally:
+        _informe_actual.reset(token)
@@ -0,0 +1,345 @@
+"""
+Política de reintentos, plazos y respaldo de las llamadas al LLM
+Distingue los errores transitorios (conexión, timeout, 5xx de Ollama), que se
+reintentan con espera exponencial acotada, de las respuestas mal formadas, que
+se vuelven a pedir con un prompt de reparación. Un cortocircuito deja de llamar
+a Ollama mientras el servidor está caído, y todo queda contado.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Set
+
+import httpx
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+LLM_PLAZO_SEGUNDOS = float(os.environ.get('INFORMES_LLM_PLAZO', '300'))  # Plazo total de una llamada con sus reintentos
+LLM_REINTENTOS = int(os.environ.get('INFORMES_LLM_REINTENTOS', '2'))      # Reintentos por error transitorio
+LLM_REPARACIONES = int(os.environ.get('INFORMES_LLM_REPARACIONES', '1'))  # Re-preguntas por JSON inválido
+LLM_ESPERA_BASE = 0.5    # Segundos antes del primer reintento (se duplica en cada uno)
+LLM_ESPERA_MAXIMA = 8.0  # Tope de la espera entre reintentos
+# Hilos que ejecutan las llamadas síncronas para poder abandonarlas al agotar el plazo.
+# Acota las llamadas síncronas simultáneas a Ollama: las demás esperan turno
+# dentro de su propio plazo
+LLM_HILOS = int(os.environ.get('INFORMES_LLM_HILOS', '32'))
+
+CIRCUITO_UMBRAL_FALLOS = 5          # Fallos transitorios seguidos que abren el circuito
+CIRCUITO_ENFRIAMIENTO_SEGUNDOS = 30.0  # Tiempo abierto antes de dejar pasar una llamada de prueba
+
+# Si todo falla, usar el contenido de respaldo (el de generar_informe_demo) en vez de dejar la etapa vacía
+RESPALDO_ACTIVO = os.environ.get('INFORMES_RESPALDO_DEMO', '1') != '0'
+
+
+class CircuitoAbierto(RuntimeError):
+    """Ollama ha fallado repetidamente y las llamadas se rechazan sin intentarlo"""
+
+
+def es_transitorio(error: BaseException) -> bool:
+    """True si el error es de red, timeout o un fallo del servidor que merece reintento"""
+    if isinstance(error, CircuitoAbierto):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    codigo = getattr(error, 'status_code', None)  # ollama.ResponseError
+    return isinstance(codigo, int) and (codigo >= 500 or codigo == 429)
+
+
+# Dentro de propagar_caidas, si Ollama no responde la llamada falla en vez de
+# usar el respaldo: los análisis con checkpoints prefieren detenerse y
+# reanudarse más tarde a guardar contenido de demostración
+_propagar_caidas: ContextVar[bool] = ContextVar('propagar_caidas', default=False)
+
+
+@contextmanager
+def propagar_caidas() -> Iterator[None]:
+    """Las caídas de Ollama (errores transitorios agotados, circuito abierto) se propagan en el bloque"""
+    token = _propagar_caidas.set(True)
+    try:
+        yield
+    finally:
+        _propagar_caidas.reset(token)
+
+
+def debe_propagar(error: BaseException) -> bool:
+    """True si el error es una caída de Ollama y el llamante pidió propagarla (ver propagar_caidas)"""
+    return _propagar_caidas.get() and (isinstance(error, CircuitoAbierto) or es_transitorio(error))
+
+
+# Momento (time.monotonic) en que vence el plazo de la llamada síncrona en curso:
+# PoliticaLLM._con_plazo lo fija en el contexto del hilo que la ejecuta
+_vencimiento_llamada: ContextVar[Optional[float]] = ContextVar('vencimiento_llamada', default=None)
+
+
+def plazo_restante() -> Optional[float]:
+    """Segundos que le quedan a la llamada al LLM en curso, o None fuera de una llamada con plazo"""
+    vencimiento = _vencimiento_llamada.get()
+    return None if vencimiento is None else max(vencimiento - time.monotonic(), 0.0)
+
+
+# Etapas que han recurrido al contenido de respaldo dentro de detectar_respaldos:
+# quien guarda el resultado lo marca para volver a generarlo en vez de darlo por bueno
+_respaldos_usados: ContextVar[Optional[Set[str]]] = ContextVar('respaldos_usados', default=None)
+
+
+@contextmanager
+def detectar_respaldos() -> Iterator[Set[str]]:
+    """Devuelve un conjunto al que se añaden las etapas que usan el respaldo en el bloque"""
+    usados: Set[str] = set()
+    token = _respaldos_usados.set(usados)
+    try:
+        yield usados
+    finally:
+        _respaldos_usados.reset(token)
+
+
+def registrar_respaldo(etapa: str) -> None:
+    """Anota que la etapa ha usado el contenido de respaldo (ver detectar_respaldos)"""
+    usados = _respaldos_usados.get()
+    if usados is not None:
+        usados.add(etapa)
+
+
+# ============================================================================
+# CORTOCIRCUITO
+# ============================================================================
+class Circuito:
+    """
+    Cortocircuito de tres estados: cerrado (normal), abierto (rechaza llamadas)
+    y semiabierto (deja pasar una llamada de prueba tras el enfriamiento)
+    """
+
+    def __init__(self, umbral: int = CIRCUITO_UMBRAL_FALLOS,
+                 enfriamiento: float = CIRCUITO_ENFRIAMIENTO_SEGUNDOS):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.fallos_seguidos = 0
+        self.abierto_desde: Optional[float] = None
+        self.aperturas = 0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        if self.abierto_desde is None:
+            return 'cerrado'
+        if time.monotonic() - self.abierto_desde >= self.enfriamiento:
+            return 'semiabierto'
+        return 'abierto'
+
+    def permitir(self) -> None:
+        """Lanza CircuitoAbierto si la llamada no debe intentarse"""
+        with self._lock:
+            estado = self.estado
+            if estado == 'cerrado':
+                return
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return
+        raise CircuitoAbierto("Ollama no responde; llamadas suspendidas temporalmente")
+
+    def exito(self) -> None:
+        with self._lock:
+            self.fallos_seguidos = 0
+            self.abierto_desde = None
+            self._prueba_en_curso = False
+
+    def fallo(self) -> None:
+        with self._lock:
+            self.fallos_seguidos += 1
+            prueba_fallida = self._prueba_en_curso
+            self._prueba_en_curso = False
+            if prueba_fallida or (self.abierto_desde is None and self.fallos_seguidos >= self.umbral):
+                self.abierto_desde = time.monotonic()
+                self.aperturas += 1
+
+    def descartar_prueba(self) -> None:
+        """La llamada de prueba terminó sin saber si el servidor responde (error no transitorio)"""
+        with self._lock:
+            self._prueba_en_curso = False
+
+
+# ============================================================================
+# POLÍTICA
+# ============================================================================
+class PoliticaLLM:
+    """Aplica plazos, reintentos, reparaciones y cortocircuito a una llamada al LLM"""
+
+    def __init__(self, plazo: float = LLM_PLAZO_SEGUNDOS, reintentos: int = LLM_REINTENTOS,
+                 reparaciones: int = LLM_REPARACIONES, espera_base: float = LLM_ESPERA_BASE,
+                 espera_maxima: float = LLM_ESPERA_MAXIMA, circuito: Optional[Circuito] = None):
+        self.plazo = plazo
+        self.reintentos = reintentos
+        self.reparaciones = reparaciones
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.circuito = circuito or Circuito()
+        self._contadores = dict.fromkeys((
+            'llamadas', 'exitos', 'reintentos', 'timeouts', 'errores_transitorios',
+            'errores_permanentes', 'reparaciones', 'reparaciones_exitosas',
+            'rechazos_circuito', 'respaldos'
+        ), 0)
+        self._lock = threading.Lock()
+
+    def contar(self, contador: str) -> None:
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def _espera(self, intento: int) -> float:
+        """Espera exponencial acotada con jitter antes del reintento `intento` (desde 0)"""
+        return min(self.espera_base * 2 ** intento, self.espera_maxima) * random.uniform(0.5, 1.0)
+
+    def _registrar_error(self, error: BaseException, intento: int, limite: float) -> float:
+        """Cuenta el error y devuelve la espera antes de reintentar; relanza si no procede"""
+        if isinstance(error, CircuitoAbierto):
+            self.contar('rechazos_circuito')
+            raise error
+        if not es_transitorio(error):
+            self.circuito.descartar_prueba()
+            self.contar('errores_permanentes')
+            raise error
+
+        self.circuito.fallo()
+        self.contar('timeouts' if isinstance(error, (TimeoutError, httpx.TimeoutException)) else 'errores_transitorios')
+        espera = self._espera(intento)
+        if intento >= self.reintentos or time.monotonic() + espera >= limite:
+            raise error
+        self.contar('reintentos')
+        return espera
+
+    # ------------------------------------------------------------------
+    # Camino síncrono
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _con_plazo(invocar: Callable[[], Any], restante: float) -> Any:
+        """
+        Ejecuta invocar() esperando como mucho `restante` segundos
+
+        La llamada corre en un hilo del pool con una copia del contexto (métricas
+        por informe, propagar_caidas) y si no termina a tiempo se abandona. El
+        cliente HTTP de Ollama ajusta su timeout a ese mismo plazo
+        (plazo_restante), así que la petición abandonada también se corta y el
+        hilo vuelve al pool en lugar de quedarse esperando a Ollama.
+        """
+        contexto = contextvars.copy_context()
+        contexto.run(_vencimiento_llamada.set, time.monotonic() + restante)
+        futuro = _executor_llamadas.submit(contexto.run, invocar)
+        try:
+            return futuro.result(timeout=restante)
+        except concurrent.futures.TimeoutError:
+            futuro.cancel()
+            raise TimeoutError("Plazo de la llamada al LLM agotado") from None
+
+    def _invocar(self, invocar: Callable[[], Any], limite: float) -> Any:
+        intento = 0
+        while True:
+            try:
+                self.circuito.permitir()
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError("Plazo de la llamada al LLM agotado")
+                respuesta = self._con_plazo(invocar, restante)
+            except Exception as e:
+                time.sleep(self._registrar_error(e, intento, limite))
+                intento += 1
+                continue
+            self.circuito.exito()
+            return respuesta
+
+    def ejecutar(self, invocar: Callable[[], Any], procesar: Callable[[Any], Any],
+                 reparar: Callable[[Any, Exception], Any]) -> Any:
+        """
+        Invoca al LLM y procesa su respuesta aplicando la política
+
+        Args:
+            invocar: Hace la llamada y devuelve la respuesta cruda
+            procesar: Extrae y valida el resultado; lanza ValueError si la respuesta no sirve
+            reparar: Recibe la respuesta fallida y el error, y hace la llamada de reparación
+
+        Raises:
+            La última excepción si se agotan reintentos, reparaciones o plazo
+        """
+        self.contar('llamadas')
+        limite = time.monotonic() + self.plazo
+        respuesta = self._invocar(invocar, limite)
+        for reparacion in range(self.reparaciones + 1):
+            try:
+                resultado = procesar(respuesta)
+            except ValueError as e:
+                if reparacion == self.reparaciones or time.monotonic() >= limite:
+                    raise
+                self.contar('reparaciones')
+                respuesta = self._invocar(partial(reparar, respuesta, e), limite)
+                continue
+            self._contar_exito(reparacion)
+            return resultado
+
+    # ------------------------------------------------------------------
+    # Camino asíncrono
+    # ------------------------------------------------------------------
+    async def _ainvocar(self, invocar: Callable[[], Awaitable[Any]], limite: float) -> Any:
+        intento = 0
+        while True:
+            try:
+                self.circuito.permitir()
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError("Plazo de la llamada al LLM agotado")
+                respuesta = await asyncio.wait_for(invocar(), restante)
+            except Exception as e:
+                await asyncio.sleep(self._registrar_error(e, intento, limite))
+                intento += 1
+                continue
+            self.circuito.exito()
+            return respuesta
+
+    async def aejecutar(self, invocar: Callable[[], Awaitable[Any]], procesar: Callable[[Any], Any],
+                        reparar: Callable[[Any, Exception], Awaitable[Any]]) -> Any:
+        """Variante asíncrona de ejecutar; el plazo se impone también a cada llamada"""
+        self.contar('llamadas')
+        limite = time.monotonic() + self.plazo
+        respuesta = await self._ainvocar(invocar, limite)
+        for reparacion in range(self.reparaciones + 1):
+            try:
+                resultado = procesar(respuesta)
+            except ValueError as e:
+                if reparacion == self.reparaciones or time.monotonic() >= limite:
+                    raise
+                self.contar('reparaciones')
+                respuesta = await self._ainvocar(partial(reparar, respuesta, e), limite)
+                continue
+            self._contar_exito(reparacion)
+            return resultado
+
+    def _contar_exito(self, reparacion: int) -> None:
+        self.contar('exitos')
+        if reparacion:
+            self.contar('reparaciones_exitosas')
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de la política y estado del cortocircuito"""
+        with self._lock:
+            contadores = dict(self._contadores)
+        return {
+            **contadores,
+            'circuito': self.circuito.estado,
+            'aperturas_circuito': self.circuito.aperturas
+        }
+
+
+# Hilos de las llamadas síncronas con plazo (ver PoliticaLLM._con_plazo)
+_executor_llamadas = concurrent.futures.ThreadPoolExecutor(max_workers=LLM_HILOS, thread_name_prefix='llm')
+
+# Política compartida por el proceso (un único servidor Ollama)
+politica_llm = PoliticaLLM()
@@ -0,0 +1,167 @@
+"""
+Registro (logging) estructurado del sistema
+Los mensajes se encolan (QueueHandler) y un hilo aparte (QueueListener) los
+escribe como una línea JSON por evento, con el informe y la etapa a los que
+pertenecen. Las peticiones nunca esperan a la escritura en consola: si la cola
+se llena, los mensajes sobrantes se descartan y se cuentan. DEBUG está
+desactivado por defecto.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from agentes.metricas import informe_actual
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+LOG_NIVEL = os.environ.get('INFORMES_LOG_NIVEL', 'INFO').upper()
+LOG_FORMATO = os.environ.get('INFORMES_LOG_FORMATO', 'json')  # 'json' o 'texto'
+LOG_COLA_MAXIMA = 10000  # Mensajes pendientes de escribir antes de empezar a descartar
+
+LOGGER_RAIZ = 'informes'
+
+# Atributos propios de logging.LogRecord; el resto son campos añadidos con extra=
+_CAMPOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+# ============================================================================
+# FILTRO, FORMATO Y COLA
+# ============================================================================
+class FiltroContexto(logging.Filter):
+    """Añade el informe en curso (ver agentes.metricas.medir_informe) si el mensaje no lo trae"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'informe_id', None) is None:
+            record.informe_id = informe_actual()
+        return True
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por mensaje: fecha, nivel, logger, mensaje, informe, etapa y campos extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage()
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _CAMPOS_ESTANDAR and valor is not None:
+                datos[clave] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """Formato legible para desarrollo: hora, nivel, [informe/etapa] y mensaje"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        contexto = '/'.join(
+            str(valor)[:8] if clave == 'informe_id' else str(valor)
+            for clave in ('informe_id', 'etapa')
+            if (valor := getattr(record, clave, None)) is not None
+        )
+        texto = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} "
+        texto += f"[{contexto}] " if contexto else ''
+        texto += record.getMessage()
+        if getattr(record, 'excepcion', None):
+            texto += '\n' + record.excepcion
+        elif record.exc_info:
+            texto += '\n' + self.formatException(record.exc_info)
+        return texto
+
+
+class ManejadorCola(QueueHandler):
+    """QueueHandler que nunca bloquea: con la cola llena descarta el mensaje y lo cuenta"""
+
+    def __init__(self, cola: 'queue.Queue[logging.LogRecord]'):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Se resuelve el mensaje en el hilo que lo emite, pero el formato final
+        # (JSON o texto) lo aplica el hilo escritor
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.excepcion = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# ============================================================================
+# CONFIGURACIÓN DEL REGISTRO
+# ============================================================================
+_manejador: Optional[ManejadorCola] = None
+_escritor: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configurar_registro(nivel: Optional[str] = None, formato: Optional[str] = None) -> None:
+    """
+    Configura el logger raíz 'informes' con la cola y el hilo escritor (stderr)
+
+    Se llama automáticamente la primera vez que se pide un logger; volver a
+    llamarla cambia el nivel y el formato.
+    """
+    global _manejador, _escritor
+    with _lock:
+        logger = logging.getLogger(LOGGER_RAIZ)
+        logger.setLevel(nivel or LOG_NIVEL)
+        logger.propagate = False
+
+        salida = logging.StreamHandler(sys.stderr)
+        salida.setFormatter(FormateadorTexto() if (formato or LOG_FORMATO) == 'texto' else FormateadorJSON())
+
+        if _escritor is not None:
+            _escritor.stop()
+        if _manejador is None:
+            _manejador = ManejadorCola(queue.Queue(LOG_COLA_MAXIMA))
+            _manejador.addFilter(FiltroContexto())
+            logger.addHandler(_manejador)
+            atexit.register(detener_registro)
+
+        _escritor = QueueListener(_manejador.queue, salida, respect_handler_level=True)
+        _escritor.start()
+
+
+def detener_registro() -> None:
+    """Escribe los mensajes pendientes y detiene el hilo escritor"""
+    global _escritor
+    with _lock:
+        if _escritor is not None:
+            _escritor.stop()
+            _escritor = None
+
+
+def obtener_logger(nombre: str) -> logging.Logger:
+    """Logger hijo de 'informes' (p. ej. obtener_logger('app') → 'informes.app')"""
+    if _manejador is None:
+        configurar_registro()
+    return logging.getLogger(f'{LOGGER_RAIZ}.{nombre}')
+
+
+def mensajes_descartados() -> int:
+    """Mensajes perdidos porque la cola estaba llena"""
+    return _manejador.descartados if _manejador is not None else 0
@@ -1,23 +1,63 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-import os
-from datetime import datetime
+import copy
+import threading
+import time
 import uuid
-import json
+from datetime import datetime
+
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 
 # Importar el agente de LangGraph
-from agentes import procesar_conjetura
 from agentes.formal_causal_agent import (
-    get_llm, safe_llm_call,
-    PROMPT_PRECEPTIVAS, PROMPT_TECNICAS, 
-    PROMPT_FACULTATIVAS, PROMPT_PROGRESISTAS,
-    PROMPT_OBJETIVOS, PROMPT_QUE_ES
+    ANALISIS_RESPALDO, PAQUETES, analisis_vacio, generar_paquete, generar_paquete_stream,
+    guardar_resultado_paquete, obtener_resultado_paquete, paquete_en_checkpoint, reiniciar_checkpoint,
+    sincronizar_checkpoint
 )
+from agentes.dependencias import etapas_obsoletas, hash_entrada
+from agentes.coalescencia import VueloUnico, vuelos_llm
+from agentes.esquemas import SALIDA_ESTRUCTURADA, estadisticas_validacion
+from agentes.grafos import GRAFOS_PRECALENTAR, registro_grafos
+from agentes.politica_llm import detectar_respaldos, politica_llm
+from agentes.cache_respuestas import obtener_cache
+from agentes.contexto import estadisticas_prompts
+from agentes.metricas import medir_informe, metricas
+from agentes.registros import mensajes_descartados, obtener_logger
+from servicios.almacenamiento import crear_almacen
+from servicios.cache_paginas import CachePaginas
+from servicios.especulacion import GestorEspeculacion
+from servicios.plantilla_informe import SECCIONES_PERSONALIZABLES, SECCIONES_PLANTILLA, personalizar_seccion
+from servicios.pipeline import GestorPipelines, ProgresoPipeline, stream_sse
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
-# Almacenamiento temporal de informes (en producción usar base de datos)
-informes_generados = {}
+# Almacenamiento de informes (memoria o SQLite, según INFORMES_ALMACEN)
+almacen_informes = crear_almacen()
+
+# Análisis completos ejecutándose en segundo plano
+gestor_pipelines = GestorPipelines()
+log = obtener_logger('app')
+
+class InformeNoDisponible(LookupError):
+    """El informe ha caducado o se ha eliminado del almacén mientras se procesaba"""
+
+# Generaciones de paquetes en curso, por (informe_id, paquete): una petición
+# duplicada (doble clic, recarga, pipeline en segundo plano) espera a la que
+# ya está generando en lugar de lanzar otra llamada al LLM
+vuelos_paquetes = VueloUnico()
+
+# Primeras etapas generadas por adelantado al aceptar la conjetura (INFORMES_ESPECULAR_ETAPAS)
+gestor_especulacion = GestorEspeculacion()
+
+# Serializa las actualizaciones de lectura-modificación-escritura de los informes
+# (hashes de entrada y versión, ver guardar_paquete_generado y nueva_version)
+hashes_lock = threading.Lock()
+
+# HTML renderizado de /informe y /mapa-conceptual por versión del informe
+cache_paginas = CachePaginas()
+
+# Compilar los grafos del agente al arrancar, no en el primer informe
+if GRAFOS_PRECALENTAR:
+    log.info("🔥 Grafos del agente compilados", extra={'ms_compilacion': registro_grafos.precalentar()})
 
 @app.route('/')
 def index():
@@ -42,17 +82,18 @@ def iniciar_informe():
     # Generar ID único para el informe
     informe_id = str(uuid.uuid4())
     
-    print(f"\n{'='*60}")
-    print(f"🚀 NUEVO INFORME INICIADO - ID: {informe_id[:8]}...")
-    print(f"{'='*60}")
-    print(f"Conjetura: {conjetura[:100]}...")
+    log.info("🚀 Nuevo informe iniciado", extra={'informe_id': informe_id, 'conjetura': conjetura[:100]})
     
     # Guardar solo la conjetura inicialmente
-    informes_generados[informe_id] = {
+    almacen_informes.guardar(informe_id, {
         'conjetura': conjetura,
         'analisis': None,
         'informe_generado': False
-    }
+    })
+    
+    # Adelantar las primeras etapas mientras el navegador carga la página de revisión;
+    # /obtener-paquete las encuentra guardadas o se une a la generación en curso
+    gestor_especulacion.lanzar(informe_id, PAQUETES, lambda id_, paquete: generar_paquete_informe(id_, paquete)[1])
     
     return jsonify({
         'success': True,
@@ -65,238 +106,326 @@ def iniciar_informe():
 def procesar_con_agente(informe_id):
     """
     Endpoint para iniciar el procesamiento asíncrono con el agente de IA.
+    Lanza los seis paquetes en segundo plano; el progreso se consume en
+    /progreso-agente/<informe_id>.
     """
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return jsonify({
             'success': False,
             'message': 'Informe no encontrado'
         }), 404
     
-    print(f"\n{'='*60}")
-    print(f"🚀 INICIANDO ANÁLISIS DEL MÉTODO FORMAL CAUSAL")
-    print(f"{'='*60}\n")
-    
     # Inicializar estructura de análisis vacía si no existe
-    if not informes_generados[informe_id].get('analisis'):
-        informes_generados[informe_id]['analisis'] = {
-            'por_que': {
-                'preceptivas': [],
-                'tecnicas': [],
-                'facultativas': [],
-                'progresistas': []
-            },
-            'para_que': [],
-            'que_es': {}
-        }
+    preparar_analisis(informe_id)
+    
+    gestor_pipelines.iniciar(informe_id, lambda progreso: ejecutar_pipeline(informe_id, progreso))
     
     return jsonify({
         'success': True,
-        'message': 'Procesamiento iniciado'
+        'message': 'Procesamiento iniciado',
+        'progreso_url': f'/progreso-agente/{informe_id}'
     })
 
-@app.route('/obtener-paquete/<informe_id>/<paquete>', methods=['GET'])
-def obtener_paquete(informe_id, paquete):
+@app.route('/progreso-agente/<informe_id>')
+def progreso_agente(informe_id):
     """
-    Endpoint para obtener un paquete específico de motivaciones.
-    Procesa el paquete si aún no está generado.
+    Stream Server-Sent Events con el progreso del análisis en segundo plano.
+    Eventos: 'inicio_paquete', 'elemento', 'paquete', 'error_paquete',
+    'completado' y 'error'.
     """
-    if informe_id not in informes_generados:
+    progreso = gestor_pipelines.obtener(informe_id)
+    if progreso is None:
         return jsonify({
             'success': False,
-            'message': 'Informe no encontrado'
+            'message': 'No hay ningún análisis en curso para este informe'
         }), 404
     
-    try:
-        conjetura = informes_generados[informe_id]['conjetura']
-        analisis = informes_generados[informe_id]['analisis']
+    # Al reconectar, EventSource envía el último id recibido
+    ultimo_id = request.headers.get('Last-Event-ID', '')
+    desde = int(ultimo_id) + 1 if ultimo_id.isdigit() else 0
+    
+    return Response(
+        stream_with_context(stream_sse(progreso, desde)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def ejecutar_pipeline(informe_id, progreso):
+    """
+    Genera en orden los paquetes pendientes de un informe publicando cada resultado
+    
+    Si el informe caduca o se elimina del almacén a mitad del análisis, se
+    detiene con un evento 'error' (ver GestorPipelines).
+    """
+    log.info("🚀 Iniciando análisis del Método Formal Causal en segundo plano", extra={'informe_id': informe_id})
+    
+    for paquete in PAQUETES:
+        # Se relee en cada paquete: /obtener-paquete puede haberlo generado mientras el pipeline avanzaba
+        _, analisis = preparar_analisis(informe_id)
+        existente = paquete_vigente(informe_id, analisis, paquete)
+        if existente:
+            progreso.publicar('paquete', respuesta_paquete(paquete, existente, cached=True))
+            continue
         
-        print(f"DEBUG: Solicitado paquete='{paquete}', tipo={type(paquete)}")
+        progreso.publicar('inicio_paquete', {'paquete': paquete})
         
-        # Diccionario de prompts (fuera del if para evitar scope issues)
-        prompts_motivaciones = {
-            'preceptivas': PROMPT_PRECEPTIVAS,
-            'tecnicas': PROMPT_TECNICAS,
-            'facultativas': PROMPT_FACULTATIVAS,
-            'progresistas': PROMPT_PROGRESISTAS
-        }
+        def publicar(indice, elemento):
+            # Cada elemento se publica en cuanto el modelo lo completa
+            progreso.publicar('elemento', {'paquete': paquete, 'indice': indice, 'elemento': elemento})
+        
+        try:
+            resultado, cached = generar_paquete_informe(informe_id, paquete, publicar)
+        except InformeNoDisponible:
+            raise
+        except Exception as e:
+            log.exception("❌ Error al generar paquete %s: %s", paquete, e,
+                          extra={'informe_id': informe_id, 'etapa': paquete})
+            progreso.publicar('error_paquete', {'paquete': paquete, 'message': str(e)})
+            continue
         
-        print(f"DEBUG: Claves disponibles en prompts_motivaciones: {list(prompts_motivaciones.keys())}")
+        log.info("✅ Paquete '%s' generado en segundo plano", paquete,
+                 extra={'informe_id': informe_id, 'etapa': paquete})
+        progreso.publicar('paquete', respuesta_paquete(paquete, resultado, cached=cached))
+    
+    progreso.publicar('completado', {'success': True})
+
+def datos_informe(informe_id):
+    """Datos del informe; lanza InformeNoDisponible si ya no está en el almacén"""
+    datos = almacen_informes.obtener(informe_id)
+    if datos is None:
+        raise InformeNoDisponible(f"El informe {informe_id} ya no está disponible (caducado o eliminado)")
+    return datos
+
+def preparar_analisis(informe_id):
+    """Devuelve (conjetura, analisis) del informe, creando el análisis vacío si aún no existe"""
+    datos = datos_informe(informe_id)
+    if not datos.get('analisis'):
+        datos['analisis'] = analisis_vacio()
+        almacen_informes.actualizar(informe_id, analisis=datos['analisis'])
+        nueva_version(informe_id)
+    return datos['conjetura'], datos['analisis']
+
+def guardar_paquete_generado(informe_id, conjetura, analisis, paquete, resultado, respaldo=False):
+    """
+    Guarda un paquete recién generado junto con el hash de sus entradas (conjetura
+    y paquetes previos, ver agentes.dependencias) y lo registra en los checkpoints
+    
+    Con respaldo=True el paquete es el contenido de demostración que se usa cuando
+    falla el LLM: se muestra, pero queda en 'respaldos' para volver a generarlo en
+    la siguiente petición y no se registra en los checkpoints.
+    """
+    datos_informe(informe_id)
+    almacen_informes.actualizar_paquete(informe_id, paquete, resultado)
+    with hashes_lock:
+        datos = datos_informe(informe_id)
+        hashes = dict(datos.get('hashes_entrada') or {})
+        hashes[paquete] = hash_entrada(conjetura, analisis, paquete)
+        respaldos = set(datos.get('respaldos') or ())
+        if respaldo:
+            log.warning("🛟 Paquete '%s' guardado con contenido de respaldo; se regenerará", paquete,
+                        extra={'informe_id': informe_id, 'etapa': paquete})
+            respaldos.add(paquete)
+        else:
+            respaldos.discard(paquete)
+        almacen_informes.actualizar(informe_id, hashes_entrada=hashes, respaldos=sorted(respaldos),
+                                    version=datos.get('version', 0) + 1)
+    cache_paginas.invalidar(informe_id)
+    sincronizar_checkpoint(informe_id, conjetura, analisis, respaldos)
+
+def paquete_vigente(informe_id, analisis, paquete):
+    """
+    Resultado ya generado del paquete, o None si falta o si es contenido de
+    respaldo (ver guardar_paquete_generado), que se vuelve a intentar
+    """
+    if paquete in (datos_informe(informe_id).get('respaldos') or ()):
+        return None
+    return obtener_resultado_paquete(analisis, paquete)
+
+def nueva_version(informe_id):
+    """Incrementa la versión del informe tras modificarlo y descarta sus páginas renderizadas"""
+    with hashes_lock:
+        version = datos_informe(informe_id).get('version', 0) + 1
+        almacen_informes.actualizar(informe_id, version=version)
+    cache_paginas.invalidar(informe_id)
+
+def respuesta_paquete(paquete, datos, cached):
+    """Cuerpo JSON de un paquete, igual en /obtener-paquete y en el stream de progreso"""
+    campo = {'objetivos': 'objetivos', 'que_es': 'definicion'}.get(paquete, 'motivaciones')
+    return {
+        'success': True,
+        'paquete': paquete,
+        campo: datos,
+        'cached': cached
+    }
+
+def generar_paquete_informe(informe_id, paquete, publicar=None):
+    """
+    Genera un paquete del informe y lo guarda, salvo que ya esté generado o en
+    un checkpoint. Comparte la generación con cualquier otra en curso del mismo
+    paquete (pipeline en segundo plano, especulación o petición duplicada).
+    
+    Con `publicar(indice, elemento)` los paquetes de lista se generan en
+    streaming y cada elemento se entrega en cuanto el modelo lo completa; solo
+    se llama si el paquete se genera en esta llamada (cached es False).
+    
+    Returns:
+        (resultado, cached): cached es True si no se ha generado en esta llamada
+    """
+    ya_generado = False
+    
+    def generar():
+        nonlocal ya_generado
+        # Se comprueba dentro del vuelo: si otra petición acaba de terminar, su resultado ya está guardado
+        conjetura, analisis = preparar_analisis(informe_id)
+        existente = paquete_vigente(informe_id, analisis, paquete)
+        if existente:
+            log.debug("📦 Paquete '%s' ya generado (cache)", paquete, extra={'etapa': paquete})
+            ya_generado = True
+            return existente
         
-        # Verificar si el paquete ya fue generado
-        if paquete in prompts_motivaciones:
-            if analisis['por_que'][paquete]:
-                print(f"📦 Paquete '{paquete}' ya generado (cache)")
-                return jsonify({
-                    'success': True,
-                    'paquete': paquete,
-                    'motivaciones': analisis['por_que'][paquete],
-                    'cached': True
-                })
-            
-            # Generar el paquete específico
-            print(f"🔍 Analizando motivaciones {paquete.upper()}...")
-            
-            llm = get_llm()
-            prompt_template = prompts_motivaciones[paquete]
-            
-            # Formatear el prompt según el paquete
-            print(f"DEBUG: Formateando prompt para paquete='{paquete}'")
-            if paquete == 'preceptivas':
-                print(f"DEBUG: Caso preceptivas")
-                prompt = prompt_template.format(conjetura=conjetura)
-            elif paquete == 'tecnicas':
-                print(f"DEBUG: Caso tecnicas")
-                preceptivas_str = json.dumps(analisis['por_que']['preceptivas'], indent=2, ensure_ascii=False)
-                prompt = prompt_template.format(conjetura=conjetura, preceptivas=preceptivas_str)
-            elif paquete == 'facultativas':
-                preceptivas_str = json.dumps(analisis['por_que']['preceptivas'], indent=2, ensure_ascii=False)
-                tecnicas_str = json.dumps(analisis['por_que']['tecnicas'], indent=2, ensure_ascii=False)
-                prompt = prompt_template.format(conjetura=conjetura, preceptivas=preceptivas_str, tecnicas=tecnicas_str)
-            elif paquete == 'progresistas':
-                preceptivas_str = json.dumps(analisis['por_que']['preceptivas'], indent=2, ensure_ascii=False)
-                tecnicas_str = json.dumps(analisis['por_que']['tecnicas'], indent=2, ensure_ascii=False)
-                facultativas_str = json.dumps(analisis['por_que']['facultativas'], indent=2, ensure_ascii=False)
-                prompt = prompt_template.format(
-                    conjetura=conjetura,
-                    preceptivas=preceptivas_str,
-                    tecnicas=tecnicas_str,
-                    facultativas=facultativas_str
-                )
-            
-            # Crear un default específico para este paquete
-            result = safe_llm_call(llm, prompt, None)
-            
-            # Si el resultado es None o no es dict, usar array vacío
-            if result is None or not isinstance(result, dict):
-                print(f"⚠️ LLM no devolvió resultado válido para {paquete}")
-                motivaciones = []
-            elif paquete in result:
-                motivaciones = result[paquete]
+        # Un análisis con checkpoints de este informe puede haberlo generado ya
+        resultado = paquete_en_checkpoint(informe_id, paquete)
+        with detectar_respaldos() as respaldos:
+            if resultado:
+                log.debug("💾 Paquete '%s' recuperado del checkpoint", paquete, extra={'etapa': paquete})
+                guardar_resultado_paquete(analisis, paquete, resultado)
             else:
-                print(f"⚠️ La clave '{paquete}' no está en el resultado del LLM. Claves disponibles: {list(result.keys())}")
-                motivaciones = []
-            
-            # Guardar en memoria
-            analisis['por_que'][paquete] = motivaciones
-            
-            num_motivaciones = len(motivaciones)
-            print(f"✅ Encontradas {num_motivaciones} motivaciones {paquete}")
-            
-            return jsonify({
-                'success': True,
-                'paquete': paquete,
-                'motivaciones': motivaciones,
-                'cached': False
-            })
-            
-        elif paquete == 'objetivos':
-            if analisis['para_que']:
-                print(f"📦 Objetivos ya generados (cache)")
-                return jsonify({
-                    'success': True,
-                    'paquete': 'objetivos',
-                    'objetivos': analisis['para_que'],
-                    'cached': True
-                })
-            
-            # Generar objetivos
-            print(f"🔍 Analizando OBJETIVOS (¿Para qué?)...")
-            
-            llm = get_llm()
-            preceptivas_str = json.dumps(analisis['por_que']['preceptivas'], indent=2, ensure_ascii=False)
-            tecnicas_str = json.dumps(analisis['por_que']['tecnicas'], indent=2, ensure_ascii=False)
-            facultativas_str = json.dumps(analisis['por_que']['facultativas'], indent=2, ensure_ascii=False)
-            progresistas_str = json.dumps(analisis['por_que']['progresistas'], indent=2, ensure_ascii=False)
-            
-            prompt = PROMPT_OBJETIVOS.format(
-                conjetura=conjetura,
-                preceptivas=preceptivas_str,
-                tecnicas=tecnicas_str,
-                facultativas=facultativas_str,
-                progresistas=progresistas_str
-            )
-            
-            result = safe_llm_call(llm, prompt, {"para_que": []})
-            objetivos = result.get('para_que', [])
-            analisis['para_que'] = objetivos
-            
-            num_objetivos = len(objetivos)
-            print(f"✅ Encontrados {num_objetivos} objetivos")
-            
-            return jsonify({
-                'success': True,
-                'paquete': 'objetivos',
-                'objetivos': objetivos,
-                'cached': False
-            })
-            
-        elif paquete == 'que_es':
-            if analisis['que_es']:
-                print(f"📦 Definición 'Qué es' ya generada (cache)")
-                return jsonify({
-                    'success': True,
-                    'paquete': 'que_es',
-                    'definicion': analisis['que_es'],
-                    'cached': True
-                })
-            
-            # Generar qué es
-            print(f"🔍 Definiendo QUÉ ES el problema...")
-            
-            llm = get_llm()
-            preceptivas_str = json.dumps(analisis['por_que']['preceptivas'], indent=2, ensure_ascii=False)
-            tecnicas_str = json.dumps(analisis['por_que']['tecnicas'], indent=2, ensure_ascii=False)
-            facultativas_str = json.dumps(analisis['por_que']['facultativas'], indent=2, ensure_ascii=False)
-            progresistas_str = json.dumps(analisis['por_que']['progresistas'], indent=2, ensure_ascii=False)
-            objetivos_str = json.dumps(analisis['para_que'], indent=2, ensure_ascii=False)
-            
-            prompt = PROMPT_QUE_ES.format(
-                conjetura=conjetura,
-                preceptivas=preceptivas_str,
-                tecnicas=tecnicas_str,
-                facultativas=facultativas_str,
-                progresistas=progresistas_str,
-                objetivos=objetivos_str
-            )
-            
-            result = safe_llm_call(llm, prompt, {"que_es": {}})
-            definicion = result.get('que_es', {})
-            analisis['que_es'] = definicion
-            
-            print(f"✅ Definición completada")
-            
-            return jsonify({
-                'success': True,
-                'paquete': 'que_es',
-                'definicion': definicion,
-                'cached': False
-            })
+                # Generar el paquete específico
+                log.debug("🔍 Analizando paquete %s...", paquete.upper(), extra={'etapa': paquete})
+                if publicar is None or paquete == 'que_es':
+                    resultado = generar_paquete(paquete, conjetura, analisis)
+                else:
+                    for indice, elemento in enumerate(generar_paquete_stream(paquete, conjetura, analisis)):
+                        publicar(indice, elemento)
+                    resultado = obtener_resultado_paquete(analisis, paquete)
+        guardar_paquete_generado(informe_id, conjetura, analisis, paquete, resultado, respaldo=bool(respaldos))
         
+        if paquete == 'que_es':
+            log.info("✅ Definición completada", extra={'etapa': paquete})
+        else:
+            log.info("✅ Encontrados %d elementos en %s", len(resultado), paquete, extra={'etapa': paquete})
+        return resultado
+    
+    # El pipeline en segundo plano y la especulación usan la misma clave: todos comparten la generación
+    with medir_informe(informe_id):
+        resultado, compartido = vuelos_paquetes.ejecutar((informe_id, paquete), generar)
+    if compartido:
+        log.debug("🔗 Paquete '%s' compartido con una generación ya en curso", paquete,
+                  extra={'informe_id': informe_id, 'etapa': paquete})
+    return resultado, ya_generado or compartido
+
+@app.route('/obtener-paquete/<informe_id>/<paquete>', methods=['GET'])
+def obtener_paquete(informe_id, paquete):
+    """
+    Endpoint para obtener un paquete específico de motivaciones.
+    Procesa el paquete si aún no está generado.
+    """
+    if informe_id not in almacen_informes:
+        return jsonify({
+            'success': False,
+            'message': 'Informe no encontrado'
+        }), 404
+    
+    if paquete not in PAQUETES:
         return jsonify({
             'success': False,
             'message': 'Paquete no reconocido'
         }), 400
+    
+    try:
+        log.debug("Solicitado paquete '%s'", paquete, extra={'informe_id': informe_id, 'etapa': paquete})
+        resultado, cached = generar_paquete_informe(informe_id, paquete)
+        return jsonify(respuesta_paquete(paquete, resultado, cached=cached))
         
     except Exception as e:
-        print(f"❌ Error al obtener paquete {paquete}: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error al obtener paquete %s: %s", paquete, e,
+                      extra={'informe_id': informe_id, 'etapa': paquete})
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
 
+@app.route('/obtener-paquete-stream/<informe_id>/<paquete>', methods=['GET'])
+def obtener_paquete_stream(informe_id, paquete):
+    """
+    Variante en streaming (Server-Sent Events) de /obtener-paquete.
+    Envía un evento 'motivacion' por cada elemento en cuanto el modelo lo
+    completa y un evento 'fin' con la lista completa y los tiempos.
+    """
+    if informe_id not in almacen_informes:
+        return jsonify({
+            'success': False,
+            'message': 'Informe no encontrado'
+        }), 404
+    
+    if paquete not in PAQUETES or paquete == 'que_es':
+        return jsonify({
+            'success': False,
+            'message': 'Paquete no reconocido o sin soporte de streaming'
+        }), 400
+    
+    # La generación corre en segundo plano como dueña del vuelo (informe_id, paquete): la
+    # especulación, el pipeline o /obtener-paquete que lleguen mientras tanto se unen a ella,
+    # y si ya había una en curso es esta petición la que espera su resultado. Los elementos
+    # se reparten a la respuesta SSE a través de un progreso, y la generación termina y se
+    # guarda aunque el navegador cierre la conexión.
+    progreso = ProgresoPipeline(informe_id)
+    inicio = time.perf_counter()
+    ms_primera = None
+    
+    def publicar(indice, elemento):
+        nonlocal ms_primera
+        if ms_primera is None:
+            ms_primera = round((time.perf_counter() - inicio) * 1000)
+            log.debug("⏱️ Primera motivación de '%s' en %d ms", paquete, ms_primera,
+                      extra={'informe_id': informe_id, 'etapa': paquete})
+        progreso.publicar('motivacion', {'indice': indice, 'motivacion': elemento})
+    
+    def transmitir():
+        try:
+            resultado, cached = generar_paquete_informe(informe_id, paquete, publicar)
+            if cached:
+                # Ya estaba guardado o lo generó otra petición: se envía completo
+                for indice, elemento in enumerate(resultado):
+                    publicar(indice, elemento)
+            progreso.publicar('fin', {
+                **respuesta_paquete(paquete, resultado, cached=cached),
+                'ms_primera_motivacion': ms_primera or 0,
+                'ms_total': round((time.perf_counter() - inicio) * 1000)
+            })
+        except Exception as e:
+            log.exception("❌ Error en streaming del paquete %s: %s", paquete, e,
+                          extra={'informe_id': informe_id, 'etapa': paquete})
+            progreso.publicar('error', {'success': False, 'message': str(e)})
+        finally:
+            progreso.terminar()
+    
+    threading.Thread(target=transmitir, name=f'stream-{paquete}', daemon=True).start()
+    
+    return Response(
+        stream_with_context(stream_sse(progreso)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/revisar-motivaciones/<informe_id>')
 def revisar_motivaciones(informe_id):
     """Página para revisar y editar motivaciones antes de generar el informe"""
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return redirect(url_for('index'))
     
-    data = informes_generados[informe_id]
+    data = almacen_informes.obtener(informe_id)
+    analisis = data.get('analisis')
+    obsoletos = []
+    if analisis:
+        obsoletos = etapas_obsoletas(data['conjetura'], analisis, data.get('hashes_entrada') or {})
+        # Las claves internas (p. ej. '_contexto' de versiones anteriores) no se envían al navegador
+        analisis = {clave: valor for clave, valor in analisis.items() if not clave.startswith('_')}
     return render_template('revisar_motivaciones.html', 
                          informe_id=informe_id,
                          conjetura=data['conjetura'],
-                         analisis_data=data.get('analisis'))
+                         analisis_data=analisis,
+                         obsoletos=obsoletos)
 
 @app.route('/guardar-motivacion', methods=['POST'])
 def guardar_motivacion():
@@ -307,66 +436,193 @@ def guardar_motivacion():
     indice = data.get('indice')
     motivacion = data.get('motivacion')
     
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return jsonify({
             'success': False,
             'message': 'Informe no encontrado'
         }), 404
     
     try:
-        # Actualizar la motivación en memoria
-        analisis = informes_generados[informe_id]['analisis']
-        analisis['por_que'][paquete][indice] = motivacion
+        # Actualizar solo la motivación editada
+        almacen_informes.actualizar_motivacion(informe_id, paquete, indice, motivacion)
+        nueva_version(informe_id)
         
-        print(f"💾 Motivación guardada: {paquete}[{indice}] - {motivacion['titulo'][:50]}")
+        log.info("💾 Motivación guardada: %s[%s] - %s", paquete, indice, motivacion['titulo'][:50],
+                 extra={'informe_id': informe_id, 'etapa': paquete})
+        
+        # Las etapas generadas a partir de la editada quedan obsoletas hasta /refrescar-informe
+        datos = almacen_informes.obtener(informe_id)
+        obsoletos = etapas_obsoletas(datos['conjetura'], datos['analisis'], datos.get('hashes_entrada') or {})
+        # Los checkpoints solo se rehacen si guardan algo que la edición ha dejado desfasado:
+        # etapas generadas a partir de la versión anterior o el propio paquete editado
+        if obsoletos or paquete_en_checkpoint(informe_id, paquete):
+            pendientes = set(obsoletos) | set(datos.get('respaldos') or ())
+            reiniciar_checkpoint(informe_id, datos['conjetura'], datos['analisis'], pendientes)
         
         return jsonify({
             'success': True,
-            'message': 'Motivación guardada correctamente'
+            'message': 'Motivación guardada correctamente',
+            'obsoletos': obsoletos
         })
     except Exception as e:
-        print(f"❌ Error al guardar motivación: {e}")
+        log.exception("❌ Error al guardar motivación: %s", e, extra={'informe_id': informe_id, 'etapa': paquete})
         return jsonify({
             'success': False,
             'message': f'Error al guardar: {str(e)}'
         }), 500
 
+@app.route('/personalizar-seccion', methods=['POST'])
+def personalizar_seccion_informe():
+    """
+    Personalizar campos de una sección de plantilla del informe (p. ej. los datos del perito).
+    El informe pasa a guardar su propia copia de esa sección; la plantilla compartida no cambia.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Se esperaba un objeto JSON'
+        }), 400
+    informe_id = data.get('informe_id')
+    seccion = data.get('seccion')
+    campos = data.get('campos') or {}
+    
+    if not isinstance(informe_id, str) or informe_id not in almacen_informes:
+        return jsonify({
+            'success': False,
+            'message': 'Informe no encontrado'
+        }), 404
+    
+    if seccion not in SECCIONES_PERSONALIZABLES:
+        return jsonify({
+            'success': False,
+            'message': 'Sección no personalizable'
+        }), 400
+    
+    if not isinstance(campos, dict) or not all(isinstance(valor, str) for valor in campos.values()):
+        return jsonify({
+            'success': False,
+            'message': "'campos' debe ser un objeto con valores de texto"
+        }), 400
+    
+    try:
+        with hashes_lock:
+            actual = datos_informe(informe_id).get(seccion) or SECCIONES_PLANTILLA[seccion]
+            almacen_informes.actualizar(informe_id, **{seccion: personalizar_seccion(actual, campos)})
+        nueva_version(informe_id)
+        
+        log.info("💾 Sección '%s' personalizada", seccion, extra={'informe_id': informe_id})
+        
+        return jsonify({
+            'success': True,
+            'message': 'Sección guardada correctamente'
+        })
+    except (InformeNoDisponible, KeyError):
+        # Caducado o eliminado entre la comprobación y la escritura
+        return jsonify({
+            'success': False,
+            'message': 'Informe no encontrado'
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/refrescar-informe/<informe_id>', methods=['POST'])
+def refrescar_informe(informe_id):
+    """
+    Regenera solo las etapas obsoletas tras editar motivaciones, en el orden del grafo.
+    Cada etapa se comprueba con el análisis ya actualizado por las anteriores:
+    si el hash de sus entradas no ha cambiado, se conserva.
+    """
+    if informe_id not in almacen_informes:
+        return jsonify({
+            'success': False,
+            'message': 'Informe no encontrado'
+        }), 404
+    
+    try:
+        conjetura, analisis = preparar_analisis(informe_id)
+        hashes = almacen_informes.obtener(informe_id).get('hashes_entrada') or {}
+        regenerados, sin_cambios = [], []
+        
+        with medir_informe(informe_id):
+            for paquete in PAQUETES:
+                if paquete not in hashes or not obtener_resultado_paquete(analisis, paquete):
+                    continue
+                if hashes[paquete] == hash_entrada(conjetura, analisis, paquete):
+                    sin_cambios.append(paquete)
+                    continue
+                
+                log.info("🔄 Regenerando paquete obsoleto '%s'", paquete, extra={'etapa': paquete})
+                
+                def regenerar():
+                    with detectar_respaldos() as respaldos:
+                        resultado = generar_paquete(paquete, conjetura, analisis)
+                    guardar_paquete_generado(informe_id, conjetura, analisis, paquete, resultado,
+                                             respaldo=bool(respaldos))
+                    return resultado
+                
+                resultado, compartido = vuelos_paquetes.ejecutar((informe_id, paquete), regenerar)
+                if compartido:
+                    guardar_resultado_paquete(analisis, paquete, resultado)
+                regenerados.append(paquete)
+        
+        reiniciar_checkpoint(informe_id, conjetura, analisis, datos_informe(informe_id).get('respaldos') or ())
+        
+        return jsonify({
+            'success': True,
+            'regenerados': regenerados,
+            'sin_cambios': sin_cambios
+        })
+    except Exception as e:
+        log.exception("❌ Error al refrescar el informe: %s", e, extra={'informe_id': informe_id})
+        return jsonify({
+            'success': False,
+            'message': f'Error al refrescar: {str(e)}'
+        }), 500
+
 @app.route('/generar-informe-final', methods=['POST'])
 def generar_informe_final():
     """Generar el informe final después de revisar las motivaciones"""
     data = request.get_json()
     informe_id = data.get('informe_id')
     
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return jsonify({
             'success': False,
             'message': 'Informe no encontrado'
         }), 404
     
     try:
-        datos = informes_generados[informe_id]
+        datos = almacen_informes.obtener(informe_id)
         
-        print(f"\n{'='*60}")
-        print(f"📄 GENERANDO INFORME FINAL")
-        print(f"{'='*60}\n")
+        log.info("📄 Generando informe final", extra={'informe_id': informe_id})
         
         # Generar el informe completo con las motivaciones revisadas
         informe_data = generar_informe_con_ia(datos['conjetura'], datos['analisis'])
         
         # Reemplazar los datos con el informe completo
-        informes_generados[informe_id] = informe_data
-        informes_generados[informe_id]['informe_generado'] = True
+        informe_data['informe_generado'] = True
+        informe_data['hashes_entrada'] = datos.get('hashes_entrada') or {}
+        # Las secciones de plantilla que el usuario ya personalizó se conservan
+        for seccion in SECCIONES_PERSONALIZABLES:
+            if datos.get(seccion):
+                informe_data[seccion] = datos[seccion]
+        with hashes_lock:
+            informe_data['version'] = almacen_informes.obtener(informe_id).get('version', 0) + 1
+            almacen_informes.guardar(informe_id, informe_data)
+        cache_paginas.invalidar(informe_id)
         
-        print(f"✅ Informe generado correctamente\n")
+        log.info("✅ Informe generado correctamente", extra={'informe_id': informe_id})
         
         return jsonify({
             'success': True,
             'message': 'Informe generado correctamente'
         })
     except Exception as e:
-        print(f"❌ Error al generar informe final: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error al generar informe final: %s", e, extra={'informe_id': informe_id})
         return jsonify({
             'success': False,
             'message': f'Error al generar informe: {str(e)}'
@@ -375,25 +631,158 @@ def generar_informe_final():
 @app.route('/informe/<informe_id>')
 def ver_informe(informe_id):
     """Mostrar el informe generado"""
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return redirect(url_for('index'))
     
-    informe_data = informes_generados[informe_id]
+    informe_data = almacen_informes.obtener(informe_id)
     
     # Si el informe no ha sido generado aún, redirigir a revisión
     if not informe_data.get('informe_generado', True):
         return redirect(url_for('revisar_motivaciones', informe_id=informe_id))
     
-    return render_template('informe.html', informe=informe_data, informe_id=informe_id)
+    return respuesta_pagina('informe', informe_id, informe_data,
+                            lambda: render_template('informe.html', informe=informe_data, informe_id=informe_id))
 
 @app.route('/mapa-conceptual/<informe_id>')
 def ver_mapa_conceptual(informe_id):
     """Mostrar el mapa conceptual del informe"""
-    if informe_id not in informes_generados:
+    if informe_id not in almacen_informes:
         return redirect(url_for('index'))
     
-    informe_data = informes_generados[informe_id]
-    return render_template('mapa_conceptual_v2.html', informe=informe_data, informe_id=informe_id)
+    informe_data = almacen_informes.obtener(informe_id)
+    return respuesta_pagina('mapa', informe_id, informe_data,
+                            lambda: render_template('mapa_conceptual_v2.html', informe=informe_data, informe_id=informe_id))
+
+def respuesta_pagina(vista, informe_id, informe_data, renderizar):
+    """
+    Sirve una página del informe desde la caché de páginas renderizadas, con ETag
+    fuerte y gzip si el navegador lo acepta. Responde 304 si el navegador ya
+    tiene esa misma versión.
+    """
+    pagina = cache_paginas.obtener(vista, informe_id, informe_data.get('version', 0), renderizar)
+    cuerpo, etag, comprimido = pagina.variante(request.accept_encodings['gzip'] > 0)
+    
+    if request.if_none_match.contains_weak(etag):
+        respuesta = Response(status=304)
+    else:
+        respuesta = Response(cuerpo, mimetype='text/html')
+        if comprimido:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+    respuesta.set_etag(etag)
+    respuesta.vary.add('Accept-Encoding')
+    # El navegador puede guardarla, pero debe revalidarla en cada visita (con If-None-Match)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+@app.route('/metricas/almacen')
+def metricas_almacen():
+    """Ocupación del almacén de informes, contadores de expulsión y peticiones coalescidas"""
+    return jsonify({
+        **almacen_informes.metricas(),
+        'coalescencia_paquetes': vuelos_paquetes.estadisticas(),
+        'coalescencia_llm': vuelos_llm.estadisticas(),
+        'especulacion': gestor_especulacion.estadisticas(),
+        'paginas': cache_paginas.estadisticas()
+    })
+
+@app.route('/metricas/validacion')
+def metricas_validacion():
+    """Respuestas del LLM válidas, fuera de esquema y sin JSON, por modo y etapa"""
+    return jsonify({
+        'salida_estructurada': SALIDA_ESTRUCTURADA,
+        'etapas': estadisticas_validacion()
+    })
+
+@app.route('/metricas/llm')
+def metricas_llm():
+    """Reintentos, timeouts, reparaciones, respaldos y estado del cortocircuito de las llamadas al LLM"""
+    return jsonify(politica_llm.estadisticas())
+
+@app.route('/metricas/informe/<informe_id>')
+def metricas_informe(informe_id):
+    """Desglose por etapa del tiempo (prompt, espera al LLM, parseo) y los tokens de un informe"""
+    desglose = metricas.desglose_informe(informe_id)
+    if desglose is None:
+        return jsonify({
+            'success': False,
+            'message': 'Sin métricas para este informe'
+        }), 404
+    return jsonify(desglose)
+
+@app.route('/metrics')
+def metrics():
+    """Todas las métricas en formato de texto de Prometheus"""
+    return Response(metricas.exportar_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def recolectar_metricas():
+    """Contadores existentes (caché, coalescencia, política, validación, almacén) como muestras de Prometheus"""
+    cache = obtener_cache()
+    if cache is not None:
+        estadisticas = cache.estadisticas()
+        yield ('informes_cache_llm_consultas_total', 'counter', 'Consultas a la caché de respuestas del LLM',
+               {'resultado': 'acierto'}, estadisticas['aciertos'])
+        yield ('informes_cache_llm_consultas_total', 'counter', 'Consultas a la caché de respuestas del LLM',
+               {'resultado': 'fallo'}, estadisticas['fallos'])
+        yield ('informes_cache_llm_ratio_aciertos', 'gauge', 'Proporción de aciertos de la caché de respuestas',
+               {}, estadisticas['ratio_aciertos'])
+        yield ('informes_cache_llm_entradas', 'gauge', 'Respuestas guardadas en la caché', {}, estadisticas['entradas'])
+
+    for nombre, vuelos in (('paquetes', vuelos_paquetes), ('llm', vuelos_llm)):
+        estadisticas = vuelos.estadisticas()
+        yield ('informes_coalescencia_total', 'counter', 'Ejecuciones reales y peticiones coalescidas',
+               {'tipo': nombre, 'resultado': 'ejecutada'}, estadisticas['ejecuciones'])
+        yield ('informes_coalescencia_total', 'counter', 'Ejecuciones reales y peticiones coalescidas',
+               {'tipo': nombre, 'resultado': 'compartida'}, estadisticas['compartidas'])
+        yield ('informes_coalescencia_en_curso', 'gauge', 'Generaciones en curso que otras peticiones pueden compartir',
+               {'tipo': nombre}, estadisticas['en_curso'])
+    yield ('informes_pipelines_en_curso', 'gauge', 'Análisis en segundo plano sin terminar', {}, gestor_pipelines.en_curso())
+    estadisticas = gestor_especulacion.estadisticas()
+    for resultado in ('generadas', 'ya_disponibles', 'fallidas'):
+        yield ('informes_especulacion_etapas_total', 'counter', 'Etapas lanzadas por adelantado al iniciar un informe',
+               {'resultado': resultado}, estadisticas[resultado])
+    yield ('informes_especulacion_en_curso', 'gauge', 'Informes con generación especulativa en marcha',
+           {}, estadisticas['en_curso'])
+
+    estadisticas = politica_llm.estadisticas()
+    for evento, valor in estadisticas.items():
+        if isinstance(valor, int):
+            yield ('informes_llm_eventos_total', 'counter', 'Llamadas, reintentos, reparaciones y respaldos del LLM',
+                   {'evento': evento}, valor)
+    yield ('informes_llm_circuito_abierto', 'gauge', 'Cortocircuito de Ollama abierto (1) o cerrado (0)',
+           {}, 0 if estadisticas['circuito'] == 'cerrado' else 1)
+
+    for clave, contador in estadisticas_validacion().items():
+        modo, etapa = clave.split(':', 1)
+        for resultado, valor in contador.items():
+            yield ('informes_validacion_respuestas_total', 'counter', 'Respuestas del LLM por resultado de validación',
+                   {'modo': modo, 'etapa': etapa, 'resultado': resultado}, valor)
+
+    for etapa, valores in estadisticas_prompts().items():
+        if 'media' in valores:
+            yield ('informes_prompt_tokens_estimados', 'gauge', 'Tokens estimados medios del prompt por etapa',
+                   {'etapa': etapa}, valores['media'])
+
+    estadisticas = cache_paginas.estadisticas()
+    for resultado in ('aciertos', 'fallos'):
+        yield ('informes_cache_paginas_total', 'counter', 'Visitas a /informe y /mapa-conceptual servidas desde la caché o renderizadas',
+               {'resultado': resultado}, estadisticas[resultado])
+    yield ('informes_cache_paginas_bytes', 'gauge', 'Bytes de HTML renderizado (y gzip) en la caché de páginas',
+           {}, estadisticas['bytes'])
+
+    estadisticas = registro_grafos.estadisticas()
+    yield ('informes_grafos_compilaciones_total', 'counter', 'Compilaciones de grafos del agente',
+           {}, estadisticas['compilaciones'])
+    yield ('informes_grafos_reutilizaciones_total', 'counter', 'Análisis que reutilizaron un grafo ya compilado',
+           {}, estadisticas['reutilizaciones'])
+
+    yield ('informes_log_descartados_total', 'counter', 'Mensajes de log perdidos con la cola llena',
+           {}, mensajes_descartados())
+
+    for clave, valor in almacen_informes.metricas().items():
+        if isinstance(valor, (int, float)):
+            yield ('informes_almacen', 'gauge', 'Ocupación y contadores del almacén de informes', {'clave': clave}, valor)
+
+metricas.registrar_recolector(recolectar_metricas)
 
 @app.route('/metodo-formal-causal')
 def metodo_info():
@@ -426,6 +815,10 @@ def generar_informe_con_ia(conjetura: str, analisis: dict):
     """
     Genera un informe completo usando el análisis del agente de IA
     
+    Las secciones fijas (perito, solicitante, antecedentes, metodología,
+    conclusiones y anexos) se referencian desde la plantilla compartida; el
+    informe solo guarda sus campos propios y, al personalizarlas, su copia.
+    
     Args:
         conjetura: Texto de la conjetura inicial
         analisis: Diccionario con el análisis generado por el agente (por_que, para_que, que_es)
@@ -437,25 +830,9 @@ def generar_informe_con_ia(conjetura: str, analisis: dict):
         'fecha_elaboracion': fecha_actual,
         'conjetura': conjetura,
         
-        'perito': {
-            'nombre': 'Dr./Dra. [NOMBRE DEL PERITO]',
-            'dni': '[DNI/NIE]',
-            'direccion': '[Dirección profesional completa]',
-            'telefono': '[Teléfono de contacto]',
-            'email': '[email@ejemplo.com]',
-            'titulo': '[Título profesional]',
-            'especialidad': '[Especialidad del perito]',
-            'num_colegiado': '[Número de colegiado]',
-            'experiencia': 'El perito cuenta con [X] años de experiencia en el ámbito de [especialidad], habiendo realizado numerosos informes periciales en casos similares. [Añadir más detalles relevantes sobre la experiencia].',
-            'juramento': 'Juro o prometo, por mi conciencia y honor, que ejerceré fielmente el cargo de perito, desempeñando mis funciones con imparcialidad y objetividad, cumpliendo con los deberes inherentes al mismo.'
-        },
-        
-        'solicitante': {
-            'nombre': '[Nombre del solicitante / Juzgado]',
-            'representacion': '[Abogado/Procurador o tipo de representación]',
-            'domicilio': '[Domicilio del solicitante]',
-            'tipo_encargo': '[Judicial / Extrajudicial / Particular]'
-        },
+        # Secciones de plantilla: referencias compartidas por todos los informes, no copias
+        'perito': SECCIONES_PLANTILLA['perito'],
+        'solicitante': SECCIONES_PLANTILLA['solicitante'],
         
         'descripcion': {
             'hecho': f'El presente informe pericial tiene por objeto analizar y determinar los aspectos técnicos relacionados con la siguiente conjetura: "{conjetura}". Se procederá a realizar un análisis exhaustivo aplicando el Método Formal Causal para garantizar la fundamentación de las conclusiones.',
@@ -463,35 +840,8 @@ def generar_informe_con_ia(conjetura: str, analisis: dict):
             'alcance': 'El alcance del presente informe pericial comprende el análisis técnico y científico de todos los aspectos relevantes relacionados con la conjetura planteada, aplicando la metodología del Método Formal Causal para establecer las motivaciones (preceptivas, técnicas, facultativas y progresistas), los objetivos (para qué) y la definición precisa del problema (qué es).'
         },
         
-        'antecedentes': {
-            'hechos_previos': 'Con carácter previo al presente análisis, se han identificado los siguientes hechos relevantes que constituyen el contexto de la pericia. Se establecen a continuación los antecedentes fácticos que resultan de aplicación al caso objeto de estudio.',
-            'documentacion': [
-                'Documentación aportada por el solicitante',
-                'Normativa técnica aplicable',
-                'Informes previos (si los hubiere)',
-                'Fotografías y material gráfico',
-                'Otra documentación relevante'
-            ],
-            'normativa': 'Normativa legal y técnica aplicable al caso según el análisis realizado y el ámbito de aplicación correspondiente.'
-        },
-        
-        'metodologia': {
-            'tecnicas': [
-                'Aplicación del Método Formal Causal',
-                'Análisis documental exhaustivo',
-                'Inspección técnica (si procede)',
-                'Análisis normativo aplicable',
-                'Consulta de fuentes técnicas y científicas especializadas'
-            ],
-            'criterios': 'Los criterios de valoración empleados se basan en principios de objetividad, imparcialidad y rigor científico-técnico, aplicando las mejores prácticas profesionales del sector y la normativa vigente aplicable al caso.',
-            'normas': 'Normas técnicas, legales y reglamentarias específicas aplicadas en el análisis según corresponda.',
-            'herramientas': [
-                'Sistema de Informes Periciales',
-                'Software de análisis técnico especializado',
-                'Bases de datos jurídicas y técnicas',
-                'Herramientas de medición y cálculo (si aplica)'
-            ]
-        },
+        'antecedentes': SECCIONES_PLANTILLA['antecedentes'],
+        'metodologia': SECCIONES_PLANTILLA['metodologia'],
         
         'analisis': {
             'por_que': analisis['por_que'],  # Datos generados por la IA
@@ -502,27 +852,8 @@ def generar_informe_con_ia(conjetura: str, analisis: dict):
             'evaluacion': 'Evaluación objetiva de los resultados obtenidos, contrastándolos con los estándares técnicos aplicables y la normativa vigente.'
         },
         
-        'conclusiones': {
-            'respuestas': [
-                'Primera conclusión técnica fundamentada en el análisis realizado.',
-                'Segunda conclusión técnica fundamentada en los resultados obtenidos.',
-                'Tercera conclusión técnica basada en la evaluación de los elementos probatorios.',
-                'Conclusiones adicionales según el desarrollo del análisis pericial.'
-            ],
-            'opinion_tecnica': 'Opinión técnica profesional del perito sobre el caso analizado, fundamentada en el análisis realizado y en su experiencia profesional, estableciendo de forma clara y precisa su valoración técnica del caso.',
-            'recomendaciones': [
-                'Recomendación técnica basada en las conclusiones del análisis.',
-                'Recomendación profesional derivada de los hallazgos del informe.'
-            ]
-        },
-        
-        'anexos': [
-            'Documentación fotográfica',
-            'Planos y esquemas técnicos',
-            'Cálculos y tablas detalladas',
-            'Normativa aplicable (textos completos)',
-            'Otra documentación de referencia'
-        ],
+        'conclusiones': SECCIONES_PLANTILLA['conclusiones'],
+        'anexos': SECCIONES_PLANTILLA['anexos'],
         
         'firma': {
             'lugar': '[Ciudad]',
@@ -536,50 +867,8 @@ def generar_informe_demo(conjetura):
     Genera datos de demostración para el informe (BACKUP)
     Esta función se mantiene como respaldo en caso de que falle la IA
     """
-    fecha_actual = datetime.now().strftime('%d de %B de %Y')
-    
-    # Análisis básico de respaldo
-    analisis_demo = {
-        'por_que': {
-            'preceptivas': [
-                {
-                    'titulo': 'Análisis del enunciado del problema',
-                    'contenido': 'Estudio detallado de los elementos esenciales del problema tal como ha sido formulado.'
-                }
-            ],
-            'tecnicas': [
-                {
-                    'titulo': 'Marco normativo aplicable',
-                    'contenido': 'Identificación de leyes, normas técnicas y estándares profesionales aplicables.'
-                }
-            ],
-            'facultativas': [
-                {
-                    'titulo': 'Interés profesional en el caso',
-                    'contenido': 'Motivación del perito para aplicar conocimientos especializados.'
-                }
-            ],
-            'progresistas': [
-                {
-                    'titulo': 'Aportación al conocimiento técnico',
-                    'contenido': 'Identificación de aspectos novedosos del caso.'
-                }
-            ]
-        },
-        'para_que': [
-            {
-                'titulo': 'Establecer la verdad técnica de los hechos',
-                'tipo': 'preceptivas',
-                'contenido': 'Determinar con precisión la naturaleza de los hechos.'
-            }
-        ],
-        'que_es': {
-            'contenido': 'Definición precisa del problema objeto de análisis.',
-            'contexto': 'Contextualización del problema dentro del marco técnico aplicable.'
-        }
-    }
-    
-    return generar_informe_con_ia(conjetura, analisis_demo)
+    # Análisis básico de respaldo (el mismo que usan las etapas cuando falla el LLM)
+    return generar_informe_con_ia(conjetura, copy.deepcopy(ANALISIS_RESPALDO))
 
 
 if __name__ == '__main__':
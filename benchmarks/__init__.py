@@ -0,0 +1,3 @@
+"""
+Benchmarks del sistema de informes periciales (ejecutables sin Ollama)
+"""
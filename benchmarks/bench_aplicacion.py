@@ -0,0 +1,207 @@
+"""
+Benchmark de extremo a extremo contra un Ollama simulado
+Arranca benchmarks.servidor_ollama_falso en local y apunta el cliente real
+(ChatOllama y su pool HTTP) hacia él, de modo que se mide todo el camino sin
+GPU: procesar_conjetura, el flujo completo de la aplicación Flask
+(/iniciar-informe → /obtener-paquete ×6 → /generar-informe-final) y el
+procesamiento por lotes. Para cada escenario muestra p50/p95 por informe,
+informes por minuto, memoria máxima del proceso y el tiempo propio de la
+aplicación (total menos el tiempo que el servidor simulado estuvo ocupado).
+
+Uso:
+    python -m benchmarks.bench_aplicacion [--escenarios conjetura,flask,lote] [--informes 20]
+        [--latencia 0.05] [--tokens-por-segundo 500] [--concurrencia 1] [--modo secuencial]
+        [--salida-json resultados.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from agentes import cache_respuestas, checkpoints, formal_causal_agent
+from agentes.clientes_llm import registro_clientes
+from agentes.formal_causal_agent import procesar_conjetura
+from agentes.registros import configurar_registro
+from benchmarks.servidor_ollama_falso import ServidorOllamaFalso
+
+ESCENARIOS = ('conjetura', 'flask', 'lote')
+PAQUETES_FLUJO = ('preceptivas', 'tecnicas', 'facultativas', 'progresistas', 'objetivos', 'que_es')
+
+CONJETURA = (
+    "Se requiere determinar si un edificio de viviendas de 5 plantas construido en {anio} "
+    "cumple con la normativa vigente de eficiencia energética y accesibilidad (caso {numero})."
+)
+
+
+def conjetura(numero: int) -> str:
+    """Conjeturas distintas para que no se compartan prompts ni generaciones entre informes"""
+    return CONJETURA.format(anio=1990 + numero % 30, numero=numero)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def memoria_maxima_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso (None donde no hay módulo resource, p. ej. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxima = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxima / (1024 * 1024) if sys.platform == 'darwin' else maxima / 1024
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+def informe_conjetura(numero: int, modo: str) -> None:
+    resultado = procesar_conjetura(conjetura(numero), modo=modo)
+    assert resultado['success'], resultado.get('error')
+
+
+def crear_informe_flask(cliente) -> Callable[[int, str], None]:
+    def informe_flask(numero: int, modo: str) -> None:
+        respuesta = cliente.post('/iniciar-informe', json={'conjetura': conjetura(numero)})
+        informe_id = respuesta.get_json()['informe_id']
+        for paquete in PAQUETES_FLUJO:
+            respuesta = cliente.get(f'/obtener-paquete/{informe_id}/{paquete}')
+            assert respuesta.status_code == 200, respuesta.get_json()
+        respuesta = cliente.post('/generar-informe-final', json={'informe_id': informe_id})
+        assert respuesta.status_code == 200, respuesta.get_json()
+    return informe_flask
+
+
+def medir_informes(servidor: ServidorOllamaFalso, informe: Callable[[int, str], None],
+                   informes: int, concurrencia: int, modo: str, desplazamiento: int) -> Dict[str, Any]:
+    """Ejecuta `informes` informes con la concurrencia indicada y mide cada uno"""
+    tiempos: List[float] = []
+
+    def uno(numero: int) -> None:
+        inicio = time.perf_counter()
+        informe(desplazamiento + numero, modo)
+        tiempos.append(time.perf_counter() - inicio)
+
+    peticiones, ocupado = servidor.peticiones, servidor.segundos_ocupado
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(uno, range(informes)))
+    total = time.perf_counter() - inicio
+    return resumen(tiempos, total, servidor.peticiones - peticiones, servidor.segundos_ocupado - ocupado, concurrencia)
+
+
+def medir_lote(servidor: ServidorOllamaFalso, informes: int, concurrencia: int, modo: str,
+               desplazamiento: int, asincrono: bool) -> Dict[str, Any]:
+    from servicios.lote import procesar_lote
+
+    with tempfile.TemporaryDirectory() as directorio:
+        entrada = os.path.join(directorio, 'conjeturas.jsonl')
+        salida = os.path.join(directorio, 'resultados.jsonl')
+        with open(entrada, 'w', encoding='utf-8') as f:
+            for numero in range(informes):
+                f.write(json.dumps({'id': f'bench-{numero}', 'conjetura': conjetura(desplazamiento + numero)},
+                                   ensure_ascii=False) + '\n')
+
+        peticiones, ocupado = servidor.peticiones, servidor.segundos_ocupado
+        inicio = time.perf_counter()
+        datos = procesar_lote(entrada, salida, concurrencia=concurrencia, modo=modo, asincrono=asincrono)
+        total = time.perf_counter() - inicio
+        with open(salida, encoding='utf-8') as f:
+            resultados = [json.loads(linea) for linea in f if linea.strip()]
+
+    assert datos['fallidos'] == 0, f"{datos['fallidos']} informes fallidos en el lote"
+    tiempos = [r['segundos'] for r in resultados]
+    return resumen(tiempos, total, servidor.peticiones - peticiones, servidor.segundos_ocupado - ocupado, concurrencia)
+
+
+def resumen(tiempos: List[float], total: float, peticiones: int, ocupado: float, concurrencia: int) -> Dict[str, Any]:
+    datos = {
+        'informes': len(tiempos),
+        'p50_s': round(percentil(tiempos, 50), 3),
+        'p95_s': round(percentil(tiempos, 95), 3),
+        'informes_por_minuto': round(len(tiempos) / total * 60, 2),
+        'peticiones_llm': peticiones,
+        'memoria_maxima_mb': memoria_maxima_mb()
+    }
+    # Con peticiones concurrentes el tiempo del servidor se solapa y la resta deja de tener sentido
+    if concurrencia == 1:
+        datos['aplicacion_ms_por_informe'] = round((total - ocupado) / len(tiempos) * 1000, 1)
+    return datos
+
+
+# ============================================================================
+# PROGRAMA PRINCIPAL
+# ============================================================================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escenarios', default=','.join(ESCENARIOS), help='Lista separada por comas')
+    parser.add_argument('--informes', type=int, default=20, help='Informes por escenario')
+    parser.add_argument('--latencia', type=float, default=0.05, help='Segundos de prefill por llamada')
+    parser.add_argument('--tokens-por-segundo', type=float, default=500.0)
+    parser.add_argument('--concurrencia', type=int, default=1)
+    parser.add_argument('--modo', choices=['secuencial', 'paralelo', 'unico'], default='secuencial')
+    parser.add_argument('--asincrono', action='store_true', help='Lote con el camino asíncrono')
+    parser.add_argument('--salida-json', help='Guardar los resultados en este fichero')
+    args = parser.parse_args()
+
+    escenarios = [e.strip() for e in args.escenarios.split(',') if e.strip()]
+    desconocidos = set(escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios no reconocidos: {', '.join(sorted(desconocidos))}")
+
+    configurar_registro('WARNING')
+    cache_respuestas.CACHE_ACTIVA = False  # Medir generaciones reales, no aciertos de caché
+    # Checkpoints en una base temporal: los de otra ejecución darían análisis ya completados
+    directorio = tempfile.TemporaryDirectory()
+    checkpoints.CHECKPOINTS_RUTA = os.path.join(directorio.name, 'checkpoints.sqlite3')
+
+    resultados: Dict[str, Any] = {}
+    with ServidorOllamaFalso(args.latencia, args.tokens_por_segundo) as servidor:
+        formal_causal_agent.OLLAMA_BASE_URL = servidor.url
+        registro_clientes.limpiar()
+        if args.concurrencia > registro_clientes.max_conexiones:
+            registro_clientes.configurar(max_conexiones=args.concurrencia)
+        print(f"🧪 Ollama simulado en {servidor.url} (latencia {args.latencia}s, {args.tokens_por_segundo:g} tokens/s)")
+
+        for indice, escenario in enumerate(escenarios):
+            desplazamiento = indice * args.informes
+            print(f"   ▶ {escenario}...")
+            if escenario == 'conjetura':
+                datos = medir_informes(servidor, informe_conjetura, args.informes, args.concurrencia,
+                                       args.modo, desplazamiento)
+            elif escenario == 'flask':
+                from app import app
+                datos = medir_informes(servidor, crear_informe_flask(app.test_client()), args.informes,
+                                       args.concurrencia, args.modo, desplazamiento)
+            else:
+                datos = medir_lote(servidor, args.informes, args.concurrencia, args.modo,
+                                   desplazamiento, args.asincrono)
+            resultados[escenario] = datos
+
+    print(f"\n{'='*72}")
+    print(f"Modo {args.modo}, concurrencia {args.concurrencia}, {args.informes} informes por escenario")
+    print(f"{'Escenario':<11}{'p50 (s)':>9}{'p95 (s)':>9}{'inf/min':>10}{'llamadas':>10}{'app ms/inf':>12}{'RSS MB':>9}")
+    for escenario, datos in resultados.items():
+        aplicacion = datos.get('aplicacion_ms_por_informe')
+        memoria = datos['memoria_maxima_mb']
+        print(f"{escenario:<11}{datos['p50_s']:>9.3f}{datos['p95_s']:>9.3f}{datos['informes_por_minuto']:>10.1f}"
+              f"{datos['peticiones_llm']:>10}{'-' if aplicacion is None else f'{aplicacion:.1f}':>12}"
+              f"{'-' if memoria is None else f'{memoria:.0f}':>9}")
+    print(f"{'='*72}")
+
+    if args.salida_json:
+        with open(args.salida_json, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'resultados': resultados}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados guardados en {args.salida_json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: coste de compilar el grafo en cada informe frente al registro de grafos
+Mide cuánto tarda compilar cada grafo (crear_grafo_formal_causal) frente a
+obtener el compilado compartido (obtener_grafo), y el tiempo por informe de
+procesar_conjetura con un LLM falso sin latencia, recompilando en cada
+informe (comportamiento anterior) o reutilizando el grafo.
+
+Uso:
+    python -m benchmarks.bench_compilacion_grafo [--repeticiones 50]
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from agentes import cache_respuestas
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import MODOS_GRAFO, crear_grafo_formal_causal, obtener_grafo, procesar_conjetura
+from agentes.grafos import registro_grafos
+from agentes.registros import configurar_registro
+from benchmarks.respuestas_falsas import responder
+
+CONJETURA = (
+    "Se requiere determinar si un edificio de viviendas de 5 plantas construido en 2010 "
+    "cumple con la normativa vigente de eficiencia energética y accesibilidad."
+)
+
+
+def medir_ms(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Tiempo medio (milisegundos) de una llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def informe_recompilando(modo: str) -> None:
+    registro_grafos.limpiar()  # Fuerza la compilación, como antes del registro
+    procesar_conjetura(CONJETURA, modo=modo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    configurar_registro('WARNING')
+    cache_respuestas.CACHE_ACTIVA = False  # Medir generaciones reales, no aciertos de caché
+
+    print(f"\n{'='*60}")
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder)):
+        for modo in MODOS_GRAFO:
+            compilar = medir_ms(lambda: crear_grafo_formal_causal(modo), args.repeticiones)
+            obtener_grafo(modo)
+            reutilizar = medir_ms(lambda: obtener_grafo(modo), args.repeticiones)
+            antes = medir_ms(lambda: informe_recompilando(modo), args.repeticiones)
+            obtener_grafo(modo)
+            ahora = medir_ms(lambda: procesar_conjetura(CONJETURA, modo=modo), args.repeticiones)
+
+            print(f"Modo {modo}:")
+            print(f"  Compilar el grafo:          {compilar:8.2f} ms")
+            print(f"  Obtenerlo del registro:     {reutilizar:8.4f} ms")
+            print(f"  Informe recompilando:       {antes:8.2f} ms")
+            print(f"  Informe con grafo compilado:{ahora:8.2f} ms  (ahorro {antes - ahora:.2f} ms por informe)")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: extracción de JSON de las respuestas del LLM
+Compara el extractor actual (extract_json_from_response, basado en
+AnalizadorJSON) con la versión anterior basada en expresiones regulares sobre
+el corpus de benchmarks/corpus_json.py: casos resueltos correctamente y tiempo
+medio por respuesta. Termina con código 1 si el extractor actual falla algún
+caso del corpus.
+
+Uso:
+    python -m benchmarks.bench_extraccion_json [--repeticiones 2000]
+"""
+
+import argparse
+import json
+import re
+import time
+from typing import Any, Callable
+
+from agentes.formal_causal_agent import extract_json_from_response
+from agentes.json_incremental import AnalizadorJSON
+from benchmarks.corpus_json import CORPUS
+
+_SIN_RESULTADO = object()
+
+
+def extraer_json_regex(response_text: str) -> dict:
+    """Implementación anterior: json.loads y después dos búsquedas con re.DOTALL"""
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(1))
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(0))
+        raise ValueError("No se pudo extraer JSON de la respuesta")
+
+
+def extraer_por_fragmentos(texto: str, tamano: int = 16) -> Any:
+    """Alimenta el analizador como lo haría un stream del LLM"""
+    analizador = AnalizadorJSON()
+    for i in range(0, len(texto), tamano):
+        if analizador.feed(texto[i:i + tamano]) is not None:
+            break
+    return analizador.finalizar()
+
+
+def _resultado(extractor: Callable[[str], Any], texto: str) -> Any:
+    try:
+        return extractor(texto)
+    except ValueError:
+        return None
+    except Exception:
+        return _SIN_RESULTADO
+
+
+def evaluar(nombre: str, extractor: Callable[[str], Any], repeticiones: int) -> int:
+    """Muestra aciertos y tiempo medio del extractor; devuelve el número de fallos"""
+    fallos = []
+    for caso in CORPUS:
+        if _resultado(extractor, caso.texto) != caso.esperado:
+            fallos.append(caso.nombre)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for caso in CORPUS:
+            _resultado(extractor, caso.texto)
+    microsegundos = (time.perf_counter() - inicio) / (repeticiones * len(CORPUS)) * 1e6
+
+    print(f"{nombre:<14} {len(CORPUS) - len(fallos):>2}/{len(CORPUS)} correctos  {microsegundos:8.1f} µs/respuesta")
+    if fallos:
+        print(f"{'':<14} fallos: {', '.join(fallos)}")
+    return len(fallos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    evaluar('regex', extraer_json_regex, args.repeticiones)
+    fallos = evaluar('actual', extract_json_from_response, args.repeticiones)
+    fallos += evaluar('fragmentos', extraer_por_fragmentos, max(args.repeticiones // 10, 1))
+    print(f"{'='*60}")
+
+    raise SystemExit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: grafo secuencial frente a grafo paralelo y análisis en una sola llamada
+Usa un LLM falso con latencia fija para medir solo el efecto de la topología
+
+Uso:
+    python -m benchmarks.bench_grafo_paralelo [--latencia 0.5] [--repeticiones 3]
+"""
+
+import argparse
+import time
+
+from agentes import cache_respuestas
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import procesar_conjetura
+from benchmarks.respuestas_falsas import responder
+
+CONJETURA = (
+    "Se requiere determinar si un edificio de viviendas de 5 plantas construido en 2010 "
+    "cumple con la normativa vigente de eficiencia energética y accesibilidad."
+)
+
+
+def medir(modo: str, latencia: float, repeticiones: int) -> float:
+    """Tiempo medio (segundos) de procesar_conjetura en el modo indicado"""
+    tiempos = []
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder, latencia=latencia)):
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = procesar_conjetura(CONJETURA, modo=modo)
+            tiempos.append(time.perf_counter() - inicio)
+            assert resultado['success'], resultado.get('error')
+    return sum(tiempos) / len(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latencia', type=float, default=0.5, help='Segundos por llamada al LLM')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    cache_respuestas.CACHE_ACTIVA = False  # Medir generaciones reales, no aciertos de caché
+
+    secuencial = medir('secuencial', args.latencia, args.repeticiones)
+    paralelo = medir('paralelo', args.latencia, args.repeticiones)
+    unico = medir('unico', args.latencia, args.repeticiones)
+
+    print(f"\n{'='*60}")
+    print(f"Latencia simulada por llamada: {args.latencia:.2f}s")
+    print(f"Secuencial: {secuencial:.2f}s por informe")
+    print(f"Paralelo:   {paralelo:.2f}s por informe")
+    print(f"Único:      {unico:.2f}s por informe")
+    print(f"Aceleración paralelo: x{secuencial / paralelo:.2f}")
+    print(f"Aceleración único:    x{secuencial / unico:.2f}")
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: memoria de los informes finales con secciones de plantilla compartidas
+Genera N informes con generar_informe_con_ia (cada uno con su propio análisis)
+y mide con tracemalloc la memoria que ocupan en el proceso, frente a la
+construcción anterior en la que cada informe tenía su copia de las secciones
+de plantilla. También muestra el tamaño que el almacén acotado imputa a cada
+informe y el coste de personalizar una sección en una parte de los informes.
+
+Uso:
+    python -m benchmarks.bench_memoria_informes [--informes 10000] [--personalizados 0.1]
+"""
+
+import argparse
+import copy
+import gc
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from agentes.formal_causal_agent import ANALISIS_RESPALDO
+from agentes.registros import configurar_registro
+from servicios.almacenamiento import AlmacenAcotado
+from servicios.plantilla_informe import personalizar_seccion
+
+CONJETURA = (
+    "Se requiere determinar si un edificio de viviendas de 5 plantas construido en {anio} "
+    "cumple con la normativa vigente de eficiencia energética y accesibilidad (caso {numero})."
+)
+
+
+def copiar_contenedores(valor: Any) -> Any:
+    """Copia diccionarios, listas y tuplas pero no los textos, como hacía la construcción por informe"""
+    if isinstance(valor, dict):
+        return {clave: copiar_contenedores(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [copiar_contenedores(v) for v in valor]
+    return valor
+
+
+def medir(construir: Callable[[int], Dict[str, Any]], informes: int) -> Dict[str, Any]:
+    """Construye `informes` informes y mide la memoria que siguen ocupando"""
+    gc.collect()
+    tracemalloc.start()
+    inicio_memoria = tracemalloc.get_traced_memory()[0]
+    lista: List[Dict[str, Any]] = [construir(numero) for numero in range(informes)]
+    gc.collect()
+    memoria = tracemalloc.get_traced_memory()[0] - inicio_memoria
+    tracemalloc.stop()
+
+    estimado = sum(AlmacenAcotado._estimar_bytes(informe) for informe in lista[:100]) / min(100, len(lista))
+    del lista
+    return {
+        'mb': memoria / (1024 * 1024),
+        'kb_por_informe': memoria / informes / 1024,
+        'kb_almacen_por_informe': estimado / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--informes', type=int, default=10000)
+    parser.add_argument('--personalizados', type=float, default=0.1,
+                        help='Fracción de informes con los datos del perito personalizados')
+    args = parser.parse_args()
+
+    configurar_registro('WARNING')
+    from app import generar_informe_con_ia
+
+    def analisis() -> Dict[str, Any]:
+        # Cada informe tiene su propio análisis, igual en ambos escenarios
+        return copy.deepcopy(ANALISIS_RESPALDO)
+
+    def conjetura(numero: int) -> str:
+        return CONJETURA.format(anio=1990 + numero % 30, numero=numero)
+
+    def compartido(numero: int) -> Dict[str, Any]:
+        return generar_informe_con_ia(conjetura(numero), analisis())
+
+    def copias(numero: int) -> Dict[str, Any]:
+        return {clave: copiar_contenedores(valor) if clave != 'analisis' else valor
+                for clave, valor in compartido(numero).items()}
+
+    cada = max(1, round(1 / args.personalizados)) if args.personalizados > 0 else 0
+
+    def personalizado(numero: int) -> Dict[str, Any]:
+        informe = compartido(numero)
+        if cada and numero % cada == 0:
+            informe['perito'] = personalizar_seccion(informe['perito'], {'nombre': f'Perito {numero}'})
+        return informe
+
+    escenarios = {
+        'copias por informe': copias,
+        'plantilla compartida': compartido,
+        f'compartida + {args.personalizados:.0%} perito propio': personalizado
+    }
+    resultados = {nombre: medir(construir, args.informes) for nombre, construir in escenarios.items()}
+
+    print(f"\n{'='*71}")
+    print(f"{args.informes} informes finales")
+    print(f"{'Escenario':<36}{'MB':>9}{'KB/inf':>9}{'KB almacén/inf':>17}")
+    for nombre, datos in resultados.items():
+        print(f"{nombre:<36}{datos['mb']:>9.1f}{datos['kb_por_informe']:>9.2f}"
+              f"{datos['kb_almacen_por_informe']:>17.2f}")
+    base = resultados['copias por informe']['mb']
+    ahora = resultados['plantilla compartida']['mb']
+    print(f"Ahorro de la plantilla compartida: {base - ahora:.1f} MB ({(base - ahora) / base:.0%})")
+    print(f"{'='*71}")
+
+
+if __name__ == '__main__':
+    main()
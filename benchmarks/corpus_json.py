@@ -0,0 +1,116 @@
+"""
+Corpus de respuestas del LLM con los defectos de formato observados en la
+práctica, junto con el objeto que debe extraerse de cada una (None si no hay
+nada recuperable)
+"""
+
+from typing import Any, List, NamedTuple
+
+
+class CasoJSON(NamedTuple):
+    nombre: str
+    texto: str
+    esperado: Any
+
+
+_MOTIVACION = {'titulo': 'Humedades en planta baja', 'contenido': 'Los vecinos reportan humedades persistentes.'}
+_SEGUNDA = {'titulo': 'Ausencia de rampa', 'contenido': 'No existe acceso adaptado para personas con movilidad reducida.'}
+
+CORPUS: List[CasoJSON] = [
+    CasoJSON(
+        'limpio',
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}]}',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'bloque_markdown',
+        'Aquí tienes el análisis solicitado:\n\n```json\n{\n  "preceptivas": [\n    {\n      "titulo": "Humedades en planta baja",\n'
+        '      "contenido": "Los vecinos reportan humedades persistentes."\n    }\n  ]\n}\n```',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'prosa_con_llaves_despues',
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}]}\n\n'
+        'Nota: he omitido los campos {opcionales} porque no aplican. Si necesitas el formato {"titulo": ...} dímelo.',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'prosa_con_llaves_antes',
+        'Según el formato {titulo, contenido} indicado, el resultado es:\n'
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}]}',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'llave_sin_cerrar_antes',
+        'Nota: {ver abajo\n'
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}]}',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'llave_sin_cerrar_antes_y_truncado',
+        'Nota: {ver abajo\n'
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}, '
+        '{"titulo": "Ausencia de ra',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'comas_finales',
+        '{\n  "preceptivas": [\n    {"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes.",},\n'
+        '    {"titulo": "Ausencia de rampa", "contenido": "No existe acceso adaptado para personas con movilidad reducida."},\n  ],\n}',
+        {'preceptivas': [_MOTIVACION, _SEGUNDA]}
+    ),
+    CasoJSON(
+        'comillas_tipograficas',
+        '{“preceptivas”: [{“titulo”: “Humedades en planta baja”, '
+        '“contenido”: “Los vecinos reportan humedades persistentes.”}]}',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'comillas_tipograficas_en_contenido',
+        '{"preceptivas": [{"titulo": "Norma “DB-HS”", "contenido": "Aplica el documento “salubridad”."}]}',
+        {'preceptivas': [{'titulo': 'Norma “DB-HS”', 'contenido': 'Aplica el documento “salubridad”.'}]}
+    ),
+    CasoJSON(
+        'salto_de_linea_literal',
+        '{"que_es": {"contenido": "Definición en\ndos líneas.", "contexto": "Contexto."}}',
+        {'que_es': {'contenido': 'Definición en\ndos líneas.', 'contexto': 'Contexto.'}}
+    ),
+    CasoJSON(
+        'truncado_en_elemento',
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}, '
+        '{"titulo": "Ausencia de rampa", "contenido": "No existe acceso adap',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'truncado_tras_coma',
+        '```json\n{"tecnicas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."},\n',
+        {'tecnicas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'truncado_segundo_paquete',
+        '{"por_que": {"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}], '
+        '"tecnicas": [{"titulo": "CTE DB-HS',
+        {'por_que': {'preceptivas': [_MOTIVACION], 'tecnicas': []}}
+    ),
+    CasoJSON(
+        'truncado_en_objeto',
+        '{"que_es": {"contenido": "Definición precisa del problema.", "contexto": "Contextualiza',
+        {'que_es': {'contenido': 'Definición precisa del problema.'}}
+    ),
+    CasoJSON(
+        'escapes_y_llaves_en_cadenas',
+        '{"que_es": {"contenido": "Usa la fórmula {a} y \\"comillas\\" }", "contexto": "Ok."}}',
+        {'que_es': {'contenido': 'Usa la fórmula {a} y "comillas" }', 'contexto': 'Ok.'}}
+    ),
+    CasoJSON(
+        'dos_objetos',
+        '{"preceptivas": [{"titulo": "Humedades en planta baja", "contenido": "Los vecinos reportan humedades persistentes."}]}\n'
+        'Versión alternativa:\n{"preceptivas": []}',
+        {'preceptivas': [_MOTIVACION]}
+    ),
+    CasoJSON(
+        'sin_json',
+        'Lo siento, no puedo analizar esta conjetura sin más información.',
+        None
+    ),
+]
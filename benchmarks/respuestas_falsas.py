@@ -0,0 +1,59 @@
+"""
+Respuestas JSON predefinidas para simular el LLM en los benchmarks
+Detecta la etapa por la estructura JSON que pide el prompt
+"""
+
+import json
+import re
+from typing import Any, List
+
+ETAPAS_MOTIVACIONES = ('preceptivas', 'tecnicas', 'facultativas', 'progresistas')
+
+
+def detectar_etapa(texto: str) -> str:
+    """Devuelve la etapa cuyo formato de respuesta solicita el prompt"""
+    instrucciones = texto.rsplit('Responde ÚNICAMENTE', 1)[-1]
+    match = re.search(r'"(por_que|preceptivas|tecnicas|facultativas|progresistas|para_que|que_es)"', instrucciones)
+    return match.group(1) if match else 'que_es'
+
+
+def respuesta_para_etapa(etapa: str, tipo_objetivo: str = 'preceptivas') -> str:
+    """Construye una respuesta válida y verosímil para la etapa indicada"""
+    if etapa == 'por_que':
+        # Análisis completo en una sola respuesta
+        datos = {'por_que': {}}
+        for motivacion in ETAPAS_MOTIVACIONES:
+            datos['por_que'].update(json.loads(respuesta_para_etapa(motivacion)))
+        datos['para_que'] = [
+            objetivo for tipo in ETAPAS_MOTIVACIONES
+            for objetivo in json.loads(respuesta_para_etapa('para_que', tipo))['para_que']
+        ]
+        datos.update(json.loads(respuesta_para_etapa('que_es')))
+    elif etapa in ETAPAS_MOTIVACIONES:
+        datos: Any = {etapa: [
+            {'titulo': f'Motivación {etapa} {i}', 'contenido': f'Contenido simulado de la motivación {etapa} número {i}.'}
+            for i in range(1, 4)
+        ]}
+    elif etapa == 'para_que':
+        datos = {'para_que': [
+            {'titulo': f'Objetivo {i}', 'tipo': tipo_objetivo, 'contenido': f'Finalidad simulada del objetivo {i}.'}
+            for i in range(1, 3)
+        ]}
+    else:
+        datos = {'que_es': {
+            'contenido': 'Definición simulada del problema pericial.',
+            'contexto': 'Contextualización simulada del problema.'
+        }}
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def responder(messages: List[Any]) -> str:
+    """Función de respuesta compatible con LLMFalso"""
+    return responder_texto(messages[-1].content)
+
+
+def responder_texto(texto: str) -> str:
+    """Respuesta para el texto del último mensaje del usuario (ver benchmarks.servidor_ollama_falso)"""
+    etapa = detectar_etapa(texto)
+    tipo = re.search(r'"tipo": "(\w+)"', texto)
+    return respuesta_para_etapa(etapa, tipo.group(1) if tipo else 'preceptivas')
@@ -0,0 +1,195 @@
+"""
+Servidor HTTP local que imita la API de chat de Ollama
+Responde a /api/chat (con y sin streaming NDJSON) con las respuestas de
+benchmarks/respuestas_falsas.py, simulando una latencia de prefill y una
+velocidad de generación en tokens/segundo. Permite medir la aplicación
+completa (cliente HTTP, pool de conexiones, parseo, Flask) sin GPU ni modelo.
+
+Uso como servidor independiente:
+    python -m benchmarks.servidor_ollama_falso [--puerto 11435] [--latencia 0.05] [--tokens-por-segundo 500]
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from benchmarks.respuestas_falsas import responder_texto
+
+CARACTERES_POR_TOKEN = 4
+INTERVALO_ENVIO = 0.02  # Segundos entre fragmentos del stream (agrupa tokens a velocidades altas)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Conexiones keep-alive, como Ollama
+    server: '_ServidorHTTP'
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        pass
+
+    def _enviar_json(self, datos: Dict[str, Any], estado: int = 200) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _enviar_fragmento(self, datos: Dict[str, Any]) -> None:
+        linea = json.dumps(datos, ensure_ascii=False).encode('utf-8') + b'\n'
+        self.wfile.write(f'{len(linea):x}\r\n'.encode('ascii') + linea + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path == '/api/version':
+            self._enviar_json({'version': '0.0.0-falso'})
+        elif self.path == '/api/tags':
+            self._enviar_json({'models': [{'name': self.server.simulador.modelo, 'model': self.server.simulador.modelo}]})
+        else:
+            self._enviar_json({'error': 'not found'}, 404)
+
+    def do_POST(self) -> None:
+        largo = int(self.headers.get('Content-Length', 0))
+        peticion = json.loads(self.rfile.read(largo) or b'{}')
+        if self.path != '/api/chat':
+            self._enviar_json({'error': 'not found'}, 404)
+            return
+
+        simulador = self.server.simulador
+        inicio = time.perf_counter()
+        texto, tokens_prompt = simulador.respuesta(peticion)
+        time.sleep(simulador.latencia)  # Prefill
+        inicio_generacion = time.perf_counter()
+        fragmentos = [texto[i:i + CARACTERES_POR_TOKEN] for i in range(0, len(texto), CARACTERES_POR_TOKEN)]
+        base = {'model': peticion.get('model', simulador.modelo)}
+
+        if peticion.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            por_envio = max(1, int(simulador.tokens_por_segundo * INTERVALO_ENVIO))
+            for i in range(0, len(fragmentos), por_envio):
+                simulador.esperar_token(inicio_generacion, i)
+                self._enviar_fragmento({**base, 'created_at': _ahora(), 'done': False,
+                                        'message': {'role': 'assistant', 'content': ''.join(fragmentos[i:i + por_envio])}})
+            simulador.esperar_token(inicio_generacion, len(fragmentos))
+            self._enviar_fragmento({**base, 'created_at': _ahora(), 'message': {'role': 'assistant', 'content': ''},
+                                    **simulador.metadatos(inicio, inicio_generacion, tokens_prompt, len(fragmentos))})
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            simulador.esperar_token(inicio_generacion, len(fragmentos))
+            self._enviar_json({**base, 'created_at': _ahora(), 'message': {'role': 'assistant', 'content': texto},
+                               **simulador.metadatos(inicio, inicio_generacion, tokens_prompt, len(fragmentos))})
+        simulador.registrar(time.perf_counter() - inicio)
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    simulador: 'ServidorOllamaFalso'
+
+
+def _ahora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ServidorOllamaFalso:
+    """
+    Servidor de Ollama simulado en un hilo en segundo plano
+
+    Args:
+        latencia: Segundos de prefill antes del primer token
+        tokens_por_segundo: Velocidad de generación simulada
+        responder: Función texto del último mensaje -> respuesta (por defecto respuestas_falsas)
+        puerto: 0 para elegir un puerto libre
+    """
+
+    def __init__(self, latencia: float = 0.05, tokens_por_segundo: float = 500.0,
+                 responder: Callable[[str], str] = responder_texto, puerto: int = 0,
+                 modelo: str = 'llama3.1:8b'):
+        self.latencia = latencia
+        self.tokens_por_segundo = tokens_por_segundo
+        self.responder = responder
+        self.modelo = modelo
+        self.peticiones = 0
+        self.segundos_ocupado = 0.0
+        self._lock = threading.Lock()
+        self._http = _ServidorHTTP(('127.0.0.1', puerto), _Manejador)
+        self._http.simulador = self
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._http.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+    def respuesta(self, peticion: Dict[str, Any]) -> Tuple[str, int]:
+        """Texto de respuesta y tokens de prompt (estimados) de una petición de chat"""
+        mensajes = peticion.get('messages', [])
+        usuario = [m.get('content', '') for m in mensajes if m.get('role') == 'user']
+        tokens_prompt = sum(len(m.get('content', '')) for m in mensajes) // CARACTERES_POR_TOKEN
+        return self.responder(usuario[-1] if usuario else ''), tokens_prompt
+
+    def esperar_token(self, inicio_generacion: float, indice: int) -> None:
+        """Duerme hasta el instante en que se habría generado el token `indice`"""
+        if self.tokens_por_segundo <= 0:
+            return
+        restante = inicio_generacion + indice / self.tokens_por_segundo - time.perf_counter()
+        if restante > 0:
+            time.sleep(restante)
+
+    def metadatos(self, inicio: float, inicio_generacion: float, tokens_prompt: int, tokens: int) -> Dict[str, Any]:
+        """Campos finales de una respuesta de Ollama (duraciones en nanosegundos)"""
+        fin = time.perf_counter()
+        return {
+            'done': True,
+            'done_reason': 'stop',
+            'total_duration': int((fin - inicio) * 1e9),
+            'load_duration': 0,
+            'prompt_eval_count': tokens_prompt,
+            'prompt_eval_duration': int((inicio_generacion - inicio) * 1e9),
+            'eval_count': tokens,
+            'eval_duration': int((fin - inicio_generacion) * 1e9)
+        }
+
+    def registrar(self, segundos: float) -> None:
+        with self._lock:
+            self.peticiones += 1
+            self.segundos_ocupado += segundos
+
+    def iniciar(self) -> 'ServidorOllamaFalso':
+        self._hilo = threading.Thread(target=self._http.serve_forever, name='ollama-falso', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self) -> 'ServidorOllamaFalso':
+        return self.iniciar()
+
+    def __exit__(self, *args: Any) -> None:
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=11435)
+    parser.add_argument('--latencia', type=float, default=0.05, help='Segundos de prefill por petición')
+    parser.add_argument('--tokens-por-segundo', type=float, default=500.0)
+    args = parser.parse_args()
+
+    servidor = ServidorOllamaFalso(args.latencia, args.tokens_por_segundo, puerto=args.puerto)
+    print(f"Ollama simulado en {servidor.url} (OLLAMA_BASE_URL) — Ctrl+C para terminar")
+    try:
+        servidor._http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
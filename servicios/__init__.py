@@ -0,0 +1,3 @@
+"""
+Servicios de apoyo a la aplicación web (ejecución en segundo plano, almacenamiento...)
+"""
@@ -0,0 +1,602 @@
+"""
+Almacenamiento de informes
+Interfaz común con tres implementaciones: en memoria, en memoria acotada
+(por defecto; LRU/TTL con desborde a disco) y SQLite (solo biblioteca
+estándar), que persiste entre reinicios y puede compartirse entre varios
+workers de gunicorn
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from servicios.plantilla_informe import compartir_secciones, es_compartida
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+ALMACEN_TIPO = os.environ.get('INFORMES_ALMACEN', 'acotado')  # 'acotado', 'memoria' o 'sqlite'
+ALMACEN_RUTA_SQLITE = os.environ.get(
+    'INFORMES_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datos', 'informes.sqlite3')
+)
+
+# Límites del almacén acotado en memoria
+ALMACEN_MAX_ENTRADAS = int(os.environ.get('INFORMES_MAX_ENTRADAS', 500))
+ALMACEN_MAX_BYTES = int(os.environ.get('INFORMES_MAX_BYTES', 64 * 1024 * 1024))
+ALMACEN_TTL_SEGUNDOS = int(os.environ.get('INFORMES_TTL_SEGUNDOS', 7 * 24 * 3600))
+ALMACEN_RUTA_DESBORDE = os.environ.get(
+    'INFORMES_DESBORDE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datos', 'desborde.sqlite3')
+)
+
+# Paquetes del análisis y su ubicación dentro de informe['analisis']
+PAQUETES_POR_QUE = ('preceptivas', 'tecnicas', 'facultativas', 'progresistas')
+CAMPOS_PAQUETE = {'objetivos': 'para_que', 'que_es': 'que_es'}
+
+# El almacén acotado mide el análisis por partes, ('analisis', paquete), para que
+# guardar un paquete o una motivación solo vuelva a medir ese paquete; el resto
+# del análisis (campos que no son paquetes) es ('analisis', None)
+PARTES_ANALISIS = [('analisis', None)] + [
+    ('analisis', paquete) for paquete in PAQUETES_POR_QUE + tuple(CAMPOS_PAQUETE)
+]
+
+
+# ============================================================================
+# INTERFAZ
+# ============================================================================
+class AlmacenInformes:
+    """Interfaz del almacenamiento de informes (borradores e informes finales)"""
+
+    def obtener(self, informe_id: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el informe completo o None si no existe"""
+        raise NotImplementedError
+
+    def guardar(self, informe_id: str, datos: Dict[str, Any]) -> None:
+        """Crea o sustituye el informe completo (conserva su fecha de creación)"""
+        raise NotImplementedError
+
+    def actualizar(self, informe_id: str, **campos: Any) -> None:
+        """Sustituye solo los campos de primer nivel indicados"""
+        raise NotImplementedError
+
+    def actualizar_paquete(self, informe_id: str, paquete: str, valor: Any) -> None:
+        """Sustituye un paquete del análisis (preceptivas... objetivos, que_es)"""
+        raise NotImplementedError
+
+    def actualizar_motivacion(self, informe_id: str, paquete: str, indice: int,
+                              motivacion: Dict[str, Any]) -> None:
+        """Sustituye la motivación analisis['por_que'][paquete][indice]"""
+        raise NotImplementedError
+
+    def eliminar(self, informe_id: str) -> None:
+        raise NotImplementedError
+
+    def existe(self, informe_id: str) -> bool:
+        raise NotImplementedError
+
+    def listar(self, desde: Optional[datetime] = None, limite: Optional[int] = None) -> List[str]:
+        """Identificadores ordenados por fecha de creación (opcionalmente desde una fecha)"""
+        raise NotImplementedError
+
+    def eliminar_inactivos(self, antes_de: datetime) -> List[str]:
+        """Elimina los informes sin modificaciones desde la fecha indicada y devuelve sus ids"""
+        raise NotImplementedError
+
+    def metricas(self) -> Dict[str, Any]:
+        """Ocupación y contadores del almacén (vacío si la implementación no los lleva)"""
+        return {}
+
+    def __contains__(self, informe_id: str) -> bool:
+        return self.existe(informe_id)
+
+
+def _ubicar_paquete(analisis: Dict[str, Any], paquete: str):
+    """Devuelve (contenedor, clave) donde vive un paquete dentro del análisis"""
+    if paquete in PAQUETES_POR_QUE:
+        return analisis['por_que'], paquete
+    if paquete in CAMPOS_PAQUETE:
+        return analisis, CAMPOS_PAQUETE[paquete]
+    raise ValueError(f"Paquete no reconocido: {paquete}")
+
+
+# ============================================================================
+# ALMACÉN EN MEMORIA
+# ============================================================================
+class AlmacenMemoria(AlmacenInformes):
+    """Diccionario en memoria del proceso; se pierde al reiniciar"""
+
+    def __init__(self):
+        self._informes: Dict[str, Dict[str, Any]] = {}
+        self._creado: Dict[str, datetime] = {}
+        self._actualizado: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, informe_id: str) -> Optional[Dict[str, Any]]:
+        return self._informes.get(informe_id)
+
+    def guardar(self, informe_id: str, datos: Dict[str, Any]) -> None:
+        with self._lock:
+            self._informes[informe_id] = datos
+            self._creado.setdefault(informe_id, datetime.now())
+            self._actualizado[informe_id] = datetime.now()
+
+    def actualizar(self, informe_id: str, **campos: Any) -> None:
+        with self._lock:
+            self._informes[informe_id].update(campos)
+            self._actualizado[informe_id] = datetime.now()
+
+    def actualizar_paquete(self, informe_id: str, paquete: str, valor: Any) -> None:
+        with self._lock:
+            contenedor, clave = _ubicar_paquete(self._informes[informe_id]['analisis'], paquete)
+            contenedor[clave] = valor
+            self._actualizado[informe_id] = datetime.now()
+
+    def actualizar_motivacion(self, informe_id: str, paquete: str, indice: int,
+                              motivacion: Dict[str, Any]) -> None:
+        with self._lock:
+            self._informes[informe_id]['analisis']['por_que'][paquete][indice] = motivacion
+            self._actualizado[informe_id] = datetime.now()
+
+    def eliminar(self, informe_id: str) -> None:
+        with self._lock:
+            self._informes.pop(informe_id, None)
+            self._creado.pop(informe_id, None)
+            self._actualizado.pop(informe_id, None)
+
+    def eliminar_inactivos(self, antes_de: datetime) -> List[str]:
+        with self._lock:
+            ids = [informe_id for informe_id, actualizado in self._actualizado.items() if actualizado < antes_de]
+            for informe_id in ids:
+                del self._informes[informe_id], self._creado[informe_id], self._actualizado[informe_id]
+        return ids
+
+    def existe(self, informe_id: str) -> bool:
+        return informe_id in self._informes
+
+    def listar(self, desde: Optional[datetime] = None, limite: Optional[int] = None) -> List[str]:
+        ids = sorted(
+            (informe_id for informe_id, creado in self._creado.items() if desde is None or creado >= desde),
+            key=self._creado.__getitem__
+        )
+        return ids[:limite] if limite is not None else ids
+
+
+# ============================================================================
+# ALMACÉN SQLITE
+# ============================================================================
+class AlmacenSQLite(AlmacenInformes):
+    """
+    Informes en SQLite
+
+    Cada paquete del análisis se guarda en su propia fila de la tabla
+    'paquetes', de modo que editar una motivación solo reescribe ese paquete
+    y no el informe completo.
+    """
+
+    def __init__(self, ruta: str = ALMACEN_RUTA_SQLITE):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+        if ruta != ':memory:':
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS informes (
+                informe_id TEXT PRIMARY KEY,
+                creado TEXT NOT NULL,
+                actualizado TEXT NOT NULL,
+                datos TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_informes_creado ON informes (creado);
+            CREATE TABLE IF NOT EXISTS paquetes (
+                informe_id TEXT NOT NULL REFERENCES informes (informe_id) ON DELETE CASCADE,
+                paquete TEXT NOT NULL,
+                datos TEXT NOT NULL,
+                PRIMARY KEY (informe_id, paquete)
+            );
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _ahora() -> str:
+        return datetime.now().isoformat()
+
+    def _tocar(self, informe_id: str) -> None:
+        cursor = self._conn.execute(
+            "UPDATE informes SET actualizado = ? WHERE informe_id = ?", (self._ahora(), informe_id)
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(informe_id)
+
+    def obtener(self, informe_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT datos FROM informes WHERE informe_id = ?", (informe_id,)
+            ).fetchone()
+            if fila is None:
+                return None
+            paquetes = self._conn.execute(
+                "SELECT paquete, datos FROM paquetes WHERE informe_id = ?", (informe_id,)
+            ).fetchall()
+
+        datos = json.loads(fila[0])
+        analisis = datos.get('analisis')
+        if isinstance(analisis, dict):
+            analisis.setdefault('por_que', {})
+            for paquete, valor in paquetes:
+                contenedor, clave = _ubicar_paquete(analisis, paquete)
+                contenedor[clave] = json.loads(valor)
+        return datos
+
+    def guardar(self, informe_id: str, datos: Dict[str, Any]) -> None:
+        # Separar los paquetes del resto del informe
+        datos = dict(datos)
+        paquetes = []
+        analisis = datos.get('analisis')
+        if isinstance(analisis, dict):
+            analisis = dict(analisis)
+            por_que = dict(analisis.get('por_que') or {})
+            for paquete in PAQUETES_POR_QUE:
+                if paquete in por_que:
+                    paquetes.append((paquete, por_que.pop(paquete)))
+            analisis['por_que'] = por_que
+            for paquete, campo in CAMPOS_PAQUETE.items():
+                if campo in analisis:
+                    paquetes.append((paquete, analisis.pop(campo)))
+            datos['analisis'] = analisis
+
+        ahora = self._ahora()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO informes (informe_id, creado, actualizado, datos) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (informe_id) DO UPDATE SET actualizado = excluded.actualizado, datos = excluded.datos""",
+                (informe_id, ahora, ahora, json.dumps(datos, ensure_ascii=False))
+            )
+            self._conn.execute("DELETE FROM paquetes WHERE informe_id = ?", (informe_id,))
+            self._conn.executemany(
+                "INSERT INTO paquetes (informe_id, paquete, datos) VALUES (?, ?, ?)",
+                [(informe_id, paquete, json.dumps(valor, ensure_ascii=False)) for paquete, valor in paquetes]
+            )
+
+    def actualizar(self, informe_id: str, **campos: Any) -> None:
+        if 'analisis' in campos:
+            # El análisis se reparte entre tablas: reescribir el informe completo
+            datos = self.obtener(informe_id)
+            if datos is None:
+                raise KeyError(informe_id)
+            datos.update(campos)
+            self.guardar(informe_id, datos)
+            return
+
+        with self._lock, self._conn:
+            fila = self._conn.execute(
+                "SELECT datos FROM informes WHERE informe_id = ?", (informe_id,)
+            ).fetchone()
+            if fila is None:
+                raise KeyError(informe_id)
+            datos = json.loads(fila[0])
+            datos.update(campos)
+            self._conn.execute(
+                "UPDATE informes SET datos = ?, actualizado = ? WHERE informe_id = ?",
+                (json.dumps(datos, ensure_ascii=False), self._ahora(), informe_id)
+            )
+
+    def actualizar_paquete(self, informe_id: str, paquete: str, valor: Any) -> None:
+        if paquete not in PAQUETES_POR_QUE and paquete not in CAMPOS_PAQUETE:
+            raise ValueError(f"Paquete no reconocido: {paquete}")
+        with self._lock, self._conn:
+            self._tocar(informe_id)
+            self._conn.execute(
+                """INSERT INTO paquetes (informe_id, paquete, datos) VALUES (?, ?, ?)
+                   ON CONFLICT (informe_id, paquete) DO UPDATE SET datos = excluded.datos""",
+                (informe_id, paquete, json.dumps(valor, ensure_ascii=False))
+            )
+
+    def actualizar_motivacion(self, informe_id: str, paquete: str, indice: int,
+                              motivacion: Dict[str, Any]) -> None:
+        if paquete not in PAQUETES_POR_QUE:
+            raise ValueError(f"Paquete no reconocido: {paquete}")
+        with self._lock, self._conn:
+            fila = self._conn.execute(
+                "SELECT json_array_length(datos) FROM paquetes WHERE informe_id = ? AND paquete = ?",
+                (informe_id, paquete)
+            ).fetchone()
+            if fila is None or not 0 <= indice < fila[0]:
+                raise IndexError(f"No existe la motivación {paquete}[{indice}]")
+            self._tocar(informe_id)
+            self._conn.execute(
+                "UPDATE paquetes SET datos = json_set(datos, ?, json(?)) WHERE informe_id = ? AND paquete = ?",
+                (f'$[{indice}]', json.dumps(motivacion, ensure_ascii=False), informe_id, paquete)
+            )
+
+    def eliminar(self, informe_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM informes WHERE informe_id = ?", (informe_id,))
+
+    def existe(self, informe_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM informes WHERE informe_id = ?", (informe_id,)
+            ).fetchone() is not None
+
+    def eliminar_inactivos(self, antes_de: datetime) -> List[str]:
+        """Elimina los informes sin modificaciones desde la fecha indicada y devuelve sus ids"""
+        with self._lock, self._conn:
+            ids = [fila[0] for fila in self._conn.execute(
+                "SELECT informe_id FROM informes WHERE actualizado < ?", (antes_de.isoformat(),)
+            )]
+            self._conn.executemany("DELETE FROM informes WHERE informe_id = ?", [(i,) for i in ids])
+        return ids
+
+    def listar(self, desde: Optional[datetime] = None, limite: Optional[int] = None) -> List[str]:
+        consulta = "SELECT informe_id FROM informes"
+        parametros: List[Any] = []
+        if desde is not None:
+            consulta += " WHERE creado >= ?"
+            parametros.append(desde.isoformat())
+        consulta += " ORDER BY creado"
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+        with self._lock:
+            return [fila[0] for fila in self._conn.execute(consulta, parametros)]
+
+
+# ============================================================================
+# ALMACÉN ACOTADO (LRU + TTL CON DESBORDE A DISCO)
+# ============================================================================
+class AlmacenAcotado(AlmacenInformes):
+    """
+    Almacén en memoria con huella limitada
+
+    Mantiene como máximo `max_entradas` informes y `max_bytes` (tamaño JSON
+    estimado) en memoria, expulsando los menos usados recientemente. Los
+    expulsados que aún no han caducado se vuelcan a un AlmacenSQLite de
+    desborde y se recuperan de forma transparente al volver a pedirlos. Los
+    borradores sin actividad durante `ttl` segundos se descartan.
+    """
+
+    def __init__(self, max_entradas: int = ALMACEN_MAX_ENTRADAS, max_bytes: int = ALMACEN_MAX_BYTES,
+                 ttl: float = ALMACEN_TTL_SEGUNDOS, desborde: Optional[AlmacenInformes] = None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._desborde = desborde
+        # informe_id -> [datos, bytes, último acceso, bytes por parte]; el orden refleja el uso (LRU)
+        self._informes: 'OrderedDict[str, List[Any]]' = OrderedDict()
+        self._creado: Dict[str, datetime] = {}
+        self._bytes = 0
+        self.expulsiones = 0
+        self.desbordes = 0
+        self.recuperaciones = 0
+        self.caducados = 0
+        self._lock = threading.RLock()
+
+    @property
+    def desborde(self) -> AlmacenInformes:
+        # Se crea solo cuando hace falta volcar el primer informe
+        if self._desborde is None:
+            self._desborde = AlmacenSQLite(ALMACEN_RUTA_DESBORDE)
+        return self._desborde
+
+    @staticmethod
+    def _medir(valor: Any) -> int:
+        # Las secciones compartidas de la plantilla existen una sola vez en el proceso: no cuentan por informe
+        if es_compartida(valor):
+            return 0
+        return len(json.dumps(valor, ensure_ascii=False, default=str))
+
+    @classmethod
+    def _medir_parte(cls, datos: Dict[str, Any], parte: Hashable) -> int:
+        """Tamaño JSON estimado de un campo de primer nivel o de una parte del análisis"""
+        if not isinstance(parte, tuple):
+            return cls._medir(datos[parte]) if parte in datos else 0
+        analisis = datos.get('analisis')
+        paquete = parte[1]
+        if not isinstance(analisis, dict):
+            return cls._medir(analisis) if paquete is None else 0
+        if paquete is None:
+            campos = set(CAMPOS_PAQUETE.values()) | {'por_que'}
+            return cls._medir({clave: valor for clave, valor in analisis.items() if clave not in campos})
+        try:
+            contenedor, clave = _ubicar_paquete(analisis, paquete)
+            return cls._medir(contenedor[clave])
+        except (KeyError, TypeError):
+            return 0
+
+    @staticmethod
+    def _partes(datos: Dict[str, Any]) -> List[Hashable]:
+        return [clave for clave in datos if clave != 'analisis'] + PARTES_ANALISIS
+
+    @classmethod
+    def _estimar_bytes(cls, datos: Dict[str, Any]) -> int:
+        return sum(cls._medir_parte(datos, parte) for parte in cls._partes(datos))
+
+    def _caducado(self, ultimo_acceso: float) -> bool:
+        return time.time() - ultimo_acceso > self.ttl
+
+    def _insertar(self, informe_id: str, datos: Dict[str, Any]) -> None:
+        anterior = self._informes.pop(informe_id, None)
+        if anterior is not None:
+            self._bytes -= anterior[1]
+        tamanos = {parte: self._medir_parte(datos, parte) for parte in self._partes(datos)}
+        tamano = sum(tamanos.values())
+        self._informes[informe_id] = [datos, tamano, time.time(), tamanos]
+        self._bytes += tamano
+        self._expulsar()
+
+    def _remedir(self, informe_id: str, partes: Iterable[Hashable]) -> None:
+        """Vuelve a medir solo las partes modificadas de un informe y ajusta el total con la diferencia"""
+        entrada = self._informes[informe_id]
+        tamanos = entrada[3]
+        diferencia = 0
+        for parte in partes:
+            tamano = self._medir_parte(entrada[0], parte)
+            diferencia += tamano - tamanos.get(parte, 0)
+            tamanos[parte] = tamano
+        entrada[1] += diferencia
+        self._bytes += diferencia
+        entrada[2] = time.time()
+        self._informes.move_to_end(informe_id)
+        self._expulsar()
+
+    def _expulsar(self) -> None:
+        # Primero los caducados (el orden LRU hace que estén al principio)
+        while self._informes:
+            informe_id, entrada = next(iter(self._informes.items()))
+            if not self._caducado(entrada[2]):
+                break
+            self._quitar(informe_id)
+            self._creado.pop(informe_id, None)
+            self.caducados += 1
+
+        # Después los menos usados, volcándolos a disco
+        volcados = False
+        while len(self._informes) > 1 and (len(self._informes) > self.max_entradas or self._bytes > self.max_bytes):
+            informe_id, entrada = next(iter(self._informes.items()))
+            self.desborde.guardar(informe_id, entrada[0])
+            self._quitar(informe_id)
+            self.expulsiones += 1
+            self.desbordes += 1
+            volcados = True
+
+        if volcados:
+            limite = datetime.fromtimestamp(time.time() - self.ttl)
+            for informe_id in self.desborde.eliminar_inactivos(limite):
+                self._creado.pop(informe_id, None)
+                self.caducados += 1
+
+    def _quitar(self, informe_id: str) -> None:
+        entrada = self._informes.pop(informe_id)
+        self._bytes -= entrada[1]
+
+    def _cargar(self, informe_id: str) -> Optional[List[Any]]:
+        """Entrada en memoria del informe, recuperándola del desborde si fue expulsada"""
+        entrada = self._informes.get(informe_id)
+        if entrada is not None:
+            if self._caducado(entrada[2]):
+                self._quitar(informe_id)
+                self._creado.pop(informe_id, None)
+                self.caducados += 1
+                return None
+            entrada[2] = time.time()
+            self._informes.move_to_end(informe_id)
+            return entrada
+
+        if self._desborde is None and not os.path.exists(ALMACEN_RUTA_DESBORDE):
+            return None
+        datos = self.desborde.obtener(informe_id)
+        if datos is None:
+            return None
+        self.desborde.eliminar(informe_id)
+        self.recuperaciones += 1
+        self._creado.setdefault(informe_id, datetime.now())
+        # Desde disco vuelven copias de las secciones de plantilla: se recupera la compartida
+        self._insertar(informe_id, compartir_secciones(datos))
+        return self._informes.get(informe_id)
+
+    def obtener(self, informe_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._cargar(informe_id)
+            return entrada[0] if entrada is not None else None
+
+    def guardar(self, informe_id: str, datos: Dict[str, Any]) -> None:
+        with self._lock:
+            self._creado.setdefault(informe_id, datetime.now())
+            self._insertar(informe_id, datos)
+
+    def _modificar(self, informe_id: str) -> Dict[str, Any]:
+        entrada = self._cargar(informe_id)
+        if entrada is None:
+            raise KeyError(informe_id)
+        return entrada[0]
+
+    def actualizar(self, informe_id: str, **campos: Any) -> None:
+        with self._lock:
+            self._modificar(informe_id).update(campos)
+            partes = [campo for campo in campos if campo != 'analisis']
+            self._remedir(informe_id, partes + PARTES_ANALISIS if 'analisis' in campos else partes)
+
+    def actualizar_paquete(self, informe_id: str, paquete: str, valor: Any) -> None:
+        with self._lock:
+            contenedor, clave = _ubicar_paquete(self._modificar(informe_id)['analisis'], paquete)
+            contenedor[clave] = valor
+            self._remedir(informe_id, [('analisis', paquete)])
+
+    def actualizar_motivacion(self, informe_id: str, paquete: str, indice: int,
+                              motivacion: Dict[str, Any]) -> None:
+        with self._lock:
+            self._modificar(informe_id)['analisis']['por_que'][paquete][indice] = motivacion
+            self._remedir(informe_id, [('analisis', paquete)])
+
+    def eliminar(self, informe_id: str) -> None:
+        with self._lock:
+            if informe_id in self._informes:
+                self._quitar(informe_id)
+            if self._desborde is not None:
+                self._desborde.eliminar(informe_id)
+            self._creado.pop(informe_id, None)
+
+    def existe(self, informe_id: str) -> bool:
+        with self._lock:
+            return self._cargar(informe_id) is not None
+
+    def eliminar_inactivos(self, antes_de: datetime) -> List[str]:
+        limite = antes_de.timestamp()
+        with self._lock:
+            ids = [informe_id for informe_id, entrada in self._informes.items() if entrada[2] < limite]
+            for informe_id in ids:
+                self._quitar(informe_id)
+            if self._desborde is not None:
+                ids += self._desborde.eliminar_inactivos(antes_de)
+            for informe_id in ids:
+                self._creado.pop(informe_id, None)
+        return ids
+
+    def listar(self, desde: Optional[datetime] = None, limite: Optional[int] = None) -> List[str]:
+        with self._lock:
+            ids = sorted(
+                (informe_id for informe_id, creado in self._creado.items() if desde is None or creado >= desde),
+                key=self._creado.__getitem__
+            )
+        return ids[:limite] if limite is not None else ids
+
+    def metricas(self) -> Dict[str, Any]:
+        """Ocupación actual y contadores de expulsión"""
+        with self._lock:
+            return {
+                'entradas': len(self._informes),
+                'bytes': self._bytes,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+                'expulsiones': self.expulsiones,
+                'desbordes': self.desbordes,
+                'recuperaciones': self.recuperaciones,
+                'caducados': self.caducados,
+                'en_desborde': len(self._creado) - len(self._informes)
+            }
+
+
+# ============================================================================
+# FÁBRICA
+# ============================================================================
+def crear_almacen(tipo: Optional[str] = None) -> AlmacenInformes:
+    """Crea el almacén configurado ('acotado', 'memoria' o 'sqlite')"""
+    tipo = tipo or ALMACEN_TIPO
+    if tipo == 'acotado':
+        return AlmacenAcotado()
+    if tipo == 'memoria':
+        return AlmacenMemoria()
+    if tipo == 'sqlite':
+        return AlmacenSQLite()
+    raise ValueError(f"Tipo de almacén no reconocido: {tipo}")
@@ -0,0 +1,123 @@
+"""
+Caché de páginas HTML renderizadas (/informe y /mapa-conceptual)
+Un informe terminado no cambia entre visitas, pero cada una volvía a renderizar
+plantillas Jinja de cientos de líneas. Se guarda el HTML por (vista, informe,
+versión), donde la versión es un contador del informe que se incrementa en cada
+modificación, junto con su versión comprimida con gzip y un ETag fuerte (hash
+del contenido) para responder 304 a los navegadores que ya la tienen.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+PAGINAS_CACHE_MAX_ENTRADAS = int(os.environ.get('INFORMES_CACHE_PAGINAS', '256'))  # 0 desactiva la caché
+PAGINAS_CACHE_MAX_BYTES = int(os.environ.get('INFORMES_CACHE_PAGINAS_BYTES', 32 * 1024 * 1024))
+PAGINAS_GZIP_MIN_BYTES = 1024  # Por debajo no compensa comprimir
+PAGINAS_GZIP_NIVEL = 6
+
+
+# ============================================================================
+# PÁGINA RENDERIZADA
+# ============================================================================
+class PaginaRenderizada:
+    """HTML de una página con su versión gzip (si compensa) y su ETag"""
+
+    __slots__ = ('cuerpo', 'cuerpo_gzip', 'etag')
+
+    def __init__(self, html: str):
+        self.cuerpo = html.encode('utf-8')
+        self.etag = hashlib.sha256(self.cuerpo).hexdigest()[:32]
+        self.cuerpo_gzip: Optional[bytes] = None
+        if len(self.cuerpo) >= PAGINAS_GZIP_MIN_BYTES:
+            self.cuerpo_gzip = gzip.compress(self.cuerpo, compresslevel=PAGINAS_GZIP_NIVEL, mtime=0)
+
+    def variante(self, acepta_gzip: bool) -> Tuple[bytes, str, bool]:
+        """
+        (cuerpo, etag, comprimido) de la representación a servir
+
+        La variante gzip lleva otro ETag: un ETag fuerte identifica los bytes exactos.
+        """
+        if acepta_gzip and self.cuerpo_gzip is not None:
+            return self.cuerpo_gzip, f'{self.etag}-gz', True
+        return self.cuerpo, self.etag, False
+
+    @property
+    def bytes(self) -> int:
+        return len(self.cuerpo) + len(self.cuerpo_gzip or b'')
+
+
+# ============================================================================
+# CACHÉ
+# ============================================================================
+class CachePaginas:
+    """Páginas renderizadas por (vista, informe_id, versión), expulsando las menos usadas"""
+
+    def __init__(self, max_entradas: int = PAGINAS_CACHE_MAX_ENTRADAS, max_bytes: int = PAGINAS_CACHE_MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._paginas: 'OrderedDict[Tuple[str, str, int], PaginaRenderizada]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, vista: str, informe_id: str, version: int,
+                renderizar: Callable[[], str]) -> PaginaRenderizada:
+        """Devuelve la página cacheada o la renderiza con `renderizar()` y la guarda"""
+        clave = (vista, informe_id, version)
+        with self._lock:
+            pagina = self._paginas.get(clave)
+            if pagina is not None:
+                self._paginas.move_to_end(clave)
+                self.aciertos += 1
+                return pagina
+            self.fallos += 1
+
+        # Se renderiza fuera del lock; dos visitas simultáneas a la misma página producen el mismo HTML
+        pagina = PaginaRenderizada(renderizar())
+        if self.max_entradas <= 0:
+            return pagina
+        with self._lock:
+            anterior = self._paginas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior.bytes
+            self._paginas[clave] = pagina
+            self._bytes += pagina.bytes
+            while len(self._paginas) > 1 and (len(self._paginas) > self.max_entradas or self._bytes > self.max_bytes):
+                _, expulsada = self._paginas.popitem(last=False)
+                self._bytes -= expulsada.bytes
+        return pagina
+
+    def invalidar(self, informe_id: str) -> None:
+        """Descarta todas las páginas del informe (cualquier vista y versión)"""
+        with self._lock:
+            claves = [clave for clave in self._paginas if clave[1] == informe_id]
+            for clave in claves:
+                self._bytes -= self._paginas.pop(clave).bytes
+            if claves:
+                self.invalidaciones += 1
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._paginas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'paginas': len(self._paginas),
+                'bytes': self._bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones
+            }
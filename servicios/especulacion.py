@@ -0,0 +1,110 @@
+"""
+Generación especulativa de las primeras etapas de un informe
+En cuanto /iniciar-informe acepta la conjetura se lanza en segundo plano la
+generación de las primeras etapas (preceptivas por defecto), sin esperar a que
+el navegador cargue la página de revisión y las pida. El resultado se guarda
+en el almacén de informes como cualquier otro paquete, y la petición que llegue
+mientras se genera se une a esa misma generación (misma clave de coalescencia),
+de modo que la navegación y la carga de la página quedan fuera del camino
+crítico.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable
+
+from agentes.registros import obtener_logger
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Etapas que se generan por adelantado, en el orden del grafo (0 desactiva la especulación)
+ESPECULACION_ETAPAS = int(os.environ.get('INFORMES_ESPECULAR_ETAPAS', '1'))
+# Informes especulando a la vez: no debe quitar demasiada capacidad de Ollama a las peticiones reales
+ESPECULACION_MAX_TRABAJADORES = int(os.environ.get('INFORMES_ESPECULACION_TRABAJADORES', '2'))
+
+log = obtener_logger('especulacion')
+
+
+# ============================================================================
+# GESTOR DE GENERACIONES ESPECULATIVAS
+# ============================================================================
+class GestorEspeculacion:
+    """Genera en un pool de hilos las primeras etapas de los informes recién creados"""
+
+    def __init__(self, etapas: int = ESPECULACION_ETAPAS,
+                 max_trabajadores: int = ESPECULACION_MAX_TRABAJADORES):
+        self.etapas = etapas
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_trabajadores), thread_name_prefix='especulacion')
+        self._lock = threading.Lock()
+        self.lanzadas = 0
+        self.generadas = 0
+        self.ya_disponibles = 0
+        self.fallidas = 0
+        self._en_curso = 0
+
+    @property
+    def activa(self) -> bool:
+        return self.etapas > 0
+
+    def lanzar(self, informe_id: str, paquetes: Iterable[str],
+               generar: Callable[[str, str], bool]) -> bool:
+        """
+        Programa la generación de las primeras `etapas` de `paquetes` para el informe
+
+        `generar(informe_id, paquete)` genera y guarda el paquete y devuelve
+        True si ya estaba generado o se compartió con otra petición. Una etapa
+        que falla detiene las siguientes, que dependen de ella.
+
+        Returns:
+            True si se ha programado la especulación
+        """
+        if not self.activa:
+            return False
+        etapas = list(paquetes)[:self.etapas]
+        with self._lock:
+            self.lanzadas += 1
+            self._en_curso += 1
+        self._executor.submit(self._ejecutar, informe_id, etapas, generar)
+        return True
+
+    def _ejecutar(self, informe_id: str, etapas: Iterable[str], generar: Callable[[str, str], bool]) -> None:
+        try:
+            for paquete in etapas:
+                try:
+                    compartido = generar(informe_id, paquete)
+                except Exception as e:
+                    log.warning("⚠️ Falló la generación especulativa de '%s': %s", paquete, e,
+                                extra={'informe_id': informe_id, 'etapa': paquete})
+                    with self._lock:
+                        self.fallidas += 1
+                    return
+                with self._lock:
+                    if compartido:
+                        self.ya_disponibles += 1
+                    else:
+                        self.generadas += 1
+                log.debug("🔮 Paquete '%s' generado por adelantado", paquete,
+                          extra={'informe_id': informe_id, 'etapa': paquete})
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+
+    def en_curso(self) -> int:
+        """Informes con generación especulativa aún en marcha"""
+        with self._lock:
+            return self._en_curso
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'etapas': self.etapas,
+                'lanzadas': self.lanzadas,
+                'generadas': self.generadas,
+                'ya_disponibles': self.ya_disponibles,
+                'fallidas': self.fallidas,
+                'en_curso': self._en_curso
+            }
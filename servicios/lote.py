@@ -0,0 +1,242 @@
+"""
+Procesamiento por lotes de conjeturas
+Lee las conjeturas de un fichero JSONL o CSV, las analiza en paralelo con un
+límite de concurrencia y escribe cada resultado en un JSONL en cuanto termina.
+Si el proceso se interrumpe, al relanzarlo con la misma salida se omiten los
+informes ya completados y los que quedaron a medias continúan desde su última
+etapa terminada (checkpoints por id, ver agentes.checkpoints).
+
+Uso:
+    python -m servicios.lote conjeturas.jsonl resultados.jsonl [--concurrencia 4] [--modo secuencial] [--asincrono]
+
+Con --asincrono todo el lote se procesa en un único bucle de eventos (sin un
+hilo por informe); las llamadas simultáneas a Ollama las limita además
+INFORMES_OLLAMA_CONCURRENCIA.
+
+Formato de entrada:
+    JSONL: una línea por conjetura, {"id": "exp-001", "conjetura": "..."}
+    CSV:   cabecera con las columnas 'conjetura' e 'id' (opcional)
+    Sin 'id' se usa el número de línea/fila.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from agentes.clientes_llm import registro_clientes
+from agentes.formal_causal_agent import MODOS_ANALISIS, procesar_conjetura
+from agentes.formal_causal_async import procesar_conjetura_async
+from agentes.grafos import registro_grafos
+from agentes.metricas import medir_informe, metricas
+from agentes.registros import obtener_logger
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+LOTE_CONCURRENCIA = 4  # Informes analizándose a la vez contra Ollama
+
+log = obtener_logger('lote')
+
+
+# ============================================================================
+# ENTRADA Y SALIDA
+# ============================================================================
+def leer_conjeturas(ruta: str) -> Iterator[Dict[str, str]]:
+    """Itera sobre las conjeturas del fichero de entrada como {'id', 'conjetura'}"""
+    with open(ruta, encoding='utf-8', newline='') as f:
+        if ruta.lower().endswith('.csv'):
+            filas: Iterator[Dict[str, Any]] = csv.DictReader(f)
+        else:
+            filas = (json.loads(linea) for linea in f if linea.strip())
+
+        for numero, fila in enumerate(filas, start=1):
+            conjetura = (fila.get('conjetura') or '').strip()
+            if not conjetura:
+                log.warning("⚠️ Entrada %d sin conjetura, se omite", numero)
+                continue
+            yield {'id': str(fila.get('id') or numero), 'conjetura': conjetura}
+
+
+def leer_completados(ruta: str) -> Set[str]:
+    """Identificadores con resultado correcto en una salida previa (las líneas incompletas se ignoran)"""
+    completados = set()
+    if not os.path.exists(ruta):
+        return completados
+    with open(ruta, encoding='utf-8') as f:
+        for linea in f:
+            try:
+                resultado = json.loads(linea)
+            except json.JSONDecodeError:
+                continue  # Última línea cortada por una interrupción
+            if resultado.get('success'):
+                completados.add(resultado['id'])
+    return completados
+
+
+class EscritorResultados:
+    """Añade resultados a un JSONL de forma segura entre hilos, uno por línea y sin buffer"""
+
+    def __init__(self, ruta: str):
+        self._lock = threading.Lock()
+        self._f = open(ruta, 'a+', encoding='utf-8')
+        # Si una ejecución anterior dejó una línea a medias, empezar en una nueva
+        self._f.seek(0, os.SEEK_END)
+        if self._f.tell() > 0:
+            self._f.seek(self._f.tell() - 1)
+            if self._f.read(1) != '\n':
+                self._f.write('\n')
+
+    def escribir(self, resultado: Dict[str, Any]) -> None:
+        linea = json.dumps(resultado, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._f.write(linea)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def cerrar(self) -> None:
+        self._f.close()
+
+
+# ============================================================================
+# EJECUCIÓN DEL LOTE
+# ============================================================================
+def _procesar_entrada(entrada: Dict[str, str], modo: str) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    try:
+        with medir_informe(entrada['id']):
+            resultado = procesar_conjetura(entrada['conjetura'], modo=modo, informe_id=entrada['id'])
+    except Exception as e:
+        resultado = {'success': False, 'error': str(e), 'analisis': None}
+    return _linea_resultado(entrada, resultado, inicio)
+
+
+async def _procesar_entrada_async(entrada: Dict[str, str], modo: str, limite: asyncio.Semaphore) -> Dict[str, Any]:
+    async with limite:
+        inicio = time.perf_counter()
+        try:
+            with medir_informe(entrada['id']):
+                resultado = await procesar_conjetura_async(entrada['conjetura'], modo=modo, informe_id=entrada['id'])
+        except Exception as e:
+            resultado = {'success': False, 'error': str(e), 'analisis': None}
+        return _linea_resultado(entrada, resultado, inicio)
+
+
+async def _ejecutar_async(pendientes: List[Dict[str, str]], modo: str, concurrencia: int,
+                          registrar: Callable[[Dict[str, Any]], None]) -> None:
+    limite = asyncio.Semaphore(concurrencia)
+    tareas = [_procesar_entrada_async(e, modo, limite) for e in pendientes]
+    for tarea in asyncio.as_completed(tareas):
+        registrar(await tarea)
+
+
+def _linea_resultado(entrada: Dict[str, str], resultado: Dict[str, Any], inicio: float) -> Dict[str, Any]:
+    desglose = metricas.desglose_informe(entrada['id'])
+    return {
+        'id': entrada['id'],
+        'conjetura': entrada['conjetura'],
+        'success': resultado['success'],
+        'error': resultado.get('error'),
+        'analisis': resultado['analisis'],
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'tiempos': desglose['totales'] if desglose else None
+    }
+
+
+def procesar_lote(entrada: str, salida: str, concurrencia: int = LOTE_CONCURRENCIA,
+                  modo: str = 'secuencial', limite: Optional[int] = None,
+                  asincrono: bool = False) -> Dict[str, Any]:
+    """
+    Procesa todas las conjeturas pendientes de `entrada` y añade los resultados a `salida`
+
+    Returns:
+        Resumen con informes procesados, correctos, fallidos, omitidos,
+        segundos totales e informes por minuto
+    """
+    completados = leer_completados(salida)
+    entradas = list(leer_conjeturas(entrada))
+    pendientes = [e for e in entradas if e['id'] not in completados]
+    omitidos = len(entradas) - len(pendientes)
+    if limite is not None:
+        pendientes = pendientes[:limite]
+
+    # Cada informe en curso necesita al menos una conexión con Ollama
+    if concurrencia > registro_clientes.max_conexiones:
+        registro_clientes.configurar(max_conexiones=concurrencia)
+
+    log.info("📦 Lote: %d conjeturas pendientes, %d ya completadas, concurrencia %d, modo %s%s",
+             len(pendientes), omitidos, concurrencia, modo, ', asíncrono' if asincrono else '')
+
+    # El grafo se compila antes de empezar a medir
+    if modo != 'unico':
+        registro_grafos.precalentar([f'{modo}_async' if asincrono else modo])
+
+    escritor = EscritorResultados(salida)
+    correctos = fallidos = 0
+    inicio = time.perf_counter()
+
+    def registrar(resultado: Dict[str, Any]) -> None:
+        nonlocal correctos, fallidos
+        escritor.escribir(resultado)
+        if resultado['success']:
+            correctos += 1
+        else:
+            fallidos += 1
+        numero = correctos + fallidos
+        transcurrido = time.perf_counter() - inicio
+        log.log(logging.INFO if resultado['success'] else logging.WARNING,
+                "%s [%d/%d] en %.1fs (%.1f informes/min)", '✅' if resultado['success'] else '❌',
+                numero, len(pendientes), resultado['segundos'], numero / transcurrido * 60,
+                extra={'informe_id': resultado['id']})
+
+    try:
+        if asincrono:
+            asyncio.run(_ejecutar_async(pendientes, modo, concurrencia, registrar))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='lote') as executor:
+                futuros = [executor.submit(_procesar_entrada, e, modo) for e in pendientes]
+                for futuro in as_completed(futuros):
+                    registrar(futuro.result())
+    finally:
+        escritor.cerrar()
+
+    total = time.perf_counter() - inicio
+    resumen = {
+        'procesados': correctos + fallidos,
+        'correctos': correctos,
+        'fallidos': fallidos,
+        'omitidos': omitidos,
+        'segundos': round(total, 3),
+        'informes_por_minuto': round((correctos + fallidos) / total * 60, 2) if total > 0 else 0.0
+    }
+    log.info("📊 %d informes en %.1fs (%s informes/min), %d fallidos, %d omitidos",
+             resumen['procesados'], resumen['segundos'], resumen['informes_por_minuto'], fallidos, omitidos,
+             extra=resumen)
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('entrada', help='Fichero .jsonl o .csv con las conjeturas')
+    parser.add_argument('salida', help='Fichero .jsonl donde se añaden los resultados')
+    parser.add_argument('--concurrencia', type=int, default=LOTE_CONCURRENCIA,
+                        help='Informes analizándose a la vez')
+    parser.add_argument('--modo', choices=MODOS_ANALISIS, default='secuencial')
+    parser.add_argument('--limite', type=int, default=None, help='Procesar como máximo N conjeturas')
+    parser.add_argument('--asincrono', action='store_true', help='Usar el camino asíncrono (un solo hilo)')
+    args = parser.parse_args()
+
+    resumen = procesar_lote(args.entrada, args.salida, args.concurrencia, args.modo, args.limite, args.asincrono)
+    raise SystemExit(1 if resumen['fallidos'] else 0)
+
+
+if __name__ == '__main__':
+    main()
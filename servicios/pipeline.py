@@ -0,0 +1,149 @@
+"""
+Ejecución en segundo plano del análisis completo de un informe
+Cada informe tiene un registro de progreso con los eventos publicados, que la
+página de revisión consume mediante Server-Sent Events
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agentes.registros import obtener_logger
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+PIPELINE_MAX_TRABAJADORES = 4     # Informes analizándose a la vez
+PIPELINE_RETENCION_SEGUNDOS = 600  # Tiempo que se conserva el progreso de un análisis terminado
+SSE_HEARTBEAT_SEGUNDOS = 15        # Comentario periódico para mantener viva la conexión
+
+log = obtener_logger('pipeline')
+
+
+# ============================================================================
+# PROGRESO DE UN ANÁLISIS
+# ============================================================================
+class ProgresoPipeline:
+    """Lista de eventos de un análisis, con espera bloqueante para los suscriptores"""
+
+    def __init__(self, informe_id: str):
+        self.informe_id = informe_id
+        self.eventos: List[Tuple[str, Dict[str, Any]]] = []
+        self.terminado = False
+        self.fallido = False
+        self.fin: Optional[float] = None
+        self._condicion = threading.Condition()
+
+    def publicar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        """Añade un evento y despierta a los suscriptores"""
+        with self._condicion:
+            self.eventos.append((tipo, datos))
+            self._condicion.notify_all()
+
+    def terminar(self) -> None:
+        """Marca el análisis como finalizado (no se publicarán más eventos)"""
+        with self._condicion:
+            self.terminado = True
+            self.fin = time.time()
+            self._condicion.notify_all()
+
+    def escuchar(self, desde: int = 0, timeout: float = SSE_HEARTBEAT_SEGUNDOS) -> Iterator[Optional[Tuple[int, str, Dict[str, Any]]]]:
+        """
+        Itera sobre los eventos a partir del índice indicado
+
+        Produce (indice, tipo, datos) por cada evento y None cada vez que pasan
+        `timeout` segundos sin novedades. Termina cuando el análisis finaliza.
+        """
+        indice = desde
+        while True:
+            with self._condicion:
+                if indice >= len(self.eventos) and not self.terminado:
+                    self._condicion.wait(timeout)
+                pendientes = self.eventos[indice:]
+                terminado = self.terminado
+
+            if not pendientes:
+                if terminado:
+                    return
+                yield None
+                continue
+
+            for tipo, datos in pendientes:
+                yield indice, tipo, datos
+                indice += 1
+
+
+def formatear_evento_sse(indice: int, tipo: str, datos: Dict[str, Any]) -> str:
+    """Serializa un evento en formato text/event-stream"""
+    return f"id: {indice}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def stream_sse(progreso: ProgresoPipeline, desde: int = 0) -> Iterator[str]:
+    """Genera el cuerpo de la respuesta SSE para un progreso, con latidos periódicos"""
+    for evento in progreso.escuchar(desde):
+        if evento is None:
+            yield ": ping\n\n"
+        else:
+            yield formatear_evento_sse(*evento)
+
+
+# ============================================================================
+# GESTOR DE ANÁLISIS EN SEGUNDO PLANO
+# ============================================================================
+class GestorPipelines:
+    """Lanza cada análisis una sola vez en un pool de hilos y conserva su progreso"""
+
+    def __init__(self, max_trabajadores: int = PIPELINE_MAX_TRABAJADORES):
+        self._executor = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix='pipeline')
+        self._progresos: Dict[str, ProgresoPipeline] = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self, informe_id: str, tarea: Callable[[ProgresoPipeline], None]) -> ProgresoPipeline:
+        """
+        Inicia el análisis del informe si no está ya en marcha o recién terminado
+
+        La tarea recibe el progreso y publica en él sus eventos. Un análisis
+        que terminó con error se vuelve a lanzar.
+        """
+        with self._lock:
+            self._purgar()
+            progreso = self._progresos.get(informe_id)
+            if progreso is not None and not progreso.fallido:
+                return progreso
+
+            progreso = ProgresoPipeline(informe_id)
+            self._progresos[informe_id] = progreso
+
+        self._executor.submit(self._ejecutar, progreso, tarea)
+        return progreso
+
+    def obtener(self, informe_id: str) -> Optional[ProgresoPipeline]:
+        """Progreso del análisis del informe, si existe"""
+        return self._progresos.get(informe_id)
+
+    def en_curso(self) -> int:
+        """Análisis en segundo plano que aún no han terminado"""
+        with self._lock:
+            return sum(1 for progreso in self._progresos.values() if not progreso.terminado)
+
+    def _ejecutar(self, progreso: ProgresoPipeline, tarea: Callable[[ProgresoPipeline], None]) -> None:
+        try:
+            tarea(progreso)
+        except Exception as e:
+            log.exception("❌ Error en el análisis en segundo plano: %s", e, extra={'informe_id': progreso.informe_id})
+            progreso.fallido = True
+            progreso.publicar('error', {'message': str(e)})
+        finally:
+            progreso.terminar()
+
+    def _purgar(self) -> None:
+        """Olvida los progresos terminados hace más de PIPELINE_RETENCION_SEGUNDOS"""
+        limite = time.time() - PIPELINE_RETENCION_SEGUNDOS
+        caducados = [informe_id for informe_id, progreso in self._progresos.items()
+                     if progreso.terminado and progreso.fin < limite]
+        for informe_id in caducados:
+            del self._progresos[informe_id]
@@ -0,0 +1,181 @@
+"""
+Secciones fijas de la plantilla del informe pericial, compartidas entre informes
+La mayor parte del informe final (datos del perito por rellenar, solicitante,
+antecedentes, metodología, conclusiones y anexos) es texto de plantilla igual
+en todos los informes. Cada informe referencia las mismas secciones inmutables
+en lugar de construir su propia copia, y solo guarda los campos propios
+(expediente, fechas, conjetura, análisis). Personalizar una sección crea una
+copia privada del informe (copia en escritura); la compartida no cambia nunca.
+"""
+
+from typing import Any, Dict, Iterable, Mapping
+
+
+# ============================================================================
+# SECCIÓN INMUTABLE
+# ============================================================================
+class SeccionCompartida(dict):
+    """
+    Diccionario de solo lectura compartido por todos los informes
+
+    Sigue siendo un dict para Jinja, json.dumps y el resto del código que lee
+    el informe; cualquier intento de modificarlo lanza TypeError. Las listas de
+    la plantilla se guardan como tuplas por el mismo motivo.
+    """
+
+    __slots__ = ()
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError("Sección compartida de la plantilla: usar personalizar_seccion() para modificarla")
+
+    __setitem__ = __delitem__ = __ior__ = _solo_lectura
+    update = pop = popitem = clear = setdefault = _solo_lectura
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return SeccionCompartida, (dict(self),)
+
+
+def _congelar(valor: Any) -> Any:
+    if isinstance(valor, Mapping):
+        return SeccionCompartida({clave: _congelar(v) for clave, v in valor.items()})
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _descongelar(valor: Any) -> Any:
+    if isinstance(valor, Mapping):
+        return {clave: _descongelar(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_descongelar(v) for v in valor]
+    return valor
+
+
+# ============================================================================
+# SECCIONES DE LA PLANTILLA
+# ============================================================================
+SECCIONES_PLANTILLA: Dict[str, Any] = _congelar({
+    'perito': {
+        'nombre': 'Dr./Dra. [NOMBRE DEL PERITO]',
+        'dni': '[DNI/NIE]',
+        'direccion': '[Dirección profesional completa]',
+        'telefono': '[Teléfono de contacto]',
+        'email': '[email@ejemplo.com]',
+        'titulo': '[Título profesional]',
+        'especialidad': '[Especialidad del perito]',
+        'num_colegiado': '[Número de colegiado]',
+        'experiencia': 'El perito cuenta con [X] años de experiencia en el ámbito de [especialidad], habiendo realizado numerosos informes periciales en casos similares. [Añadir más detalles relevantes sobre la experiencia].',
+        'juramento': 'Juro o prometo, por mi conciencia y honor, que ejerceré fielmente el cargo de perito, desempeñando mis funciones con imparcialidad y objetividad, cumpliendo con los deberes inherentes al mismo.'
+    },
+
+    'solicitante': {
+        'nombre': '[Nombre del solicitante / Juzgado]',
+        'representacion': '[Abogado/Procurador o tipo de representación]',
+        'domicilio': '[Domicilio del solicitante]',
+        'tipo_encargo': '[Judicial / Extrajudicial / Particular]'
+    },
+
+    'antecedentes': {
+        'hechos_previos': 'Con carácter previo al presente análisis, se han identificado los siguientes hechos relevantes que constituyen el contexto de la pericia. Se establecen a continuación los antecedentes fácticos que resultan de aplicación al caso objeto de estudio.',
+        'documentacion': [
+            'Documentación aportada por el solicitante',
+            'Normativa técnica aplicable',
+            'Informes previos (si los hubiere)',
+            'Fotografías y material gráfico',
+            'Otra documentación relevante'
+        ],
+        'normativa': 'Normativa legal y técnica aplicable al caso según el análisis realizado y el ámbito de aplicación correspondiente.'
+    },
+
+    'metodologia': {
+        'tecnicas': [
+            'Aplicación del Método Formal Causal',
+            'Análisis documental exhaustivo',
+            'Inspección técnica (si procede)',
+            'Análisis normativo aplicable',
+            'Consulta de fuentes técnicas y científicas especializadas'
+        ],
+        'criterios': 'Los criterios de valoración empleados se basan en principios de objetividad, imparcialidad y rigor científico-técnico, aplicando las mejores prácticas profesionales del sector y la normativa vigente aplicable al caso.',
+        'normas': 'Normas técnicas, legales y reglamentarias específicas aplicadas en el análisis según corresponda.',
+        'herramientas': [
+            'Sistema de Informes Periciales',
+            'Software de análisis técnico especializado',
+            'Bases de datos jurídicas y técnicas',
+            'Herramientas de medición y cálculo (si aplica)'
+        ]
+    },
+
+    'conclusiones': {
+        'respuestas': [
+            'Primera conclusión técnica fundamentada en el análisis realizado.',
+            'Segunda conclusión técnica fundamentada en los resultados obtenidos.',
+            'Tercera conclusión técnica basada en la evaluación de los elementos probatorios.',
+            'Conclusiones adicionales según el desarrollo del análisis pericial.'
+        ],
+        'opinion_tecnica': 'Opinión técnica profesional del perito sobre el caso analizado, fundamentada en el análisis realizado y en su experiencia profesional, estableciendo de forma clara y precisa su valoración técnica del caso.',
+        'recomendaciones': [
+            'Recomendación técnica basada en las conclusiones del análisis.',
+            'Recomendación profesional derivada de los hallazgos del informe.'
+        ]
+    },
+
+    'anexos': [
+        'Documentación fotográfica',
+        'Planos y esquemas técnicos',
+        'Cálculos y tablas detalladas',
+        'Normativa aplicable (textos completos)',
+        'Otra documentación de referencia'
+    ]
+})
+
+# Secciones de diccionario que el usuario puede personalizar en un informe
+SECCIONES_PERSONALIZABLES = tuple(
+    seccion for seccion, valor in SECCIONES_PLANTILLA.items() if isinstance(valor, SeccionCompartida)
+)
+
+
+# ============================================================================
+# COPIA EN ESCRITURA
+# ============================================================================
+def es_compartida(valor: Any) -> bool:
+    """True si el valor es una sección de la plantilla (no ocupa memoria propia del informe)"""
+    return any(valor is compartida for compartida in SECCIONES_PLANTILLA.values())
+
+
+def personalizar_seccion(actual: Mapping[str, Any], campos: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Devuelve una copia privada de la sección con los campos indicados sustituidos
+
+    La sección actual (compartida o ya personalizada) no se modifica: el
+    llamante guarda la copia en el informe en su lugar.
+
+    Raises:
+        ValueError: Si algún campo no existe en la sección
+    """
+    desconocidos = set(campos) - set(actual)
+    if desconocidos:
+        raise ValueError(f"Campos no reconocidos en la sección: {', '.join(sorted(desconocidos))}")
+    seccion = _descongelar(actual)
+    seccion.update(_descongelar(campos))
+    return seccion
+
+
+def compartir_secciones(informe: Dict[str, Any], secciones: Iterable[str] = SECCIONES_PLANTILLA) -> Dict[str, Any]:
+    """
+    Vuelve a apuntar a la plantilla las secciones sin personalizar de un informe
+
+    Un informe leído de SQLite trae copias de las secciones; las que siguen
+    siendo iguales a la plantilla se sustituyen por la compartida.
+    """
+    for seccion in secciones:
+        valor = informe.get(seccion)
+        compartida = SECCIONES_PLANTILLA[seccion]
+        if valor is not None and valor is not compartida and _congelar(valor) == compartida:
+            informe[seccion] = compartida
+    return informe
@@ -34,6 +34,14 @@ let paqueteActual = null;
 let motivacionesData = null;
 let paquetesProcesando = new Set();
 let paquetesCompletados = new Set();
+// Etapas generadas a partir de motivaciones editadas después (se regeneran con /refrescar-informe)
+let paquetesObsoletos = new Set(obsoletosIniciales || []);
+
+// Nombres de las etapas que no son paquetes de motivaciones
+const nombresEtapas = {
+    'objetivos': 'Objetivos',
+    'que_es': 'Definición del problema'
+};
 
 // ============================================================================
 // INICIALIZACIÓN
@@ -45,8 +53,8 @@ document.addEventListener('DOMContentLoaded', async function() {
     console.log('Conjetura:', conjetura);
     console.log('Análisis Data:', analisisData);
     
-    // Si no hay análisis, procesarlo con el agente
-    if (!analisisData || !analisisData.por_que) {
+    // Si no hay análisis completo, procesarlo (o reanudar el seguimiento) con el agente
+    if (!analisisData || !analisisData.por_que || !analisisData.que_es || Object.keys(analisisData.que_es).length === 0) {
         await procesarConAgente();
     } else {
         // Guardar los datos de motivaciones
@@ -54,6 +62,7 @@ document.addEventListener('DOMContentLoaded', async function() {
         
         // Renderizar la lista de paquetes
         renderizarPaquetes();
+        renderizarAvisoObsoletos();
     }
 });
 
@@ -157,12 +166,8 @@ async function procesarConAgente() {
             throw new Error(result.message || 'Error al iniciar procesamiento');
         }
         
-        // Procesar paquetes en secuencia (aparecen conforme se generan)
-        const paquetes = ['preceptivas', 'tecnicas', 'facultativas', 'progresistas'];
-        
-        for (const paquete of paquetes) {
-            await procesarPaquete(paquete);
-        }
+        // Escuchar el progreso del servidor (los paquetes aparecen conforme se generan)
+        await escucharProgreso(result.progreso_url || `/progreso-agente/${informeId}`);
         
         // Mostrar mensaje de éxito
         mostrarNotificacion('✅ Análisis completado con éxito', 'success');
@@ -193,39 +198,92 @@ async function procesarConAgente() {
     }
 }
 
-async function procesarPaquete(paqueteKey) {
-    const config = paquetesConfig[paqueteKey];
-    
-    mostrarNotificacion(`🔍 Analizando ${config.titulo.toLowerCase()}...`, 'processing');
-    paquetesProcesando.add(paqueteKey);
-    
-    try {
-        const response = await fetch(`/obtener-paquete/${informeId}/${paqueteKey}`);
-        const result = await response.json();
+function escucharProgreso(url) {
+    return new Promise((resolve, reject) => {
+        const fuente = new EventSource(url);
         
-        if (result.success) {
-            // Actualizar datos
-            motivacionesData.por_que[paqueteKey] = result.motivaciones;
-            paquetesCompletados.add(paqueteKey);
-            paquetesProcesando.delete(paqueteKey);
+        fuente.addEventListener('inicio_paquete', (evento) => {
+            const datos = JSON.parse(evento.data);
+            const config = paquetesConfig[datos.paquete];
             
-            // Actualizar UI
-            renderizarPaquetes();
-            
-            const numMotivaciones = result.motivaciones.length;
-            mostrarNotificacion(
-                `✅ ${config.titulo}: ${numMotivaciones} motivación${numMotivaciones !== 1 ? 'es' : ''} generada${numMotivaciones !== 1 ? 's' : ''}`,
-                'success'
-            );
+            if (config) {
+                paquetesProcesando.add(datos.paquete);
+                renderizarPaquetes();
+                mostrarNotificacion(`🔍 Analizando ${config.titulo.toLowerCase()}...`, 'processing');
+            }
+        });
+        
+        // Cada motivación llega en cuanto el modelo la completa
+        fuente.addEventListener('elemento', (evento) => {
+            const datos = JSON.parse(evento.data);
+            if (!paquetesConfig[datos.paquete]) return;
             
-        } else {
-            throw new Error(result.message || 'Error al procesar paquete');
-        }
+            const motivaciones = motivacionesData.por_que[datos.paquete];
+            motivaciones[datos.indice] = datos.elemento;
+            renderizarPaquetes();
+            if (paqueteActual === datos.paquete) {
+                renderizarEditor(datos.paquete);
+            }
+        });
         
-    } catch (error) {
-        paquetesProcesando.delete(paqueteKey);
-        mostrarNotificacion(`❌ Error en ${config.titulo.toLowerCase()}`, 'error');
-        throw error;
+        fuente.addEventListener('paquete', (evento) => {
+            recibirPaquete(JSON.parse(evento.data));
+        });
+        
+        fuente.addEventListener('error_paquete', (evento) => {
+            const datos = JSON.parse(evento.data);
+            const config = paquetesConfig[datos.paquete];
+            paquetesProcesando.delete(datos.paquete);
+            renderizarPaquetes();
+            mostrarNotificacion(`❌ Error en ${config ? config.titulo.toLowerCase() : datos.paquete}`, 'error');
+        });
+        
+        fuente.addEventListener('completado', () => {
+            fuente.close();
+            resolve();
+        });
+        
+        // Evento 'error' enviado por el servidor (con datos) o fallo de la conexión
+        fuente.addEventListener('error', (evento) => {
+            if (evento.data) {
+                fuente.close();
+                reject(new Error(JSON.parse(evento.data).message || 'Error al procesar'));
+            } else if (fuente.readyState === EventSource.CLOSED) {
+                reject(new Error('Se perdió la conexión con el servidor'));
+            }
+            // Si no está cerrada, EventSource reconecta solo y reanuda desde el último evento
+        });
+    });
+}
+
+function recibirPaquete(result) {
+    const paqueteKey = result.paquete;
+    
+    if (paqueteKey === 'objetivos') {
+        motivacionesData.para_que = result.objetivos;
+        return;
+    }
+    if (paqueteKey === 'que_es') {
+        motivacionesData.que_es = result.definicion;
+        return;
+    }
+    
+    const config = paquetesConfig[paqueteKey];
+    
+    // Actualizar datos
+    motivacionesData.por_que[paqueteKey] = result.motivaciones;
+    paquetesCompletados.add(paqueteKey);
+    paquetesProcesando.delete(paqueteKey);
+    
+    // Actualizar UI
+    renderizarPaquetes();
+    
+    if (!result.cached) {
+        const numMotivaciones = result.motivaciones.length;
+        mostrarNotificacion(
+            `✅ ${config.titulo}: ${numMotivaciones} motivación${numMotivaciones !== 1 ? 'es' : ''} generada${numMotivaciones !== 1 ? 's' : ''}`,
+            'success'
+        );
     }
 }
 
@@ -247,9 +305,10 @@ function renderizarPaquetes() {
         const motivaciones = motivacionesData.por_que[paqueteKey] || [];
         const tieneMotivaciones = motivaciones.length > 0;
         const estaProcesando = paquetesProcesando.has(paqueteKey);
+        const estaObsoleto = paquetesObsoletos.has(paqueteKey);
         
         const paqueteDiv = document.createElement('div');
-        paqueteDiv.className = `package-item ${tieneMotivaciones ? '' : 'disabled'} ${estaProcesando ? 'processing' : ''}`;
+        paqueteDiv.className = `package-item ${tieneMotivaciones ? '' : 'disabled'} ${estaProcesando ? 'processing' : ''} ${estaObsoleto ? 'obsoleto' : ''}`;
         paqueteDiv.dataset.paquete = paqueteKey;
         
         if (tieneMotivaciones) {
@@ -259,6 +318,8 @@ function renderizarPaquetes() {
         let badgeContent;
         if (estaProcesando) {
             badgeContent = '<span class="spinner-small"></span> Procesando...';
+        } else if (estaObsoleto) {
+            badgeContent = '⚠️ Desactualizado';
         } else if (tieneMotivaciones) {
             badgeContent = `${motivaciones.length} motivación${motivaciones.length !== 1 ? 'es' : ''}`;
         } else {
@@ -431,6 +492,7 @@ async function guardarMotivacion(boton) {
         if (result.success) {
             mostrarEstado(statusSpan, 'success', '✓ Guardado');
             console.log('Motivación guardada correctamente');
+            actualizarObsoletos(result.obsoletos || []);
         } else {
             throw new Error(result.message || 'Error al guardar');
         }
@@ -445,6 +507,85 @@ async function guardarMotivacion(boton) {
     }
 }
 
+// ============================================================================
+// ETAPAS DESACTUALIZADAS
+// ============================================================================
+
+function actualizarObsoletos(obsoletos) {
+    paquetesObsoletos = new Set(obsoletos);
+    renderizarPaquetes();
+    renderizarAvisoObsoletos();
+}
+
+function renderizarAvisoObsoletos() {
+    const aviso = document.getElementById('avisoObsoletos');
+    if (!aviso) return;
+    
+    if (paquetesObsoletos.size === 0) {
+        aviso.hidden = true;
+        return;
+    }
+    
+    const nombres = [...paquetesObsoletos].map(paquete =>
+        paquetesConfig[paquete] ? paquetesConfig[paquete].titulo : (nombresEtapas[paquete] || paquete)
+    );
+    document.getElementById('avisoObsoletosTexto').textContent =
+        `Estas etapas se generaron antes de tus cambios y pueden no reflejarlos: ${nombres.join(', ')}.`;
+    aviso.hidden = false;
+}
+
+async function refrescarInforme() {
+    const boton = document.getElementById('refrescarInformeBtn');
+    boton.disabled = true;
+    boton.textContent = '⏳ Actualizando...';
+    
+    const refrescando = [...paquetesObsoletos];
+    refrescando.forEach(paquete => paquetesProcesando.add(paquete));
+    renderizarPaquetes();
+    
+    try {
+        const response = await fetch(`/refrescar-informe/${informeId}`, {
+            method: 'POST'
+        });
+        
+        const result = await response.json();
+        
+        if (!result.success) {
+            throw new Error(result.message || 'Error al actualizar las etapas');
+        }
+        
+        // Traer el contenido regenerado (ya guardado en el servidor)
+        for (const paquete of result.regenerados) {
+            const respuesta = await fetch(`/obtener-paquete/${informeId}/${paquete}`);
+            const datos = await respuesta.json();
+            if (datos.success) {
+                recibirPaquete(datos);
+            }
+        }
+        
+        refrescando.forEach(paquete => paquetesProcesando.delete(paquete));
+        actualizarObsoletos([]);
+        if (paqueteActual && result.regenerados.includes(paqueteActual)) {
+            renderizarEditor(paqueteActual);
+        }
+        
+        const total = result.regenerados.length;
+        mostrarNotificacion(
+            `🔄 ${total} etapa${total !== 1 ? 's' : ''} actualizada${total !== 1 ? 's' : ''}`,
+            'success'
+        );
+        
+    } catch (error) {
+        console.error('Error al refrescar el informe:', error);
+        refrescando.forEach(paquete => paquetesProcesando.delete(paquete));
+        renderizarPaquetes();
+        mostrarNotificacion('Error al actualizar las etapas. Por favor, inténtalo de nuevo.', 'error');
+    } finally {
+        boton.disabled = false;
+        boton.textContent = '🔄 Actualizar etapas';
+    }
+}
+
 // ============================================================================
 // GENERAR INFORME FINAL
 // ============================================================================
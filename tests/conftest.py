@@ -0,0 +1,32 @@
+"""
+Configuración común de las pruebas
+Las pruebas se ejecutan sin Ollama y sin tocar los ficheros de datos del
+proyecto: la configuración por variables de entorno se fija antes de importar
+la aplicación, y el LLM se sustituye por agentes.clientes_llm.LLMFalso.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_DATOS_PRUEBAS = tempfile.mkdtemp(prefix='informes_pruebas_')
+
+os.environ.setdefault('INFORMES_CACHE_LLM_ACTIVA', '0')
+os.environ.setdefault('INFORMES_ESPECULAR_ETAPAS', '0')
+os.environ.setdefault('INFORMES_PRECALENTAR_GRAFOS', '0')
+os.environ.setdefault('INFORMES_LOG_NIVEL', 'ERROR')
+os.environ.setdefault('INFORMES_CHECKPOINTS', os.path.join(_DATOS_PRUEBAS, 'checkpoints.sqlite3'))
+os.environ.setdefault('INFORMES_DESBORDE', os.path.join(_DATOS_PRUEBAS, 'desborde.sqlite3'))
+os.environ.setdefault('INFORMES_DB', os.path.join(_DATOS_PRUEBAS, 'informes.sqlite3'))
+
+
+@pytest.fixture
+def llm_falso():
+    """LLM local con respuestas válidas para cada etapa, en lugar de Ollama"""
+    # Se importan aquí para que lean la configuración de arriba
+    from agentes.clientes_llm import LLMFalso, registro_clientes
+    from benchmarks.respuestas_falsas import responder
+
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder)) as falso:
+        yield falso
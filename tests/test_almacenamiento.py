@@ -0,0 +1,195 @@
+"""
+Almacenes de informes: contrato común de AlmacenMemoria, AlmacenSQLite y
+AlmacenAcotado, y la expulsión LRU, el desborde a disco y la caducidad de este último
+"""
+
+import copy
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from agentes.formal_causal_agent import ANALISIS_RESPALDO
+from servicios.almacenamiento import AlmacenAcotado, AlmacenMemoria, AlmacenSQLite, crear_almacen
+from servicios.plantilla_informe import SECCIONES_PLANTILLA
+
+
+def _informe(conjetura='Conjetura de prueba'):
+    return {'conjetura': conjetura, 'analisis': copy.deepcopy(ANALISIS_RESPALDO), 'informe_generado': False}
+
+
+@pytest.fixture(params=['memoria', 'sqlite', 'acotado'])
+def almacen(request, tmp_path):
+    if request.param == 'memoria':
+        return AlmacenMemoria()
+    if request.param == 'sqlite':
+        return AlmacenSQLite(str(tmp_path / 'informes.sqlite3'))
+    return AlmacenAcotado(desborde=AlmacenSQLite(str(tmp_path / 'desborde.sqlite3')))
+
+
+@pytest.fixture
+def acotado(tmp_path):
+    """Almacén acotado con sitio para dos informes en memoria"""
+    return AlmacenAcotado(max_entradas=2, ttl=60, desborde=AlmacenSQLite(str(tmp_path / 'desborde.sqlite3')))
+
+
+# ============================================================================
+# CONTRATO COMÚN
+# ============================================================================
+def test_guardar_y_obtener(almacen):
+    almacen.guardar('a', _informe())
+    assert almacen.obtener('a') == _informe()
+    assert 'a' in almacen
+    assert almacen.obtener('b') is None
+    assert 'b' not in almacen
+
+
+def test_actualizar_campos(almacen):
+    almacen.guardar('a', _informe())
+    almacen.actualizar('a', informe_generado=True, version=2)
+    datos = almacen.obtener('a')
+    assert (datos['informe_generado'], datos['version']) == (True, 2)
+    assert datos['analisis'] == ANALISIS_RESPALDO
+
+
+def test_actualizar_paquete(almacen):
+    almacen.guardar('a', _informe())
+    motivaciones = [{'titulo': 'Nueva', 'contenido': 'Contenido nuevo'}]
+    almacen.actualizar_paquete('a', 'tecnicas', motivaciones)
+    almacen.actualizar_paquete('a', 'que_es', {'contenido': 'Definición', 'contexto': 'Contexto'})
+    analisis = almacen.obtener('a')['analisis']
+    assert analisis['por_que']['tecnicas'] == motivaciones
+    assert analisis['que_es'] == {'contenido': 'Definición', 'contexto': 'Contexto'}
+    assert analisis['por_que']['preceptivas'] == ANALISIS_RESPALDO['por_que']['preceptivas']
+
+
+def test_actualizar_motivacion(almacen):
+    almacen.guardar('a', _informe())
+    motivacion = {'titulo': 'Editada', 'contenido': 'Contenido editado'}
+    almacen.actualizar_motivacion('a', 'preceptivas', 0, motivacion)
+    preceptivas = almacen.obtener('a')['analisis']['por_que']['preceptivas']
+    assert preceptivas[0] == motivacion
+    assert preceptivas[1:] == ANALISIS_RESPALDO['por_que']['preceptivas'][1:]
+
+
+def test_paquete_no_reconocido(almacen):
+    almacen.guardar('a', _informe())
+    with pytest.raises(ValueError):
+        almacen.actualizar_paquete('a', 'desconocido', [])
+
+
+def test_eliminar(almacen):
+    almacen.guardar('a', _informe())
+    almacen.eliminar('a')
+    assert almacen.obtener('a') is None
+    assert almacen.listar() == []
+
+
+def test_listar_en_orden_de_creacion(almacen):
+    for informe_id in ('c', 'a', 'b'):
+        almacen.guardar(informe_id, _informe())
+    assert almacen.listar() == ['c', 'a', 'b']
+    assert almacen.listar(limite=2) == ['c', 'a']
+
+
+def test_eliminar_inactivos(almacen):
+    almacen.guardar('a', _informe())
+    assert almacen.eliminar_inactivos(datetime.now() - timedelta(hours=1)) == []
+    assert almacen.eliminar_inactivos(datetime.now() + timedelta(seconds=1)) == ['a']
+    assert almacen.obtener('a') is None
+    assert almacen.listar() == []
+
+
+@pytest.mark.parametrize('tipo, clase', [('memoria', AlmacenMemoria), ('sqlite', AlmacenSQLite),
+                                         ('acotado', AlmacenAcotado)])
+def test_crear_almacen(tipo, clase):
+    assert isinstance(crear_almacen(tipo), clase)
+
+
+def test_crear_almacen_tipo_desconocido():
+    with pytest.raises(ValueError):
+        crear_almacen('desconocido')
+
+
+# ============================================================================
+# ALMACÉN ACOTADO
+# ============================================================================
+def test_expulsa_el_menos_usado_al_desborde(acotado):
+    acotado.guardar('a', _informe('A'))
+    acotado.guardar('b', _informe('B'))
+    acotado.obtener('a')  # 'b' pasa a ser el menos usado
+    acotado.guardar('c', _informe('C'))
+
+    metricas = acotado.metricas()
+    assert (metricas['entradas'], metricas['expulsiones'], metricas['en_desborde']) == (2, 1, 1)
+    assert acotado.desborde.obtener('b')['conjetura'] == 'B'
+    assert acotado.desborde.obtener('a') is None
+
+
+def test_recupera_del_desborde_al_pedirlo(acotado):
+    for informe_id in 'abc':
+        acotado.guardar(informe_id, _informe(informe_id.upper()))
+
+    assert acotado.obtener('a') == _informe('A')
+    metricas = acotado.metricas()
+    assert (metricas['recuperaciones'], metricas['desbordes'], metricas['entradas']) == (1, 2, 2)
+    assert acotado.desborde.obtener('a') is None
+    assert acotado.listar() == ['a', 'b', 'c']
+
+
+def test_modificar_un_informe_desbordado(acotado):
+    for informe_id in 'abc':
+        acotado.guardar(informe_id, _informe(informe_id.upper()))
+    acotado.actualizar_paquete('a', 'tecnicas', [])
+    assert acotado.obtener('a')['analisis']['por_que']['tecnicas'] == []
+
+
+def test_recupera_las_secciones_compartidas(acotado):
+    acotado.guardar('a', {**_informe('A'), **SECCIONES_PLANTILLA})
+    acotado.guardar('b', _informe('B'))
+    acotado.guardar('c', _informe('C'))
+
+    datos = acotado.obtener('a')
+    assert all(datos[seccion] is compartida for seccion, compartida in SECCIONES_PLANTILLA.items())
+
+
+def test_expulsa_por_bytes(tmp_path):
+    tamano = AlmacenAcotado._estimar_bytes(_informe())
+    acotado = AlmacenAcotado(max_bytes=tamano * 2 + 1, desborde=AlmacenSQLite(str(tmp_path / 'desborde.sqlite3')))
+    for informe_id in 'abc':
+        acotado.guardar(informe_id, _informe())
+    metricas = acotado.metricas()
+    assert (metricas['entradas'], metricas['bytes']) == (2, tamano * 2)
+
+
+def test_secciones_compartidas_no_cuentan_en_los_bytes():
+    informe = _informe()
+    assert AlmacenAcotado._estimar_bytes({**informe, **SECCIONES_PLANTILLA}) == AlmacenAcotado._estimar_bytes(informe)
+
+
+def test_bytes_se_ajustan_al_modificar_partes(acotado):
+    acotado.guardar('a', _informe())
+    acotado.actualizar_paquete('a', 'tecnicas', [])
+    acotado.actualizar_motivacion('a', 'preceptivas', 0, {'titulo': 'T', 'contenido': 'C'})
+    acotado.actualizar('a', informe_generado=True)
+    assert acotado.metricas()['bytes'] == AlmacenAcotado._estimar_bytes(acotado.obtener('a'))
+
+
+def test_caducan_los_informes_inactivos(acotado, monkeypatch):
+    acotado.guardar('a', _informe())
+    ahora = time.time()
+    monkeypatch.setattr(time, 'time', lambda: ahora + 61)
+    assert acotado.obtener('a') is None
+    assert acotado.metricas()['caducados'] == 1
+    assert acotado.listar() == []
+
+
+def test_desborde_en_memoria():
+    acotado = AlmacenAcotado(max_entradas=1, ttl=60, desborde=AlmacenMemoria())
+    acotado.guardar('a', _informe('A'))
+    acotado.guardar('b', _informe('B'))  # El volcado purga también los inactivos del desborde
+    assert acotado.metricas()['desbordes'] == 1
+    assert acotado.obtener('a')['conjetura'] == 'A'
+
+    assert sorted(acotado.eliminar_inactivos(datetime.now() + timedelta(seconds=1))) == ['a', 'b']
+    assert acotado.listar() == []
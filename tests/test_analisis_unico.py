@@ -0,0 +1,83 @@
+"""
+Modo 'unico': todo el análisis en una sola llamada, y solo las secciones que
+faltan o no tienen la forma esperada se regeneran con su nodo secuencial
+"""
+
+import json
+
+import pytest
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import procesar_conjetura
+from agentes.politica_llm import politica_llm
+from benchmarks.respuestas_falsas import detectar_etapa, responder, respuesta_para_etapa
+
+CONJETURA = 'Conjetura de prueba para el análisis en una sola llamada'
+
+
+def _sin(*claves):
+    """Respuesta combinada sin las secciones indicadas"""
+    datos = json.loads(respuesta_para_etapa('por_que'))
+    for clave in claves:
+        if clave in datos['por_que']:
+            del datos['por_que'][clave]
+        else:
+            del datos[clave]
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def _analizar(respuesta_completa):
+    """Ejecuta el modo 'unico' y devuelve el resultado y las etapas pedidas por separado"""
+    etapas = []
+
+    def responder_etapas(messages):
+        humanos = [mensaje.content for mensaje in messages if mensaje.type == 'human']
+        if detectar_etapa(humanos[0]) == 'por_que':  # Llamada combinada o su reparación
+            return respuesta_completa
+        etapas.append(detectar_etapa(humanos[-1]))
+        return responder(messages)
+
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder_etapas)):
+        return procesar_conjetura(CONJETURA, modo='unico'), etapas
+
+
+def test_respuesta_completa_en_una_llamada(llm_falso):
+    resultado = procesar_conjetura(CONJETURA, modo='unico')
+    assert resultado['success']
+    assert llm_falso.llamadas == 1
+    assert resultado['analisis'] == json.loads(respuesta_para_etapa('por_que'))
+
+
+@pytest.mark.parametrize('respuesta, etapas', [
+    (_sin('facultativas'), ['facultativas']),
+    (_sin('tecnicas', 'que_es'), ['tecnicas', 'que_es']),
+    (_sin('para_que'), ['para_que']),
+])
+def test_respuesta_parcial_regenera_solo_lo_que_falta(respuesta, etapas):
+    resultado, pedidas = _analizar(respuesta)
+    assert resultado['success']
+    assert pedidas == etapas
+
+    # Lo que sí llegó en la respuesta combinada se conserva tal cual
+    completa = json.loads(respuesta_para_etapa('por_que'))
+    for tipo, motivaciones in resultado['analisis']['por_que'].items():
+        if tipo not in etapas:
+            assert motivaciones == completa['por_que'][tipo]
+
+
+def test_seccion_mal_formada_se_regenera():
+    datos = json.loads(respuesta_para_etapa('por_que'))
+    datos['por_que']['progresistas'] = [{'titulo': 'Sin contenido'}]
+    datos['que_es'] = {'contenido': ''}
+    resultado, pedidas = _analizar(json.dumps(datos, ensure_ascii=False))
+    assert pedidas == ['progresistas', 'que_es']
+    assert all(motivacion['contenido'] for motivacion in resultado['analisis']['por_que']['progresistas'])
+    assert resultado['analisis']['que_es']['contenido']
+
+
+def test_respuesta_invalida_regenera_todas_las_etapas(monkeypatch):
+    monkeypatch.setattr(politica_llm, 'espera_base', 0.001)
+    monkeypatch.setattr(politica_llm, 'espera_maxima', 0.001)
+    resultado, pedidas = _analizar('Esto no es JSON')
+    assert resultado['success']
+    assert pedidas == ['preceptivas', 'tecnicas', 'facultativas', 'progresistas', 'para_que', 'que_es']
@@ -0,0 +1,150 @@
+"""
+Caché de páginas renderizadas y su uso en /informe y /mapa-conceptual:
+ETag por versión del informe, 304 con If-None-Match y variante gzip
+"""
+
+import copy
+import gzip
+
+import pytest
+
+from agentes.formal_causal_agent import ANALISIS_RESPALDO
+from servicios.cache_paginas import PAGINAS_GZIP_MIN_BYTES, CachePaginas, PaginaRenderizada
+from servicios.plantilla_informe import SECCIONES_PLANTILLA
+
+HTML_CORTO = '<p>Informe</p>'
+HTML_LARGO = '<p>' + 'Informe pericial. ' * PAGINAS_GZIP_MIN_BYTES + '</p>'
+
+
+# ============================================================================
+# PÁGINA Y CACHÉ
+# ============================================================================
+def test_variantes_de_la_pagina():
+    pagina = PaginaRenderizada(HTML_LARGO)
+    cuerpo, etag, comprimido = pagina.variante(False)
+    cuerpo_gz, etag_gz, comprimido_gz = pagina.variante(True)
+
+    assert (cuerpo, comprimido) == (HTML_LARGO.encode('utf-8'), False)
+    assert comprimido_gz and gzip.decompress(cuerpo_gz) == cuerpo
+    assert etag_gz == f'{etag}-gz'
+    assert PaginaRenderizada(HTML_LARGO).etag == etag
+
+
+def test_paginas_cortas_no_se_comprimen():
+    pagina = PaginaRenderizada(HTML_CORTO)
+    assert pagina.variante(True) == pagina.variante(False)
+
+
+def test_acierto_por_vista_informe_y_version():
+    cache = CachePaginas()
+    renders = []
+
+    def renderizar():
+        renders.append(1)
+        return HTML_CORTO
+
+    pagina = cache.obtener('informe', 'a', 1, renderizar)
+    assert cache.obtener('informe', 'a', 1, renderizar) is pagina
+    cache.obtener('mapa', 'a', 1, renderizar)
+    cache.obtener('informe', 'a', 2, renderizar)
+    assert len(renders) == 3
+    assert (cache.estadisticas()['aciertos'], cache.estadisticas()['fallos']) == (1, 3)
+
+
+def test_expulsa_la_menos_usada():
+    cache = CachePaginas(max_entradas=2)
+    for informe_id in 'aba':
+        cache.obtener('informe', informe_id, 1, lambda: HTML_CORTO)  # 'b' pasa a ser la menos usada
+    cache.obtener('informe', 'c', 1, lambda: HTML_CORTO)
+    assert cache.estadisticas()['paginas'] == 2
+
+    fallos = cache.fallos
+    cache.obtener('informe', 'a', 1, lambda: HTML_CORTO)
+    assert cache.fallos == fallos
+    cache.obtener('informe', 'b', 1, lambda: HTML_CORTO)
+    assert cache.fallos == fallos + 1
+
+
+def test_expulsa_por_bytes():
+    limite = PaginaRenderizada(HTML_LARGO).bytes * 2
+    cache = CachePaginas(max_bytes=limite)
+    for informe_id in 'abc':
+        cache.obtener('informe', informe_id, 1, lambda: HTML_LARGO)
+    estadisticas = cache.estadisticas()
+    assert estadisticas['paginas'] == 2 and estadisticas['bytes'] <= limite
+
+
+def test_invalidar_un_informe():
+    cache = CachePaginas()
+    for vista in ('informe', 'mapa'):
+        cache.obtener(vista, 'a', 1, lambda: HTML_CORTO)
+    cache.obtener('informe', 'b', 1, lambda: HTML_CORTO)
+    cache.invalidar('a')
+    estadisticas = cache.estadisticas()
+    assert (estadisticas['paginas'], estadisticas['invalidaciones']) == (1, 1)
+
+
+def test_desactivada_no_guarda():
+    cache = CachePaginas(max_entradas=0)
+    cache.obtener('informe', 'a', 1, lambda: HTML_CORTO)
+    assert cache.estadisticas()['paginas'] == 0
+
+
+# ============================================================================
+# RESPUESTAS HTTP
+# ============================================================================
+@pytest.fixture
+def cliente():
+    import app
+
+    informe_id = 'informe-etag'
+    app.almacen_informes.guardar(informe_id, {
+        'conjetura': 'Conjetura de prueba para el informe',
+        'analisis': copy.deepcopy(ANALISIS_RESPALDO),
+        'informe_generado': False
+    })
+    cliente = app.app.test_client()
+    assert cliente.post('/generar-informe-final', json={'informe_id': informe_id}).status_code == 200
+    yield cliente, informe_id
+    app.almacen_informes.eliminar(informe_id)
+    app.cache_paginas.invalidar(informe_id)
+
+
+@pytest.mark.parametrize('ruta', ['/informe/{}', '/mapa-conceptual/{}'])
+def test_304_si_el_navegador_tiene_la_version(cliente, ruta):
+    cliente, informe_id = cliente
+    respuesta = cliente.get(ruta.format(informe_id))
+    etag = respuesta.headers['ETag']
+    assert respuesta.status_code == 200 and respuesta.headers['Cache-Control'] == 'no-cache'
+
+    revalidada = cliente.get(ruta.format(informe_id), headers={'If-None-Match': etag})
+    assert revalidada.status_code == 304
+    assert revalidada.data == b''
+    assert revalidada.headers['ETag'] == etag
+
+
+def test_gzip_con_su_propio_etag(cliente):
+    cliente, informe_id = cliente
+    plano = cliente.get(f'/informe/{informe_id}')
+    comprimido = cliente.get(f'/informe/{informe_id}', headers={'Accept-Encoding': 'gzip'})
+
+    assert comprimido.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in comprimido.headers['Vary']
+    assert gzip.decompress(comprimido.data) == plano.data
+    assert comprimido.headers['ETag'] != plano.headers['ETag']
+
+
+def test_modificar_el_informe_cambia_el_etag(cliente):
+    cliente, informe_id = cliente
+    etag = cliente.get(f'/informe/{informe_id}').headers['ETag']
+
+    respuesta = cliente.post('/personalizar-seccion', json={
+        'informe_id': informe_id, 'seccion': 'perito', 'campos': {'nombre': 'Dra. Pérez'}
+    })
+    assert respuesta.status_code == 200
+
+    nueva = cliente.get(f'/informe/{informe_id}', headers={'If-None-Match': etag})
+    assert nueva.status_code == 200
+    assert nueva.headers['ETag'] != etag
+    assert 'Dra. Pérez' in nueva.get_data(as_text=True)
+    assert SECCIONES_PLANTILLA['perito']['nombre'] != 'Dra. Pérez'
@@ -0,0 +1,88 @@
+"""
+Caché persistente de respuestas del LLM: clave por contenido, caducidad (TTL)
+y expulsión de las menos usadas recientemente (LRU) por entradas y por bytes
+"""
+
+import time
+
+import pytest
+
+from agentes.cache_respuestas import CacheRespuestasLLM, calcular_clave
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheRespuestasLLM(str(tmp_path / 'respuestas.sqlite3'), ttl=60, max_entradas=3, max_bytes=1000)
+
+
+def test_clave_depende_de_todo_lo_que_determina_la_respuesta():
+    clave = calcular_clave('modelo', 0.7, 'sistema', 'prompt')
+    assert clave == calcular_clave('modelo', 0.7, 'sistema', 'prompt')
+    assert clave != calcular_clave('otro', 0.7, 'sistema', 'prompt')
+    assert clave != calcular_clave('modelo', 0.2, 'sistema', 'prompt')
+    assert clave != calcular_clave('modelo', 0.7, 'otro', 'prompt')
+    assert clave != calcular_clave('modelo', 0.7, 'sistema', 'otro')
+    assert clave != calcular_clave('modelo', 0.7, 'sistema', 'prompt', {'type': 'object'})
+
+
+def test_acierto_y_fallo(cache):
+    assert cache.obtener('a') is None
+    cache.guardar('a', 'respuesta')
+    assert cache.obtener('a') == 'respuesta'
+    estadisticas = cache.estadisticas()
+    assert (estadisticas['aciertos'], estadisticas['fallos'], estadisticas['entradas']) == (1, 1, 1)
+
+
+def test_caducidad_por_ttl(cache, monkeypatch):
+    cache.guardar('a', 'respuesta')
+    ahora = time.time()
+    monkeypatch.setattr(time, 'time', lambda: ahora + 61)
+    assert cache.obtener('a') is None
+    assert cache.estadisticas()['entradas'] == 0
+
+
+def test_caducados_se_expulsan_al_guardar(cache, monkeypatch):
+    cache.guardar('a', 'respuesta')
+    ahora = time.time()
+    monkeypatch.setattr(time, 'time', lambda: ahora + 61)
+    cache.guardar('b', 'respuesta')
+    assert cache.estadisticas()['entradas'] == 1
+    assert cache.expulsiones == 1
+
+
+def test_expulsa_la_menos_usada_por_numero_de_entradas(cache, monkeypatch):
+    reloj = iter(range(1000, 2000))
+    monkeypatch.setattr(time, 'time', lambda: next(reloj))
+    for clave in ('a', 'b', 'c'):
+        cache.guardar(clave, clave)
+    assert cache.obtener('a') == 'a'  # 'b' pasa a ser la menos usada
+    cache.guardar('d', 'd')
+
+    assert cache.obtener('b') is None
+    assert [cache.obtener(clave) for clave in ('a', 'c', 'd')] == ['a', 'c', 'd']
+    assert cache.expulsiones == 1
+
+
+def test_expulsa_por_bytes(cache, monkeypatch):
+    reloj = iter(range(1000, 2000))
+    monkeypatch.setattr(time, 'time', lambda: next(reloj))
+    cache.guardar('a', 'x' * 600)
+    cache.guardar('b', 'x' * 600)
+    estadisticas = cache.estadisticas()
+    assert (estadisticas['entradas'], estadisticas['bytes']) == (1, 600)
+    assert cache.obtener('a') is None
+
+
+def test_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / 'respuestas.sqlite3')
+    CacheRespuestasLLM(ruta).guardar('a', 'respuesta')
+    assert CacheRespuestasLLM(ruta).obtener('a') == 'respuesta'
+
+
+def test_limpiar(cache):
+    cache.guardar('a', 'respuesta')
+    cache.obtener('a')
+    cache.limpiar()
+    assert cache.estadisticas() == {
+        'aciertos': 0, 'fallos': 0, 'ratio_aciertos': 0.0, 'expulsiones': 0, 'entradas': 0, 'bytes': 0
+    }
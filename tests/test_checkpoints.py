@@ -0,0 +1,83 @@
+"""
+Checkpoints del análisis: si Ollama deja de responder a mitad de un análisis
+con informe_id, volver a ejecutarlo continúa desde la última etapa completada
+"""
+
+import httpx
+import pytest
+
+from agentes import checkpoints
+from agentes.checkpoints import CheckpointerSQLite, config_informe
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import paquete_en_checkpoint, procesar_conjetura
+from agentes.politica_llm import Circuito, politica_llm
+from benchmarks.respuestas_falsas import detectar_etapa, responder
+
+CONJETURA = 'Conjetura de prueba suficientemente larga'
+
+
+@pytest.fixture
+def checkpointer(tmp_path, monkeypatch):
+    checkpointer = CheckpointerSQLite(str(tmp_path / 'checkpoints.sqlite3'))
+    monkeypatch.setattr(checkpoints, '_checkpointer_global', checkpointer)
+    monkeypatch.setattr(politica_llm, 'circuito', Circuito())
+    monkeypatch.setattr(politica_llm, 'espera_base', 0.001)
+    monkeypatch.setattr(politica_llm, 'espera_maxima', 0.001)
+    return checkpointer
+
+
+@pytest.fixture
+def ollama_caido_en_que_es():
+    """LLM falso que deja de responder en la última etapa mientras `caido[0]` sea True"""
+    caido = [True]
+
+    def responder_o_caer(messages):
+        if caido[0] and detectar_etapa(messages[-1].content) == 'que_es':
+            raise httpx.ConnectError('Ollama no responde')
+        return responder(messages)
+
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder_o_caer)) as falso:
+        yield falso, caido
+
+
+def test_reanuda_desde_la_ultima_etapa(checkpointer, ollama_caido_en_que_es):
+    falso, caido = ollama_caido_en_que_es
+
+    fallido = procesar_conjetura(CONJETURA, informe_id='informe')
+    assert (fallido['success'], fallido['reanudable']) == (False, True)
+    assert paquete_en_checkpoint('informe', 'preceptivas')
+    assert paquete_en_checkpoint('informe', 'que_es') is None
+
+    caido[0] = False
+    politica_llm.circuito.exito()
+    antes = falso.llamadas
+    resultado = procesar_conjetura(CONJETURA, informe_id='informe')
+
+    assert resultado['success']
+    assert falso.llamadas - antes == 1  # Solo la etapa que faltaba
+    assert resultado['analisis']['que_es']['contenido']
+    assert resultado['analisis']['por_que']['preceptivas'] == paquete_en_checkpoint('informe', 'preceptivas')
+
+
+def test_analisis_completado_no_repite_llamadas(checkpointer, llm_falso):
+    primero = procesar_conjetura(CONJETURA, informe_id='informe')
+    antes = llm_falso.llamadas
+    segundo = procesar_conjetura(CONJETURA, informe_id='informe')
+
+    assert llm_falso.llamadas == antes
+    assert segundo['analisis'] == primero['analisis']
+    assert checkpointer.estadisticas() == {'informes': 1, 'checkpoints': 1}  # Podado al terminar
+
+
+def test_otra_conjetura_descarta_los_checkpoints(checkpointer, llm_falso):
+    procesar_conjetura(CONJETURA, informe_id='informe')
+    antes = llm_falso.llamadas
+    resultado = procesar_conjetura('Otra conjetura distinta y larga', informe_id='informe')
+
+    assert resultado['success']
+    assert llm_falso.llamadas > antes
+
+
+def test_un_thread_por_modo():
+    assert config_informe('informe') == {'configurable': {'thread_id': 'informe'}}
+    assert config_informe('informe', 'paralelo') == {'configurable': {'thread_id': 'informe:paralelo'}}
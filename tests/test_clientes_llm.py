@@ -0,0 +1,66 @@
+"""
+Registro de clientes LLM compartidos y cliente falso para pruebas
+"""
+
+import asyncio
+
+from agentes.clientes_llm import LLMFalso, RegistroClientesLLM
+
+URL = 'http://localhost:11434'
+
+
+def test_un_cliente_por_configuracion():
+    registro = RegistroClientesLLM()
+    cliente = registro.obtener('modelo', URL, 0.7)
+    assert registro.obtener('modelo', URL, 0.7) is cliente
+    assert registro.obtener('modelo', URL, 0.2) is not cliente
+    assert registro.obtener('otro', URL, 0.7) is not cliente
+    assert registro.obtener('modelo', URL, 0.7, num_ctx=4096) is not cliente
+
+
+def test_opciones_none_se_ignoran():
+    registro = RegistroClientesLLM()
+    assert registro.obtener('modelo', URL, 0.7, keep_alive=None) is registro.obtener('modelo', URL, 0.7)
+
+
+def test_configurar_recrea_los_clientes():
+    registro = RegistroClientesLLM()
+    cliente = registro.obtener('modelo', URL, 0.7)
+    registro.configurar(max_conexiones=2)
+    assert registro.max_conexiones == 2
+    assert registro.obtener('modelo', URL, 0.7) is not cliente
+
+
+def test_cliente_falso_sustituye_a_todos_temporalmente():
+    registro = RegistroClientesLLM()
+    falso = LLMFalso('{}')
+    with registro.usar_cliente_falso(falso):
+        assert registro.obtener('modelo', URL, 0.7) is falso
+        assert registro.obtener('otro', URL, 0.2) is falso
+    assert registro.obtener('modelo', URL, 0.7) is not falso
+
+
+def test_semaforo_por_bucle_de_eventos():
+    registro = RegistroClientesLLM(max_concurrencia_async=3)
+
+    async def semaforos():
+        return registro.semaforo_async(), registro.semaforo_async()
+
+    primero, mismo = asyncio.run(semaforos())
+    otro, _ = asyncio.run(semaforos())
+    assert primero is mismo
+    assert otro is not primero
+
+
+def test_llm_falso_respuestas_en_ciclo():
+    falso = LLMFalso(['uno', 'dos'])
+    assert [falso.invoke([]).content for _ in range(3)] == ['uno', 'dos', 'uno']
+    assert asyncio.run(falso.ainvoke([])).content == 'dos'
+    assert falso.llamadas == 4
+
+
+def test_llm_falso_stream():
+    falso = LLMFalso('{"clave": "valor largo"}')
+    fragmentos = [fragmento.content for fragmento in falso.stream([])]
+    assert len(fragmentos) > 1
+    assert ''.join(fragmentos) == '{"clave": "valor largo"}'
@@ -0,0 +1,83 @@
+"""
+Coalescencia de peticiones duplicadas (VueloUnico): las ejecuciones
+concurrentes de una misma clave comparten una sola ejecución
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentes.coalescencia import VueloUnico
+
+
+def _lanzar_con_lider_bloqueado(vuelo, clave, funcion, esperando):
+    """Lanza una ejecución líder bloqueada y `esperando` peticiones más de la misma clave"""
+    liberar = threading.Event()
+    empezado = threading.Event()
+
+    def lider():
+        empezado.set()
+        liberar.wait(5)
+        return funcion()
+
+    pool = ThreadPoolExecutor(max_workers=esperando + 1)
+    futuros = [pool.submit(vuelo.ejecutar, clave, lider)]
+    assert empezado.wait(5)
+    futuros += [pool.submit(vuelo.ejecutar, clave, funcion) for _ in range(esperando)]
+    while vuelo.compartidas < esperando:
+        threading.Event().wait(0.01)
+    liberar.set()
+    pool.shutdown(wait=True)
+    return futuros
+
+
+def test_ejecuciones_concurrentes_comparten_resultado():
+    vuelo = VueloUnico()
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        return 'resultado'
+
+    futuros = _lanzar_con_lider_bloqueado(vuelo, 'clave', funcion, esperando=4)
+
+    assert [futuro.result() for futuro in futuros] == [('resultado', False)] + [('resultado', True)] * 4
+    assert llamadas == [1]
+    assert vuelo.estadisticas() == {'ejecuciones': 1, 'compartidas': 4, 'en_curso': 0}
+
+
+def test_los_que_esperan_reciben_la_excepcion():
+    vuelo = VueloUnico()
+
+    def funcion():
+        raise ValueError('fallo')
+
+    futuros = _lanzar_con_lider_bloqueado(vuelo, 'clave', funcion, esperando=2)
+
+    for futuro in futuros:
+        with pytest.raises(ValueError, match='fallo'):
+            futuro.result()
+    assert vuelo.en_curso() == 0
+
+
+def test_claves_distintas_no_se_comparten():
+    vuelo = VueloUnico()
+    assert vuelo.ejecutar('a', lambda: 1) == (1, False)
+    assert vuelo.ejecutar('b', lambda: 2) == (2, False)
+    assert vuelo.ejecutar('a', lambda: 3) == (3, False)  # La anterior ya terminó
+    assert vuelo.estadisticas()['ejecuciones'] == 3
+
+
+def test_esperar():
+    vuelo = VueloUnico()
+    assert vuelo.esperar('clave') is False
+
+    liberar = threading.Event()
+    hilo = threading.Thread(target=vuelo.ejecutar, args=('clave', lambda: liberar.wait(5)))
+    hilo.start()
+    while not vuelo.en_curso():
+        threading.Event().wait(0.01)
+    threading.Timer(0.05, liberar.set).start()
+    assert vuelo.esperar('clave') is True
+    hilo.join()
@@ -0,0 +1,47 @@
+"""
+Contexto de los prompts: serialización por modo, reutilización de la forma
+serializada y recuento de tokens por etapa con memoria acotada
+"""
+
+import json
+
+import pytest
+
+from agentes import contexto
+from agentes.contexto import contexto_paquete, estadisticas_prompts, registrar_prefill, registrar_prompt
+
+PAQUETE = [{'titulo': 'Norma', 'contenido': 'Cumplimiento del CTE'}, {'titulo': 'Otra', 'contenido': 'Más'}]
+
+
+def test_modo_por_defecto_es_el_formato_original():
+    assert contexto.CONTEXTO_MODO == 'completo'
+    assert contexto_paquete('preceptivas', PAQUETE) == json.dumps(PAQUETE, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('modo, esperado', [
+    ('compacto', json.dumps(PAQUETE, ensure_ascii=False, separators=(',', ':'))),
+    ('titulos', '["Norma","Otra"]'),
+])
+def test_modos_opcionales(modo, esperado):
+    assert contexto_paquete('preceptivas', PAQUETE, modo) == esperado
+
+
+def test_reutiliza_la_forma_serializada_hasta_que_cambia_el_contenido():
+    primera = contexto_paquete('tecnicas', PAQUETE)
+    assert contexto_paquete('tecnicas', [dict(elemento) for elemento in PAQUETE]) is primera
+    editado = [PAQUETE[0], {'titulo': 'Otra', 'contenido': 'Editada'}]
+    assert 'Editada' in contexto_paquete('tecnicas', editado)
+
+
+def test_recuento_por_etapa_no_crece_con_las_llamadas(monkeypatch):
+    monkeypatch.setattr(contexto, '_tokens_por_etapa', {})
+    monkeypatch.setattr(contexto, '_prefill_por_etapa', {})
+    for longitud in (40, 400, 80):
+        registrar_prompt('tecnicas', 'x' * longitud)
+        registrar_prefill('tecnicas', {'prompt_eval_count': longitud, 'prompt_eval_duration': 2e6})
+
+    assert estadisticas_prompts() == {'tecnicas': {
+        'llamadas': 3, 'media': 520 / 4 / 3, 'ultimo': 20, 'maximo': 100,
+        'prefill_tokens_medio': 520 / 3, 'prefill_ms_medio': 2.0
+    }}
+    assert contexto._tokens_por_etapa['tecnicas'] == {'llamadas': 3, 'suma': 130, 'ultimo': 20, 'maximo': 100}
@@ -0,0 +1,74 @@
+"""
+Regeneración incremental tras editar: una edición deja obsoletas solo las
+etapas que dependen de la editada, y /refrescar-informe regenera solo esas
+"""
+
+import copy
+
+import pytest
+
+from agentes.dependencias import etapas_obsoletas, hash_contenido, hash_entrada
+from agentes.formal_causal_agent import ANALISIS_RESPALDO, PAQUETES
+
+CONJETURA = 'Conjetura de prueba para las dependencias'
+EDICION = {'titulo': 'Editada', 'contenido': 'Motivación editada por el usuario'}
+
+
+def _hashes(analisis):
+    return {etapa: hash_entrada(CONJETURA, analisis, etapa) for etapa in PAQUETES}
+
+
+def test_hash_independiente_del_orden_de_las_claves():
+    assert hash_contenido({'a': 1, 'b': 2}) == hash_contenido({'b': 2, 'a': 1})
+
+
+@pytest.mark.parametrize('editada, obsoletas', [
+    ('preceptivas', ['tecnicas', 'facultativas', 'progresistas', 'objetivos', 'que_es']),
+    ('facultativas', ['progresistas', 'objetivos', 'que_es']),
+    ('progresistas', ['objetivos', 'que_es']),
+])
+def test_editar_marca_solo_las_etapas_posteriores(editada, obsoletas):
+    analisis = copy.deepcopy(ANALISIS_RESPALDO)
+    hashes = _hashes(analisis)
+    assert etapas_obsoletas(CONJETURA, analisis, hashes) == []
+
+    analisis['por_que'][editada][0] = EDICION
+    assert etapas_obsoletas(CONJETURA, analisis, hashes) == obsoletas
+
+
+def test_etapas_sin_hash_no_se_consideran_obsoletas():
+    analisis = copy.deepcopy(ANALISIS_RESPALDO)
+    hashes = {'tecnicas': hash_entrada(CONJETURA, analisis, 'tecnicas')}
+    analisis['por_que']['preceptivas'][0] = EDICION
+    assert etapas_obsoletas(CONJETURA, analisis, hashes) == ['tecnicas']
+
+
+def test_editar_y_refrescar_regenera_solo_las_dependientes(llm_falso):
+    import app
+
+    cliente = app.app.test_client()
+    informe_id = cliente.post('/iniciar-informe', json={'conjetura': CONJETURA}).get_json()['informe_id']
+    for paquete in PAQUETES:
+        assert cliente.get(f'/obtener-paquete/{informe_id}/{paquete}').status_code == 200
+    anterior = copy.deepcopy(app.almacen_informes.obtener(informe_id)['analisis'])
+
+    respuesta = cliente.post('/guardar-motivacion', json={
+        'informe_id': informe_id, 'paquete': 'facultativas', 'indice': 0, 'motivacion': EDICION
+    }).get_json()
+    assert respuesta['obsoletos'] == ['progresistas', 'objetivos', 'que_es']
+
+    llamadas = llm_falso.llamadas
+    respuesta = cliente.post(f'/refrescar-informe/{informe_id}').get_json()
+    assert respuesta['regenerados'] == ['progresistas', 'objetivos', 'que_es']
+    assert respuesta['sin_cambios'] == ['preceptivas', 'tecnicas', 'facultativas']
+    assert llm_falso.llamadas - llamadas == 3
+
+    analisis = app.almacen_informes.obtener(informe_id)['analisis']
+    assert analisis['por_que']['preceptivas'] == anterior['por_que']['preceptivas']
+    assert analisis['por_que']['tecnicas'] == anterior['por_que']['tecnicas']
+    assert analisis['por_que']['facultativas'][0] == EDICION
+
+    # Ya no queda nada obsoleto: un segundo refresco no llama al LLM
+    llamadas = llm_falso.llamadas
+    assert cliente.post(f'/refrescar-informe/{informe_id}').get_json()['regenerados'] == []
+    assert llm_falso.llamadas == llamadas
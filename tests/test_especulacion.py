@@ -0,0 +1,108 @@
+"""
+Generación especulativa de las primeras etapas al iniciar un informe: una
+petición que llega mientras se especula se une a esa misma generación
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from benchmarks.respuestas_falsas import responder
+from servicios.especulacion import GestorEspeculacion
+
+
+def _esperar(condicion):
+    limite = time.monotonic() + 5
+    while not condicion():
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+
+
+# ============================================================================
+# GESTOR
+# ============================================================================
+def test_genera_solo_las_primeras_etapas():
+    gestor = GestorEspeculacion(etapas=2)
+    generados = []
+    assert gestor.lanzar('informe', ['a', 'b', 'c'], lambda informe_id, paquete: generados.append(paquete))
+    _esperar(lambda: gestor.en_curso() == 0)
+    assert generados == ['a', 'b']
+    assert gestor.estadisticas()['generadas'] == 2
+
+
+def test_un_fallo_detiene_las_siguientes():
+    gestor = GestorEspeculacion(etapas=3)
+
+    def generar(informe_id, paquete):
+        if paquete == 'a':
+            raise RuntimeError('Ollama no responde')
+
+    gestor.lanzar('informe', ['a', 'b', 'c'], generar)
+    _esperar(lambda: gestor.en_curso() == 0)
+    assert (gestor.fallidas, gestor.generadas) == (1, 0)
+
+
+def test_desactivada():
+    gestor = GestorEspeculacion(etapas=0)
+    assert not gestor.lanzar('informe', ['a'], lambda informe_id, paquete: False)
+    assert gestor.estadisticas()['lanzadas'] == 0
+
+
+# ============================================================================
+# TRASPASO A LA PETICIÓN DEL USUARIO
+# ============================================================================
+@pytest.fixture
+def app(monkeypatch):
+    import app
+    monkeypatch.setattr(app.gestor_especulacion, 'etapas', 1)
+    return app
+
+
+@pytest.fixture
+def llm_retenido():
+    """LLM falso que retiene cada llamada hasta que se libera"""
+    liberar = threading.Event()
+
+    def responder_al_liberar(messages):
+        assert liberar.wait(5)
+        return responder(messages)
+
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder_al_liberar)) as falso:
+        yield falso, liberar
+
+
+@pytest.mark.parametrize('ruta', ['/obtener-paquete/{}/preceptivas', '/obtener-paquete-stream/{}/preceptivas'])
+def test_peticion_durante_la_especulacion_se_une_a_ella(app, llm_retenido, ruta):
+    falso, liberar = llm_retenido
+    cliente = app.app.test_client()
+    informe_id = cliente.post('/iniciar-informe', json={'conjetura': 'Conjetura para la especulación'}).get_json()['informe_id']
+    _esperar(lambda: falso.llamadas == 1)  # La especulación ya está llamando al LLM
+
+    compartidas = app.vuelos_paquetes.compartidas
+    respuestas = []
+
+    def pedir():
+        # El cuerpo se lee en el mismo hilo que hace la petición (contexto de Flask)
+        respuesta = app.app.test_client().get(ruta.format(informe_id))
+        respuestas.append((respuesta.status_code, respuesta.get_data(as_text=True)))
+
+    peticion = threading.Thread(target=pedir)
+    peticion.start()
+    _esperar(lambda: app.vuelos_paquetes.compartidas > compartidas)
+    liberar.set()
+    peticion.join(5)
+    _esperar(lambda: app.gestor_especulacion.en_curso() == 0)
+
+    assert falso.llamadas == 1
+    estado, cuerpo = respuestas[0]
+    assert estado == 200
+    preceptivas = app.almacen_informes.obtener(informe_id)['analisis']['por_que']['preceptivas']
+    if 'stream' in ruta:
+        assert cuerpo.count('event: motivacion') == len(preceptivas)
+        assert 'event: fin' in cuerpo
+    else:
+        datos = json.loads(cuerpo)
+        assert datos['cached'] and datos['motivaciones'] == preceptivas
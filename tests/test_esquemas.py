@@ -0,0 +1,47 @@
+"""
+Validación de las respuestas de cada etapa contra su esquema JSON
+"""
+
+import json
+
+import pytest
+
+from agentes.esquemas import ESQUEMAS_ETAPA, validar
+from benchmarks.respuestas_falsas import respuesta_para_etapa
+
+ELEMENTO = {'titulo': 'Título', 'contenido': 'Contenido'}
+
+
+@pytest.mark.parametrize('etapa, respuesta', [
+    ('preceptivas', respuesta_para_etapa('preceptivas')),
+    ('tecnicas_inicial', respuesta_para_etapa('tecnicas')),
+    ('objetivos', respuesta_para_etapa('para_que', 'tecnicas')),
+    ('objetivos_tecnicas', respuesta_para_etapa('para_que', 'tecnicas')),
+    ('que_es', respuesta_para_etapa('que_es')),
+    ('completo', respuesta_para_etapa('por_que')),
+])
+def test_respuestas_validas(etapa, respuesta):
+    assert validar(ESQUEMAS_ETAPA[etapa], json.loads(respuesta)) == []
+
+
+@pytest.mark.parametrize('etapa, valor, error', [
+    ('preceptivas', [], '$: se esperaba object'),
+    ('preceptivas', {}, '$.preceptivas: falta'),
+    ('preceptivas', {'preceptivas': []}, '$.preceptivas: se esperaban al menos 1 elementos'),
+    ('preceptivas', {'preceptivas': [{'titulo': 'Título'}]}, '$.preceptivas[0].contenido: falta'),
+    ('preceptivas', {'preceptivas': [{**ELEMENTO, 'titulo': 3}]}, '$.preceptivas[0].titulo: se esperaba string'),
+    ('objetivos_tecnicas', {'para_que': [{**ELEMENTO, 'tipo': 'preceptivas'}]},
+     "$.para_que[0].tipo: valor 'preceptivas' no permitido"),
+    ('que_es', {'que_es': {'contenido': 'Definición'}}, '$.que_es.contexto: falta'),
+])
+def test_respuestas_invalidas(etapa, valor, error):
+    assert error in validar(ESQUEMAS_ETAPA[etapa], valor)
+
+
+def test_acumula_todos_los_errores():
+    errores = validar(ESQUEMAS_ETAPA['preceptivas'], {'preceptivas': [{}, ELEMENTO, {'titulo': 'Título'}]})
+    assert errores == [
+        '$.preceptivas[0].titulo: falta',
+        '$.preceptivas[0].contenido: falta',
+        '$.preceptivas[2].contenido: falta',
+    ]
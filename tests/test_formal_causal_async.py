@@ -0,0 +1,50 @@
+"""
+Camino asíncrono: las llamadas simultáneas al LLM nunca superan el límite
+global INFORMES_OLLAMA_CONCURRENCIA (registro_clientes.semaforo_async)
+"""
+
+import asyncio
+
+import pytest
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_async import procesar_conjeturas_async
+from benchmarks.respuestas_falsas import responder
+
+LIMITE = 2
+
+
+class LLMConcurrencia(LLMFalso):
+    """LLM falso que anota cuántas llamadas asíncronas llegan a estar en vuelo a la vez"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.en_vuelo = 0
+        self.maximo = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.en_vuelo += 1
+        self.maximo = max(self.maximo, self.en_vuelo)
+        try:
+            return await super().ainvoke(messages, **kwargs)
+        finally:
+            self.en_vuelo -= 1
+
+
+@pytest.fixture
+def limite_concurrencia():
+    anterior = registro_clientes.max_concurrencia_async
+    registro_clientes.configurar(max_concurrencia_async=LIMITE)
+    yield LIMITE
+    registro_clientes.configurar(max_concurrencia_async=anterior)
+
+
+@pytest.mark.parametrize('modo', ['secuencial', 'paralelo'])
+def test_no_supera_el_limite_de_llamadas_en_vuelo(limite_concurrencia, modo):
+    conjeturas = [f'Conjetura asíncrona número {i}' for i in range(6)]
+    with registro_clientes.usar_cliente_falso(LLMConcurrencia(responder, latencia=0.01)) as falso:
+        resultados = asyncio.run(procesar_conjeturas_async(conjeturas, modo))
+
+    assert all(resultado['success'] for resultado in resultados)
+    assert falso.llamadas >= len(conjeturas) * 6
+    assert falso.maximo == limite_concurrencia
@@ -0,0 +1,57 @@
+"""
+Modo 'paralelo' del grafo: mismas claves, secciones y orden de objetivos que
+el modo 'secuencial', aunque las ramas terminen en cualquier orden
+"""
+
+import json
+import re
+import time
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import TIPOS_MOTIVACION, procesar_conjetura
+from benchmarks.respuestas_falsas import detectar_etapa, responder, respuesta_para_etapa
+
+CONJETURA = 'Conjetura de prueba para comparar los modos del grafo'
+ORDEN_TIPOS = list(TIPOS_MOTIVACION)
+
+
+def responder_por_tipo(messages):
+    """
+    Objetivos de todos los tipos si el prompt los pide juntos (secuencial); si
+    pide uno solo (paralelo), el primer tipo es el que más tarda en responder
+    """
+    texto = messages[-1].content
+    if detectar_etapa(texto) != 'para_que':
+        return responder(messages)
+    tipos = re.findall(r'"tipo": "(\w+)"', texto.rsplit('Responde ÚNICAMENTE', 1)[-1])
+    if len(tipos) > 1:
+        return json.dumps({'para_que': [
+            objetivo for tipo in ORDEN_TIPOS
+            for objetivo in json.loads(respuesta_para_etapa('para_que', tipo))['para_que']
+        ]}, ensure_ascii=False)
+    time.sleep(0.01 * (len(ORDEN_TIPOS) - ORDEN_TIPOS.index(tipos[0])))
+    return responder(messages)
+
+
+def _procesar(modo):
+    with registro_clientes.usar_cliente_falso(LLMFalso(responder_por_tipo)) as falso:
+        return procesar_conjetura(CONJETURA, modo=modo), falso.llamadas
+
+
+def test_paralelo_devuelve_lo_mismo_que_secuencial():
+    secuencial, llamadas_secuencial = _procesar('secuencial')
+    paralelo, llamadas_paralelo = _procesar('paralelo')
+
+    assert secuencial['success'] and paralelo['success']
+    assert list(paralelo) == list(secuencial)
+    assert list(paralelo['analisis']) == list(secuencial['analisis']) == ['por_que', 'para_que', 'que_es']
+    assert list(paralelo['analisis']['por_que']) == ORDEN_TIPOS
+    assert paralelo['analisis'] == secuencial['analisis']
+    assert (llamadas_secuencial, llamadas_paralelo) == (6, 9)  # Un prompt de objetivos por tipo
+
+
+def test_objetivos_agrupados_por_tipo_en_orden():
+    paralelo, _ = _procesar('paralelo')
+    tipos = [objetivo['tipo'] for objetivo in paralelo['analisis']['para_que']]
+    assert tipos == sorted(tipos, key=ORDEN_TIPOS.index)
+    assert set(tipos) == set(ORDEN_TIPOS)
@@ -0,0 +1,56 @@
+"""
+Extracción de JSON de las respuestas del LLM sobre el corpus de
+benchmarks/corpus_json.py (cada caso con el objeto que debe extraerse)
+"""
+
+import pytest
+
+from agentes.formal_causal_agent import extract_json_from_response
+from agentes.json_incremental import AnalizadorJSON, ExtractorElementosIncremental, extraer_json
+from benchmarks.corpus_json import CORPUS
+
+
+def _extraer_por_fragmentos(texto: str, tamano: int) -> object:
+    analizador = AnalizadorJSON()
+    for i in range(0, len(texto), tamano):
+        if analizador.feed(texto[i:i + tamano]) is not None:
+            break
+    return analizador.finalizar()
+
+
+@pytest.mark.parametrize('caso', CORPUS, ids=[caso.nombre for caso in CORPUS])
+def test_corpus_texto_completo(caso):
+    if caso.esperado is None:
+        with pytest.raises(ValueError):
+            extraer_json(caso.texto)
+    else:
+        assert extraer_json(caso.texto) == caso.esperado
+
+
+@pytest.mark.parametrize('tamano', [1, 7, 64])
+@pytest.mark.parametrize('caso', CORPUS, ids=[caso.nombre for caso in CORPUS])
+def test_corpus_por_fragmentos(caso, tamano):
+    if caso.esperado is None:
+        with pytest.raises(ValueError):
+            _extraer_por_fragmentos(caso.texto, tamano)
+    else:
+        assert _extraer_por_fragmentos(caso.texto, tamano) == caso.esperado
+
+
+@pytest.mark.parametrize('caso', [caso for caso in CORPUS if caso.esperado is not None],
+                         ids=[caso.nombre for caso in CORPUS if caso.esperado is not None])
+def test_corpus_extract_json_from_response(caso):
+    assert extract_json_from_response(caso.texto) == caso.esperado
+
+
+def test_llave_de_la_prosa_sin_cerrar():
+    assert extraer_json('Nota: {ver abajo\n{"a": 1}') == {'a': 1}
+
+
+def test_extractor_incremental_entrega_cada_elemento_al_cerrarse():
+    extractor = ExtractorElementosIncremental('preceptivas')
+    assert extractor.feed('{"preceptivas": [{"titulo": "A", "contenido": "a"}, {"titulo": "B"') == [
+        {'titulo': 'A', 'contenido': 'a'}
+    ]
+    assert extractor.feed(', "contenido": "b"}]}') == [{'titulo': 'B', 'contenido': 'b'}]
+    assert len(extractor.elementos) == 2
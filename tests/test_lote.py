@@ -0,0 +1,59 @@
+"""
+Procesamiento por lotes: al relanzar sobre la misma salida se omiten los
+informes ya completados, y una última línea cortada no estropea el fichero
+"""
+
+import json
+
+import pytest
+
+from servicios.lote import leer_completados, procesar_lote
+
+
+def _escribir_entrada(ruta, ids):
+    ruta.write_text(''.join(json.dumps({'id': i, 'conjetura': f'Conjetura del informe {i}'}) + '\n' for i in ids),
+                    encoding='utf-8')
+
+
+def _lineas(ruta):
+    return ruta.read_text(encoding='utf-8').splitlines()
+
+
+@pytest.fixture
+def rutas(tmp_path):
+    entrada = tmp_path / 'conjeturas.jsonl'
+    _escribir_entrada(entrada, ['a', 'b', 'c'])
+    return entrada, tmp_path / 'resultados.jsonl'
+
+
+def test_relanzar_omite_los_completados(rutas, llm_falso):
+    entrada, salida = rutas
+    salida.write_text(json.dumps({'id': 'a', 'success': True}) + '\n'
+                      + json.dumps({'id': 'b', 'success': False, 'error': 'Ollama no responde'}) + '\n',
+                      encoding='utf-8')
+
+    resumen = procesar_lote(str(entrada), str(salida), concurrencia=2, modo='unico')
+    assert (resumen['procesados'], resumen['correctos'], resumen['omitidos']) == (2, 2, 1)
+    assert llm_falso.llamadas == 2  # Una llamada por informe pendiente en modo 'unico'
+    assert leer_completados(str(salida)) == {'a', 'b', 'c'}
+
+    # Una segunda ejecución ya no tiene nada pendiente
+    resumen = procesar_lote(str(entrada), str(salida), concurrencia=2, modo='unico')
+    assert (resumen['procesados'], resumen['omitidos']) == (0, 3)
+    assert llm_falso.llamadas == 2
+
+
+def test_tolera_una_ultima_linea_cortada(rutas, llm_falso):
+    entrada, salida = rutas
+    cortada = '{"id": "b", "success": tr'
+    salida.write_text(json.dumps({'id': 'a', 'success': True}) + '\n' + cortada, encoding='utf-8')
+    assert leer_completados(str(salida)) == {'a'}
+
+    resumen = procesar_lote(str(entrada), str(salida), modo='unico')
+    assert (resumen['procesados'], resumen['omitidos']) == (2, 1)
+
+    # Los resultados nuevos empiezan en su propia línea y la cortada queda aislada
+    lineas = _lineas(salida)
+    assert lineas[1] == cortada
+    assert sorted(json.loads(linea)['id'] for linea in lineas[2:]) == ['b', 'c']
+    assert leer_completados(str(salida)) == {'a', 'b', 'c'}
@@ -0,0 +1,133 @@
+"""
+Ruta /metrics: texto de Prometheus bien formado y métricas por etapa que
+avanzan con cada llamada al LLM
+"""
+
+import re
+from collections import defaultdict
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from benchmarks.respuestas_falsas import responder
+
+TOKENS_PROMPT, TOKENS_RESPUESTA = 120, 40
+
+MUESTRA = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+ETIQUETA = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+SUFIJOS_HISTOGRAMA = ('_bucket', '_sum', '_count')
+
+
+class LLMConTokens(LLMFalso):
+    """LLM falso que informa de los tokens como lo hace Ollama en response_metadata"""
+
+    def invoke(self, messages, **kwargs):
+        respuesta = super().invoke(messages, **kwargs)
+        return AIMessage(content=respuesta.content, response_metadata={
+            'prompt_eval_count': TOKENS_PROMPT, 'eval_count': TOKENS_RESPUESTA, 'eval_duration': 2 * 10 ** 9
+        })
+
+
+def _familia(nombre, tipos):
+    for sufijo in SUFIJOS_HISTOGRAMA:
+        base = nombre[:-len(sufijo)]
+        if nombre.endswith(sufijo) and tipos.get(base) == 'histogram':
+            return base
+    return nombre
+
+
+def parsear_prometheus(texto):
+    """
+    Valida el formato de texto 0.0.4 y devuelve {familia: {(nombre, etiquetas): valor}}
+
+    Cada familia tiene un único HELP y TYPE antes de sus muestras, y todas sus
+    muestras van seguidas, sin mezclarse con las de otra familia.
+    """
+    assert texto.endswith('\n')
+    ayudas, tipos = set(), {}
+    familias = defaultdict(dict)
+    actual = None
+    for linea in texto.rstrip('\n').split('\n'):
+        if linea.startswith('# HELP '):
+            nombre = linea.split(' ', 3)[2]
+            assert nombre not in ayudas, f'HELP repetido para {nombre}'
+            ayudas.add(nombre)
+        elif linea.startswith('# TYPE '):
+            _, _, nombre, tipo = linea.split(' ')
+            assert nombre not in tipos, f'TYPE repetido para {nombre}'
+            assert nombre in ayudas and tipo in ('counter', 'gauge', 'histogram')
+            tipos[nombre] = tipo
+            actual = nombre
+        else:
+            coincidencia = MUESTRA.match(linea)
+            assert coincidencia, f'línea mal formada: {linea!r}'
+            nombre, etiquetas, valor = coincidencia.groups()
+            familia = _familia(nombre, tipos)
+            assert familia == actual, f'{nombre} fuera del bloque de su familia'
+            pares = tuple(ETIQUETA.findall(etiquetas or ''))
+            assert ','.join(f'{k}="{v}"' for k, v in pares) == (etiquetas or '')
+            clave = (nombre, pares)
+            assert clave not in familias[familia], f'muestra repetida: {linea!r}'
+            familias[familia][clave] = float(valor)
+    return familias, tipos
+
+
+def comprobar_histogramas(familias, tipos):
+    """Cubetas 'le' crecientes y acumulativas, terminadas en +Inf igual a _count"""
+    for familia, muestras in familias.items():
+        if tipos[familia] != 'histogram':
+            continue
+        series = defaultdict(list)
+        for (nombre, etiquetas), valor in muestras.items():
+            if nombre == f'{familia}_bucket':
+                le = dict(etiquetas)['le']
+                series[tuple(e for e in etiquetas if e[0] != 'le')].append((float(le), valor))
+        assert series
+        for etiquetas, cubetas in series.items():
+            limites = [limite for limite, _ in cubetas]
+            conteos = [conteo for _, conteo in cubetas]
+            assert limites == sorted(limites) and limites[-1] == float('inf')
+            assert conteos == sorted(conteos)
+            assert conteos[-1] == muestras[(f'{familia}_count', etiquetas)]
+            assert (f'{familia}_sum', etiquetas) in muestras
+
+
+def _valor(familias, familia, **etiquetas):
+    buscadas = set(etiquetas.items())
+    return sum(valor for (nombre, pares), valor in familias.get(familia, {}).items()
+               if nombre in (familia, f'{familia}_count') and buscadas <= set(pares))
+
+
+@pytest.fixture
+def app():
+    import app
+    return app
+
+
+def test_metrics_bien_formado_y_por_etapa(app):
+    cliente = app.app.test_client()
+    antes, _ = parsear_prometheus(cliente.get('/metrics').get_data(as_text=True))
+
+    with registro_clientes.usar_cliente_falso(LLMConTokens(responder)) as falso:
+        respuesta = cliente.post('/iniciar-informe', json={'conjetura': 'Conjetura para las métricas'})
+        informe_id = respuesta.get_json()['informe_id']
+        assert cliente.get(f'/obtener-paquete/{informe_id}/preceptivas').status_code == 200
+    assert falso.llamadas == 1
+
+    respuesta = cliente.get('/metrics')
+    assert respuesta.mimetype == 'text/plain'
+    despues, tipos = parsear_prometheus(respuesta.get_data(as_text=True))
+    comprobar_histogramas(despues, tipos)
+    assert tipos['informes_etapa_duracion_segundos'] == 'histogram'
+    assert tipos['informes_tokens_prompt_total'] == 'counter'
+
+    def avance(familia, **etiquetas):
+        return _valor(despues, familia, **etiquetas) - _valor(antes, familia, **etiquetas)
+
+    assert avance('informes_tokens_prompt_total', etapa='preceptivas') == TOKENS_PROMPT
+    assert avance('informes_tokens_respuesta_total', etapa='preceptivas') == TOKENS_RESPUESTA
+    assert avance('informes_tokens_por_segundo', etapa='preceptivas') == 1
+    assert avance('informes_etapa_duracion_segundos', etapa='preceptivas', fase='llm') == 1
+    assert avance('informes_etapa_duracion_segundos', etapa='tecnicas', fase='llm') == 0
+    assert avance('informes_llm_eventos_total', evento='llamadas') == 1
@@ -0,0 +1,175 @@
+"""
+Análisis en segundo plano de la página de revisión: eventos del progreso,
+latidos SSE, retención de los análisis terminados y el recorrido completo
+por /procesar-con-agente y /progreso-agente
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from agentes.clientes_llm import LLMFalso, registro_clientes
+from agentes.formal_causal_agent import PAQUETES
+from benchmarks.respuestas_falsas import responder
+from servicios import pipeline
+from servicios.pipeline import GestorPipelines, ProgresoPipeline, stream_sse
+
+
+def _eventos(cuerpo):
+    """(tipo, datos) de cada evento de un cuerpo text/event-stream, sin los latidos"""
+    eventos = []
+    for bloque in cuerpo.split('\n\n'):
+        campos = dict(linea.split(': ', 1) for linea in bloque.splitlines() if not linea.startswith(':'))
+        if 'event' in campos:
+            eventos.append((campos['event'], json.loads(campos['data'])))
+    return eventos
+
+
+def _esperar(progreso):
+    while not progreso.terminado:
+        time.sleep(0.01)
+
+
+# ============================================================================
+# PROGRESO Y SSE
+# ============================================================================
+def test_escuchar_con_latidos():
+    progreso = ProgresoPipeline('informe')
+    progreso.publicar('inicio_paquete', {'paquete': 'preceptivas'})
+    threading.Timer(0.15, lambda: (progreso.publicar('completado', {'success': True}), progreso.terminar())).start()
+
+    eventos = list(progreso.escuchar(timeout=0.05))
+    assert eventos[0] == (0, 'inicio_paquete', {'paquete': 'preceptivas'})
+    assert None in eventos
+    assert eventos[-1] == (1, 'completado', {'success': True})
+
+
+def test_stream_sse_formato_latidos_y_reanudacion(monkeypatch):
+    progreso = ProgresoPipeline('informe')
+    progreso.publicar('inicio_paquete', {'paquete': 'preceptivas'})
+    progreso.publicar('completado', {'success': True})
+    progreso.terminar()
+
+    assert list(stream_sse(progreso)) == [
+        'id: 0\nevent: inicio_paquete\ndata: {"paquete": "preceptivas"}\n\n',
+        'id: 1\nevent: completado\ndata: {"success": true}\n\n',
+    ]
+    # Al reconectar con Last-Event-ID solo llegan los posteriores
+    assert list(stream_sse(progreso, desde=1)) == ['id: 1\nevent: completado\ndata: {"success": true}\n\n']
+
+    monkeypatch.setattr(progreso, 'escuchar', lambda desde: iter([None]))
+    assert list(stream_sse(progreso)) == [': ping\n\n']
+
+
+def test_gestor_no_repite_un_analisis_en_marcha():
+    gestor = GestorPipelines()
+    liberar = threading.Event()
+    lanzados = []
+
+    def tarea(progreso):
+        lanzados.append(1)
+        liberar.wait(5)
+
+    primero = gestor.iniciar('informe', tarea)
+    assert gestor.iniciar('informe', tarea) is primero
+    assert gestor.en_curso() == 1
+    liberar.set()
+    _esperar(primero)
+    assert lanzados == [1]
+
+
+def test_gestor_publica_error_y_relanza_los_fallidos():
+    gestor = GestorPipelines()
+
+    def tarea(progreso):
+        raise RuntimeError('fallo')
+
+    progreso = gestor.iniciar('informe', tarea)
+    _esperar(progreso)
+    assert progreso.fallido and progreso.eventos == [('error', {'message': 'fallo'})]
+    assert gestor.iniciar('informe', lambda progreso: None) is not progreso
+
+
+def test_gestor_olvida_los_terminados_tras_la_retencion(monkeypatch):
+    gestor = GestorPipelines()
+    progreso = gestor.iniciar('informe', lambda progreso: None)
+    _esperar(progreso)
+    assert gestor.iniciar('informe', lambda progreso: None) is progreso
+
+    ahora = time.time()
+    monkeypatch.setattr(time, 'time', lambda: ahora + pipeline.PIPELINE_RETENCION_SEGUNDOS + 1)
+    gestor.iniciar('otro', lambda progreso: None)
+    assert gestor.obtener('informe') is None
+
+
+# ============================================================================
+# RECORRIDO POR LA APLICACIÓN
+# ============================================================================
+@pytest.fixture
+def app():
+    import app
+    return app
+
+
+def _iniciar(cliente):
+    respuesta = cliente.post('/iniciar-informe', json={'conjetura': 'Conjetura del análisis en segundo plano'})
+    informe_id = respuesta.get_json()['informe_id']
+    assert cliente.post(f'/procesar-con-agente/{informe_id}').status_code == 200
+    return informe_id
+
+
+def test_eventos_en_orden(app, llm_falso):
+    cliente = app.app.test_client()
+    informe_id = _iniciar(cliente)
+    eventos = _eventos(cliente.get(f'/progreso-agente/{informe_id}').get_data(as_text=True))
+
+    tipos = [tipo for tipo, _ in eventos]
+    assert tipos[-1] == 'completado'
+    inicios = [datos['paquete'] for tipo, datos in eventos if tipo == 'inicio_paquete']
+    paquetes = [datos['paquete'] for tipo, datos in eventos if tipo == 'paquete']
+    assert inicios == paquetes == list(PAQUETES)
+
+    # Cada paquete: inicio, sus elementos en orden y el resultado completo
+    for paquete in PAQUETES:
+        propios = [(tipo, datos) for tipo, datos in eventos if datos.get('paquete') == paquete]
+        assert propios[0][0] == 'inicio_paquete' and propios[-1][0] == 'paquete'
+        indices = [datos['indice'] for tipo, datos in propios if tipo == 'elemento']
+        if paquete != 'que_es':
+            assert indices == list(range(len(indices))) and indices
+            motivaciones = propios[-1][1].get('motivaciones') or propios[-1][1].get('objetivos')
+            assert [datos['elemento'] for tipo, datos in propios if tipo == 'elemento'] == motivaciones
+
+    analisis = app.almacen_informes.obtener(informe_id)['analisis']
+    assert all(analisis['por_que'][paquete] for paquete in PAQUETES[:4])
+
+
+def test_reconectar_no_repite_eventos(app, llm_falso):
+    cliente = app.app.test_client()
+    informe_id = _iniciar(cliente)
+    eventos = _eventos(cliente.get(f'/progreso-agente/{informe_id}').get_data(as_text=True))
+
+    cuerpo = cliente.get(f'/progreso-agente/{informe_id}', headers={'Last-Event-ID': str(len(eventos) - 2)})
+    assert _eventos(cuerpo.get_data(as_text=True)) == eventos[-1:]
+
+
+def test_informe_expulsado_detiene_el_analisis(app):
+    cliente = app.app.test_client()
+    informe_id = cliente.post('/iniciar-informe', json={'conjetura': 'Conjetura que se expulsará'}).get_json()['informe_id']
+
+    def expulsar_y_responder(messages):
+        app.almacen_informes.eliminar(informe_id)
+        return responder(messages)
+
+    falso = LLMFalso(expulsar_y_responder)
+    with registro_clientes.usar_cliente_falso(falso):
+        assert cliente.post(f'/procesar-con-agente/{informe_id}').status_code == 200
+        eventos = _eventos(cliente.get(f'/progreso-agente/{informe_id}').get_data(as_text=True))
+
+    tipos = [tipo for tipo, _ in eventos]
+    assert (tipos[0], tipos[-1]) == ('inicio_paquete', 'error')
+    assert set(tipos[1:-1]) <= {'elemento'}  # Ni el paquete ni ninguno de los siguientes
+    assert 'ya no está disponible' in eventos[-1][1]['message']
+    assert falso.llamadas == 1
+    assert app.gestor_pipelines.obtener(informe_id).fallido
@@ -0,0 +1,93 @@
+"""
+Secciones de plantilla compartidas entre informes y su personalización con
+copia en escritura
+"""
+
+import copy
+import json
+import pickle
+
+import pytest
+
+from servicios.plantilla_informe import (
+    SECCIONES_PERSONALIZABLES,
+    SECCIONES_PLANTILLA,
+    SeccionCompartida,
+    compartir_secciones,
+    es_compartida,
+    personalizar_seccion,
+)
+
+PERITO = SECCIONES_PLANTILLA['perito']
+
+
+@pytest.mark.parametrize('modificar', [
+    lambda seccion: seccion.__setitem__('nombre', 'Otro'),
+    lambda seccion: seccion.__delitem__('nombre'),
+    lambda seccion: seccion.update(nombre='Otro'),
+    lambda seccion: seccion.pop('nombre'),
+    lambda seccion: seccion.setdefault('nuevo', 'valor'),
+    lambda seccion: seccion.clear(),
+])
+def test_seccion_compartida_es_de_solo_lectura(modificar):
+    with pytest.raises(TypeError):
+        modificar(PERITO)
+
+
+def test_listas_de_la_plantilla_son_tuplas():
+    assert isinstance(SECCIONES_PLANTILLA['metodologia']['tecnicas'], tuple)
+    assert isinstance(SECCIONES_PLANTILLA['anexos'], tuple)
+
+
+def test_copias_devuelven_la_misma_seccion():
+    assert copy.copy(PERITO) is PERITO
+    assert copy.deepcopy({'perito': PERITO})['perito'] is PERITO
+
+
+def test_serializable():
+    assert json.loads(json.dumps(PERITO)) == dict(PERITO)
+    restaurada = pickle.loads(pickle.dumps(PERITO))
+    assert isinstance(restaurada, SeccionCompartida) and restaurada == PERITO
+
+
+def test_personalizar_crea_una_copia_privada():
+    original = dict(PERITO)
+    personalizada = personalizar_seccion(PERITO, {'nombre': 'Dra. Pérez'})
+
+    assert personalizada['nombre'] == 'Dra. Pérez'
+    assert personalizada['dni'] == PERITO['dni']
+    assert not es_compartida(personalizada) and not isinstance(personalizada, SeccionCompartida)
+    assert dict(PERITO) == original
+    assert es_compartida(PERITO)
+
+
+def test_personalizar_una_seccion_ya_personalizada():
+    primera = personalizar_seccion(PERITO, {'nombre': 'Dra. Pérez'})
+    segunda = personalizar_seccion(primera, {'dni': '12345678Z'})
+    assert (segunda['nombre'], segunda['dni']) == ('Dra. Pérez', '12345678Z')
+    assert primera['dni'] == PERITO['dni']
+
+
+def test_personalizar_descongela_las_listas():
+    metodologia = personalizar_seccion(SECCIONES_PLANTILLA['metodologia'], {'criterios': 'Propios'})
+    metodologia['tecnicas'].append('Nueva técnica')
+    assert 'Nueva técnica' not in SECCIONES_PLANTILLA['metodologia']['tecnicas']
+
+
+def test_personalizar_campos_desconocidos():
+    with pytest.raises(ValueError, match='desconocido'):
+        personalizar_seccion(PERITO, {'desconocido': 'valor'})
+
+
+def test_secciones_personalizables():
+    assert set(SECCIONES_PERSONALIZABLES) == set(SECCIONES_PLANTILLA) - {'anexos'}
+
+
+def test_compartir_secciones_sin_personalizar():
+    personalizado = personalizar_seccion(PERITO, {'nombre': 'Dra. Pérez'})
+    informe = json.loads(json.dumps({**SECCIONES_PLANTILLA, 'perito': personalizado}))
+
+    compartir_secciones(informe)
+
+    assert informe['perito'] == personalizado and not es_compartida(informe['perito'])
+    assert all(informe[seccion] is SECCIONES_PLANTILLA[seccion] for seccion in SECCIONES_PLANTILLA if seccion != 'perito')
@@ -0,0 +1,209 @@
+"""
+Política de llamadas al LLM: transiciones del cortocircuito, reintentos de
+errores transitorios, reparación de respuestas inválidas y plazo por llamada
+"""
+
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+
+from agentes.clientes_llm import RegistroClientesLLM
+from agentes.politica_llm import Circuito, CircuitoAbierto, PoliticaLLM, plazo_restante
+
+
+def _politica(**opciones):
+    valores = {'plazo': 5, 'reintentos': 2, 'reparaciones': 1, 'espera_base': 0.001, 'espera_maxima': 0.001,
+               'circuito': Circuito(umbral=3, enfriamiento=60)}
+    valores.update(opciones)
+    return PoliticaLLM(**valores)
+
+
+def _reparar_no_usado(respuesta, error):
+    raise AssertionError('no debería repararse')
+
+
+# ============================================================================
+# CORTOCIRCUITO
+# ============================================================================
+def test_circuito_se_abre_al_alcanzar_el_umbral():
+    circuito = Circuito(umbral=3, enfriamiento=60)
+    for _ in range(2):
+        circuito.fallo()
+    assert circuito.estado == 'cerrado'
+    circuito.permitir()
+
+    circuito.fallo()
+    assert circuito.estado == 'abierto'
+    assert circuito.aperturas == 1
+    with pytest.raises(CircuitoAbierto):
+        circuito.permitir()
+
+
+def test_exito_reinicia_los_fallos_seguidos():
+    circuito = Circuito(umbral=2, enfriamiento=60)
+    circuito.fallo()
+    circuito.exito()
+    circuito.fallo()
+    assert circuito.estado == 'cerrado'
+
+
+def _circuito_en_enfriamiento(monkeypatch):
+    circuito = Circuito(umbral=1, enfriamiento=10)
+    circuito.fallo()
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: ahora + 11)
+    return circuito
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba(monkeypatch):
+    circuito = _circuito_en_enfriamiento(monkeypatch)
+    assert circuito.estado == 'semiabierto'
+    circuito.permitir()
+    with pytest.raises(CircuitoAbierto):
+        circuito.permitir()
+
+
+def test_prueba_con_exito_cierra_el_circuito(monkeypatch):
+    circuito = _circuito_en_enfriamiento(monkeypatch)
+    circuito.permitir()
+    circuito.exito()
+    assert circuito.estado == 'cerrado'
+    circuito.permitir()
+
+
+def test_prueba_fallida_vuelve_a_abrir(monkeypatch):
+    circuito = _circuito_en_enfriamiento(monkeypatch)
+    circuito.permitir()
+    circuito.fallo()
+    assert circuito.estado == 'abierto'
+    assert circuito.aperturas == 2
+
+
+def test_prueba_descartada_permite_otra(monkeypatch):
+    circuito = _circuito_en_enfriamiento(monkeypatch)
+    circuito.permitir()
+    circuito.descartar_prueba()
+    assert circuito.estado == 'semiabierto'
+    circuito.permitir()
+
+
+# ============================================================================
+# POLÍTICA
+# ============================================================================
+def test_reintenta_errores_transitorios():
+    politica = _politica()
+    intentos = []
+
+    def invocar():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise httpx.ConnectError('caído')
+        return 'respuesta'
+
+    assert politica.ejecutar(invocar, str.upper, _reparar_no_usado) == 'RESPUESTA'
+    estadisticas = politica.estadisticas()
+    assert (estadisticas['reintentos'], estadisticas['errores_transitorios'], estadisticas['exitos']) == (2, 2, 1)
+    assert estadisticas['circuito'] == 'cerrado'
+
+
+def test_errores_permanentes_no_se_reintentan():
+    politica = _politica()
+    intentos = []
+
+    def invocar():
+        intentos.append(1)
+        raise KeyError('permanente')
+
+    with pytest.raises(KeyError):
+        politica.ejecutar(invocar, str, _reparar_no_usado)
+    assert len(intentos) == 1
+    assert politica.estadisticas()['errores_permanentes'] == 1
+
+
+def test_agotar_reintentos_abre_el_circuito():
+    politica = _politica()
+
+    def invocar():
+        raise httpx.ConnectError('caído')
+
+    with pytest.raises(httpx.ConnectError):
+        politica.ejecutar(invocar, str, _reparar_no_usado)
+    with pytest.raises(CircuitoAbierto):
+        politica.ejecutar(lambda: 'respuesta', str, _reparar_no_usado)
+    estadisticas = politica.estadisticas()
+    assert (estadisticas['circuito'], estadisticas['rechazos_circuito']) == ('abierto', 1)
+
+
+def test_repara_respuestas_invalidas():
+    politica = _politica()
+
+    def procesar(respuesta):
+        if respuesta != 'valida':
+            raise ValueError('respuesta inválida')
+        return respuesta
+
+    assert politica.ejecutar(lambda: 'invalida', procesar, lambda respuesta, error: 'valida') == 'valida'
+    estadisticas = politica.estadisticas()
+    assert (estadisticas['reparaciones'], estadisticas['reparaciones_exitosas']) == (1, 1)
+
+
+def test_agotar_reparaciones_relanza():
+    politica = _politica()
+
+    def procesar(respuesta):
+        raise ValueError('respuesta inválida')
+
+    with pytest.raises(ValueError):
+        politica.ejecutar(lambda: 'invalida', procesar, lambda respuesta, error: 'invalida')
+    assert politica.estadisticas()['reparaciones'] == 1
+
+
+def test_plazo_corta_una_llamada_colgada():
+    politica = _politica(plazo=0.3, reintentos=0)
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        politica.ejecutar(lambda: time.sleep(2), str, _reparar_no_usado)
+    assert time.monotonic() - inicio < 1.5
+    assert politica.estadisticas()['timeouts'] == 1
+
+
+def test_plazo_restante_solo_dentro_de_la_llamada():
+    assert plazo_restante() is None
+    restante = _politica(plazo=2).ejecutar(plazo_restante, lambda respuesta: respuesta, _reparar_no_usado)
+    assert 0 < restante <= 2
+
+
+@pytest.fixture
+def ollama_mudo():
+    """URL de un servidor que acepta conexiones y nunca responde"""
+    servidor = socket.socket()
+    servidor.bind(('127.0.0.1', 0))
+    servidor.listen()
+    conexiones = []
+    threading.Thread(target=lambda: conexiones.append(servidor.accept()), daemon=True).start()
+    yield f'http://127.0.0.1:{servidor.getsockname()[1]}'
+    for conexion, _ in conexiones:
+        conexion.close()
+    servidor.close()
+
+
+def test_plazo_agotado_corta_tambien_la_peticion_http(ollama_mudo):
+    """El intento abandonado no deja un hilo del pool esperando el timeout de Ollama"""
+    cliente = RegistroClientesLLM().obtener('modelo', ollama_mudo, 0.0)
+    terminada = threading.Event()
+
+    def invocar():
+        try:
+            return cliente.invoke('Hola')
+        finally:
+            terminada.set()
+
+    # Según quién llegue antes, vence el plazo de la política o el timeout de httpx
+    politica = _politica(plazo=0.3, reintentos=0)
+    with pytest.raises((TimeoutError, httpx.TimeoutException)):
+        politica.ejecutar(invocar, str, _reparar_no_usado)
+    assert terminada.wait(2)
+    assert politica.estadisticas()['timeouts'] == 1